@@ -4,16 +4,6 @@ import platform
 import re
 from typing import List, Optional
 
-try:
-    from gtts import gTTS, lang
-except ImportError:
-    print("no gtts. pip install gtts if you need")
-
-try:
-    from playsound import playsound
-except ImportError:
-    print("no playsound. pip install playsound if you need")
-
 from slashgpt.chat_app import ChatApplication
 from slashgpt.chat_config_with_manifests import ChatConfigWithManifests
 from slashgpt.function.jupyter_runtime import PythonRuntime
@@ -33,10 +23,14 @@ utility functions for Main class
 
 def play_text(text: str, lang: str):
     try:
+        # imported on first use, since most sessions do not use audio
+        from gtts import gTTS
+        from playsound import playsound
+
         audio_obj = gTTS(text=text, lang=lang, slow=False)
         audio_obj.save("./output/audio.mp3")
         playsound("./output/audio.mp3")
-    except NameError:
+    except ImportError:
         print_error("no playsound or gtts. pip install playsound or gtts")
 
 
@@ -159,8 +153,10 @@ class SlashGPT:
                 audio = None
                 if commands[1] != "off":
                     try:
+                        from gtts import lang
+
                         languages = lang.tts_langs()
-                    except NameError:
+                    except ImportError:
                         languages = ""
                         print_error("no gtts. pip install gtts")
                     if commands[1] in languages:
@@ -307,6 +303,7 @@ class SlashGPT:
             print("bye")
 
     def talk(self, question: str):
+        self.app.apply_refreshed_manifests()
         mode = self.detect_input_style(question)
         if mode == InputStyle.HELP:
             self.display_oneline_help()
@@ -2,92 +2,145 @@
 .. include:: ../../README.md
 """
 
-from .chat_app import ChatApplication
-from .chat_config import ChatConfig
-from .chat_config_with_manifests import ChatConfigWithManifests
-from .chat_history import ChatHistory
-from .chat_session import ChatSession
-from .cli import cli
-from .dbs.db_base import VectorDBBase
-from .dbs.db_pgvector import DBPgVector
-from .dbs.db_pinecone import DBPinecone
-from .dbs.vector_engine import VectorEngine
-from .dbs.vector_engine_openai import VectorEngineOpenAI
-from .function.function_action import FunctionAction
-from .function.function_call import FunctionCall
-from .function.jupyter_runtime import PythonRuntime
-from .history.storage.abstract import ChatHistoryAbstractStorage
-from .history.storage.file import ChatHistoryFileStorage
+import importlib
+from typing import TYPE_CHECKING
 
-# from .history.storage.log import *
-from .history.storage.memory import ChatHistoryMemoryStorage
+if TYPE_CHECKING:
+    from .batch import BatchRunner, run_batch  # noqa: F401
+    from .chat_app import ChatApplication  # noqa: F401
+    from .chat_config import ChatConfig  # noqa: F401
+    from .chat_config_with_manifests import ChatConfigWithManifests  # noqa: F401
+    from .chat_history import ChatHistory  # noqa: F401
+    from .chat_session import ChatSession  # noqa: F401
+    from .cli import cli  # noqa: F401
+    from .dbs.db_base import VectorDBBase  # noqa: F401
+    from .dbs.db_chroma import DBChroma  # noqa: F401
+    from .dbs.db_local import DBLocal, LocalVectorIndex  # noqa: F401
+    from .dbs.db_pgvector import DBPgVector  # noqa: F401
+    from .dbs.db_pinecone import DBPinecone  # noqa: F401
+    from .dbs.embedding_cache import EmbeddingCache  # noqa: F401
+    from .dbs.vector_engine import VectorEngine  # noqa: F401
+    from .dbs.vector_engine_openai import VectorEngineOpenAI  # noqa: F401
+    from .function.action_cache import ActionCache  # noqa: F401
+    from .function.function_action import FunctionAction  # noqa: F401
+    from .function.function_call import FunctionCall  # noqa: F401
+    from .function.jupyter_runtime import PythonRuntime  # noqa: F401
+    from .history.context import ContextPolicy  # noqa: F401
+    from .history.storage.abstract import ChatHistoryAbstractStorage  # noqa: F401
+    from .history.storage.file import ChatHistoryFileStorage  # noqa: F401
+    from .history.storage.memory import ChatHistoryMemoryStorage  # noqa: F401
+    from .history.storage.sqlite import ChatHistorySQLiteStorage  # noqa: F401
+    from .history.storage.write_back import ChatHistoryWriteBackStorage  # noqa: F401
+    from .llms.engine.anthropic_engine import LLMEngineAnthropic  # noqa: F401
+    from .llms.engine.base import LLMEngineBase  # noqa: F401
+    from .llms.engine.deepseek import LLMEngineDeepSeek  # noqa: F401
+    from .llms.engine.google import LLMEngineGoogle  # noqa: F401
+    from .llms.engine.groq import LLMEngineGroq  # noqa: F401
+    from .llms.engine.hosted import LLMEngineHosted  # noqa: F401
+    from .llms.engine.huggingface import LLMEngineHF  # noqa: F401
+    from .llms.engine.ollama import LLMEngineOllama  # noqa: F401
+    from .llms.engine.openai_gpt import LLMEngineOpenAIGPT  # noqa: F401
+    from .llms.engine.openai_legacy import LLMEngineOpenAILegacy  # noqa: F401
+    from .llms.engine.openrouter import LLMEngineOpenRouter  # noqa: F401
+    from .llms.engine.replicate import LLMEngineReplicate  # noqa: F401
+    from .llms.engine.router import LLMEngineRouter  # noqa: F401
+    from .llms.engine.tne import LLMEngineTNE  # noqa: F401
+    from .llms.model import LlmModel  # noqa: F401
+    from .llms.rate_limiter import RateLimiter, RateLimiterRegistry  # noqa: F401
+    from .llms.response_cache import ResponseCache  # noqa: F401
+    from .llms.transport import TransportRegistry  # noqa: F401
+    from .manifest import Manifest  # noqa: F401
+    from .manifest_store import ManifestStore  # noqa: F401
+    from .manifest_watcher import ManifestWatcher  # noqa: F401
+    from .server import ChatServer  # noqa: F401
+    from .session_registry import SessionRegistry  # noqa: F401
+    from .slashbot import run_bot  # noqa: F401
+    from .utils.print import print_bot  # noqa: F401
+    from .utils.print import print_debug  # noqa: F401
+    from .utils.print import print_error  # noqa: F401
+    from .utils.print import print_function  # noqa: F401
+    from .utils.print import print_info  # noqa: F401
+    from .utils.print import print_warning  # noqa: F401
 
-from .llms.engine.base import LLMEngineBase
-from .llms.engine.hosted import LLMEngineHosted
-from .llms.engine.openai_gpt import LLMEngineOpenAIGPT
-from .llms.engine.deepseek import LLMEngineDeepSeek
-from .llms.engine.openai_legacy import LLMEngineOpenAILegacy
-from .llms.engine.replicate import LLMEngineReplicate
-from .llms.engine.tne import LLMEngineTNE
-from .llms.engine.ollama import LLMEngineOllama
-from .llms.engine.google import LLMEngineGoogle
-from .llms.engine.anthropic_engine import LLMEngineAnthropic
-from .llms.engine.huggingface import LLMEngineHF
-from .llms.engine.groq import LLMEngineGroq
-from .llms.model import LlmModel
-from .manifest import Manifest
-from .slashbot import run_bot
-from .utils.print import print_bot, print_debug, print_error, print_function, print_info, print_warning
-
-# from .function.network import *
-
-
-__all__ = [
-    "ChatApplication",
-    "ChatConfig",
-    "ChatConfigWithManifests",
-    "ChatHistory",
-    "ChatSession",
-    "cli",
-    "run_bot",
+# Names are imported on first access (PEP 562), so that "import slashgpt" does not load
+# every LLM SDK, vector database client and Jupyter runtime.
+__lazy_imports = {
+    "ChatApplication": ".chat_app",
+    "ChatConfig": ".chat_config",
+    "ChatConfigWithManifests": ".chat_config_with_manifests",
+    "ChatHistory": ".chat_history",
+    "ChatSession": ".chat_session",
+    "cli": ".cli",
+    "run_bot": ".slashbot",
+    "BatchRunner": ".batch",
+    "run_batch": ".batch",
+    "ChatServer": ".server",
+    "SessionRegistry": ".session_registry",
     # dbs
-    "VectorDBBase",
-    "DBChroma",
-    "DBPgVector",
-    "DBPinecone",
-    "get_vector_db",
-    "VectorEngine",
-    "VectorEngineOpenAI",
+    "VectorDBBase": ".dbs.db_base",
+    "DBChroma": ".dbs.db_chroma",
+    "DBLocal": ".dbs.db_local",
+    "LocalVectorIndex": ".dbs.db_local",
+    "DBPgVector": ".dbs.db_pgvector",
+    "DBPinecone": ".dbs.db_pinecone",
+    "EmbeddingCache": ".dbs.embedding_cache",
+    "VectorEngine": ".dbs.vector_engine",
+    "VectorEngineOpenAI": ".dbs.vector_engine_openai",
     # function
-    "FunctionAction",
-    "FunctionCall",
-    "PythonRuntime",
+    "ActionCache": ".function.action_cache",
+    "FunctionAction": ".function.function_action",
+    "FunctionCall": ".function.function_call",
+    "PythonRuntime": ".function.jupyter_runtime",
     # history
-    "ChatHistory",
-    "ChatHistoryAbstractStorage",
-    "ChatHistoryFileStorage",
-    "ChatHistoryMemoryStorage",
+    "ContextPolicy": ".history.context",
+    "ChatHistoryAbstractStorage": ".history.storage.abstract",
+    "ChatHistoryFileStorage": ".history.storage.file",
+    "ChatHistoryMemoryStorage": ".history.storage.memory",
+    "ChatHistorySQLiteStorage": ".history.storage.sqlite",
+    "ChatHistoryWriteBackStorage": ".history.storage.write_back",
     # llm
-    "LLMEngineBase",
-    "LLMEngineHosted",
-    "LLMEngineOpenAIGPT",
-    "LLMEngineOpenAILegacy",
-    "LLMEngineReplicate",
-    "LLMEngineAnthropic",
-    "LLMEngineTNE",
-    "LLMEngineOllama",
-    "LLMEngineOpenRouter",
-    "LLMEngineDeepSeek",
-    "LLMEngineHF",
-    "LLMEngineGroq",
-    "LLMEngineGoogle",
-    "LlmModel",
-    "Manifest",
+    "LLMEngineBase": ".llms.engine.base",
+    "LLMEngineHosted": ".llms.engine.hosted",
+    "LLMEngineOpenAIGPT": ".llms.engine.openai_gpt",
+    "LLMEngineOpenAILegacy": ".llms.engine.openai_legacy",
+    "LLMEngineReplicate": ".llms.engine.replicate",
+    "LLMEngineAnthropic": ".llms.engine.anthropic_engine",
+    "LLMEngineTNE": ".llms.engine.tne",
+    "LLMEngineOllama": ".llms.engine.ollama",
+    "LLMEngineOpenRouter": ".llms.engine.openrouter",
+    "LLMEngineDeepSeek": ".llms.engine.deepseek",
+    "LLMEngineHF": ".llms.engine.huggingface",
+    "LLMEngineGroq": ".llms.engine.groq",
+    "LLMEngineGoogle": ".llms.engine.google",
+    "LLMEngineRouter": ".llms.engine.router",
+    "LlmModel": ".llms.model",
+    "RateLimiter": ".llms.rate_limiter",
+    "RateLimiterRegistry": ".llms.rate_limiter",
+    "ResponseCache": ".llms.response_cache",
+    "TransportRegistry": ".llms.transport",
+    "Manifest": ".manifest",
+    "ManifestStore": ".manifest_store",
+    "ManifestWatcher": ".manifest_watcher",
     # utils
-    "print_debug",
-    "print_error",
-    "print_info",
-    "print_warning",
-    "print_bot",
-    "print_function",
-]
+    "print_debug": ".utils.print",
+    "print_error": ".utils.print",
+    "print_info": ".utils.print",
+    "print_warning": ".utils.print",
+    "print_bot": ".utils.print",
+    "print_function": ".utils.print",
+}
+
+__all__ = list(__lazy_imports.keys())
+
+
+def __getattr__(name: str):
+    module_name = __lazy_imports.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
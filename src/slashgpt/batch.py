@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+#  slashbatch requests.jsonl results.jsonl --concurrency 16
+#  slashbatch requests.jsonl results.jsonl --provider-batch   (then --collect, until all the batches are finished)
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests
+from slashgpt.chat_session import ChatSession
+from slashgpt.history.context import ContextPolicy
+from slashgpt.utils.print import print_debug, print_error, print_info
+from slashgpt.utils.utils import run_sync
+
+if TYPE_CHECKING:
+    from slashgpt.function.jupyter_runtime import PythonRuntime
+
+DEFAULT_CONCURRENCY = 8
+"""Default number of records processed at the same time"""
+
+
+def read_records(path: str) -> List[dict]:
+    """Reads the records of a JSONL file. Each record specifies "agent" and "messages" (or a "message"),
+    and optionally "id" (its line number by default) and "user" (for the fairness of the rate limiter)."""
+    records = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            messages = record.get("messages") if "messages" in record else [record.get("message")]
+            records.append({**record, "id": str(record.get("id", line_number)), "messages": [message for message in messages if message]})
+    return records
+
+
+def read_results(path: str) -> Dict[str, dict]:
+    """Returns {id: result} of the last result of each record in a JSONL file of results (if it exists).
+    A line cut off by an interruption is ignored."""
+    results: Dict[str, dict] = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[str(result.get("id"))] = result
+    return results
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Returns the p-th percentile (0-100) of the values, or None if there is none"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class BatchRunner:
+    """Runner of a JSONL file of requests (records of an agent and its messages), which processes them through ChatSession
+    with bounded concurrency, and appends the results to a JSONL file as they finish.
+
+    Records whose results are already in the file (without an error) are skipped, so that an interrupted run resumes
+    where it stopped. Records may also be submitted to the provider's batch API (asynchronous and discounted, see submit
+    and collect), in which case the state of the batches is kept in a JSON file next to the results.
+    Engines of the synchronous style block the event loop, so the concurrency is effective for asynchronous engines only.
+    """
+
+    def __init__(self, config: ChatConfigWithManifests, concurrency: int = DEFAULT_CONCURRENCY, runtime: Optional[PythonRuntime] = None):
+        """
+        Args:
+
+            config (ChatConfigWithManifests): configuration with the manifests of the agents
+            concurrency (int): number of records processed at the same time
+            runtime (PythonRuntime, optional): runtime for functions implemented in Python notebooks
+        """
+        self.config = config
+        self.concurrency = max(1, concurrency)
+        self.runtime = runtime
+
+    def session(self, record: dict) -> ChatSession:
+        """Returns a new session with the agent of the record"""
+        manifest = self.config.get_manifest(record.get("agent"))
+        if manifest is None:
+            raise ValueError(f"No manifest: {record.get('agent')}")
+        return ChatSession(
+            self.config, manifest=manifest, agent_name=record.get("agent"), intro=False, user_id=record.get("user") or f"batch-{record['id']}"
+        )
+
+    async def run_record(self, record: dict) -> dict:
+        """Processes the messages of the record in a session, and returns the result with its latency (seconds)
+        and the numbers of tokens (estimated by the tokenizer of the model)"""
+        result: dict = {"id": record["id"], "agent": record.get("agent"), "responses": [], "functions": []}
+        started = time.monotonic()
+        (prompt_tokens, completion_tokens) = (0, 0)
+        try:
+            session = self.session(record)
+            result["model"] = session.llm_model.name()
+
+            def on_llm_call(messages: List[dict]):
+                # the messages selected by the context policy, on every call (including the ones after function results)
+                nonlocal prompt_tokens
+                prompt_tokens += sum(ContextPolicy.num_tokens(message, session.llm_model) for message in messages)
+
+            session.on_llm_call = on_llm_call
+
+            def callback(callback_type, data):
+                if callback_type == "function":
+                    (function_name, function_message) = data
+                    result["functions"].append({"name": function_name, "result": function_message})
+                elif callback_type == "emit":
+                    (action_method, action_data) = data
+                    result["functions"].append({"emit": action_method, "data": action_data})
+
+            for message in record["messages"]:
+                await session.aappend_user_question(message)
+                response = "".join([chunk async for chunk in session.call_loop(callback, self.runtime)])
+                completion_tokens += session.llm_model.num_tokens(response)
+                result["responses"].append(response)
+            result["error"] = None
+        except Exception as e:
+            result["error"] = str(e)
+        result.update({"latency": time.monotonic() - started, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+        return result
+
+    @classmethod
+    def pending(cls, records: List[dict], output_path: str, exclude: Optional[Set[str]] = None) -> List[dict]:
+        """Returns the records without a successful result in the output (nor in the exclude)"""
+        done = {record_id for record_id, result in read_results(output_path).items() if not result.get("error")} | (exclude or set())
+        return [record for record in records if record["id"] not in done]
+
+    @classmethod
+    def open_output(cls, output_path: str):
+        """Opens the output to append results (after terminating a line cut off by an interruption)"""
+        directory = os.path.dirname(output_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        truncated = False
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            with open(output_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                truncated = f.read(1) != b"\n"
+        f = open(output_path, "a")
+        if truncated:
+            f.write("\n")
+        return f
+
+    @classmethod
+    def write_result(cls, f, result: dict):
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        f.flush()
+
+    async def run(self, input_path: str, output_path: str, verbose: bool = False) -> dict:
+        """Processes the pending records of the input (the ones not finished by a previous run, nor submitted to the
+        batch API), and returns the statistics of this run
+
+        Args:
+
+            input_path (str): JSONL file of the records
+            output_path (str): JSONL file which the results are appended to
+            verbose (bool): True to print the progress
+        """
+        records = read_records(input_path)
+        queue = deque(self.pending(records, output_path, BatchState(self.state_path(output_path)).submitted_ids()))
+        stats: dict = {"records": len(records), "skipped": len(records) - len(queue), "succeeded": 0, "failed": 0}
+        latencies: List[float] = []
+        tokens = {"prompt_tokens": 0, "completion_tokens": 0}
+        started = time.monotonic()
+
+        with self.open_output(output_path) as f:
+
+            async def worker():
+                while queue:
+                    result = await self.run_record(queue.popleft())
+                    self.write_result(f, result)
+                    stats["failed" if result["error"] else "succeeded"] += 1
+                    latencies.append(result["latency"])
+                    for key in tokens:
+                        tokens[key] += result[key]
+                    if verbose:
+                        print_debug(f"batch: {result['id']} {'failed: ' + result['error'] if result['error'] else 'done'} ({result['latency']:.2f}s)")
+
+            await asyncio.gather(*[worker() for _ in range(min(self.concurrency, len(queue)))])
+
+        return {**stats, **tokens, "elapsed": time.monotonic() - started, "p50": percentile(latencies, 50), "p95": percentile(latencies, 95)}
+
+    @classmethod
+    def state_path(cls, output_path: str) -> str:
+        """Returns the location of the state of the submitted batches of the output"""
+        return output_path + ".batches.json"
+
+    async def submit(self, input_path: str, output_path: str, verbose: bool = False) -> dict:
+        """Submits the pending records to the batch API of their providers (one batch per model), and returns
+        the statistics. Records which the batch API cannot process (several messages, functions, or engines without
+        the batch API) are left for run.
+
+        Args:
+
+            input_path (str): JSONL file of the records
+            output_path (str): JSONL file which the results are appended to (by collect)
+            verbose (bool): True to print the progress
+        """
+        state = BatchState(self.state_path(output_path))
+        records = self.pending(read_records(input_path), output_path, state.submitted_ids())
+        groups: Dict[int, dict] = {}
+        for record in records:
+            if len(record["messages"]) != 1:
+                continue
+            try:
+                session = self.session(record)
+                await session.aappend_user_question(record["messages"][0])
+                messages = await session.context_policy.select(session.history, session.llm_model)
+                body = session.llm_model.engine.batch_request(messages, session.manifest)
+            except Exception as e:
+                print_error(f"batch: {record['id']} is not submitted ({e})")
+                continue
+            if body is not None:
+                # requests of the same model (with the same key) make a batch
+                group = groups.setdefault(id(session.llm_model), {"llm_model": session.llm_model, "agent": record.get("agent"), "requests": []})
+                group["requests"].append({"custom_id": record["id"], "agent": record.get("agent"), "body": body})
+
+        for group in groups.values():
+            batch_id = group["llm_model"].engine.submit_batch(group["requests"])
+            state.add(batch_id, group["agent"], {request["custom_id"]: request["agent"] for request in group["requests"]})
+            if verbose:
+                print_debug(f"batch: {len(group['requests'])} records are submitted to {group['llm_model'].name()} ({batch_id})")
+
+        submitted = sum(len(group["requests"]) for group in groups.values())
+        return {"records": len(records), "submitted": submitted, "batches": len(groups), "online": len(records) - submitted}
+
+    async def collect(self, output_path: str, verbose: bool = False) -> dict:
+        """Appends the results of the finished batches to the output, and returns the statistics (the statuses of
+        the batches). Records which failed in a batch are submitted again by the next submit (or processed by run).
+
+        Args:
+
+            output_path (str): JSONL file which the results are appended to
+            verbose (bool): True to print the progress
+        """
+        state = BatchState(self.state_path(output_path))
+        done = {record_id for record_id, result in read_results(output_path).items() if not result.get("error")}
+        statuses: Dict[str, str] = {}
+        stats = {"succeeded": 0, "failed": 0}
+        with self.open_output(output_path) as f:
+            for batch in state.pending_batches():
+                manifest = self.config.get_manifest(batch["agent"])
+                llm_model = (
+                    self.config.get_llm_model_from_manifest(manifest) if manifest and manifest.model() else self.config.get_default_llm_model()
+                )
+                (status, results) = llm_model.engine.retrieve_batch(batch["id"])
+                statuses[batch["id"]] = status
+                if results is None:
+                    continue
+                for record_id, agent in batch["records"].items():
+                    if record_id in done:
+                        continue
+                    data = results.get(record_id) or {"error": f"no result in the batch ({status})"}
+                    result = {
+                        "id": record_id,
+                        "agent": agent,
+                        "model": llm_model.name(),
+                        "batch_id": batch["id"],
+                        "responses": [data["content"]] if "content" in data else [],
+                        "functions": [],
+                        "error": data.get("error"),
+                        "latency": None,
+                        "prompt_tokens": data.get("prompt_tokens") or 0,
+                        "completion_tokens": data.get("completion_tokens") or 0,
+                    }
+                    self.write_result(f, result)
+                    stats["failed" if result["error"] else "succeeded"] += 1
+                state.finish(batch["id"], status)
+                if verbose:
+                    print_debug(f"batch: {batch['id']} is {status}")
+        return {**stats, "batches": statuses, "pending": len(state.pending_batches())}
+
+
+class BatchState:
+    """State of the batches submitted to the batch APIs (a JSON file, rewritten on each change)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.batches: List[dict] = []
+        """Submitted batches ({"id", "agent", "records" ({id: agent}), "status"})"""
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                self.batches = json.load(f).get("batches", [])
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"batches": self.batches}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, batch_id: str, agent: str, records: Dict[str, str]):
+        self.batches.append({"id": batch_id, "agent": agent, "records": records, "status": None})
+        self.save()
+
+    def finish(self, batch_id: str, status: str):
+        for batch in self.batches:
+            if batch["id"] == batch_id:
+                batch["status"] = status
+        self.save()
+
+    def pending_batches(self) -> List[dict]:
+        """Returns the batches whose results are not collected yet"""
+        return [batch for batch in self.batches if batch["status"] is None]
+
+    def submitted_ids(self) -> Set[str]:
+        """Returns the ids of the records in the pending batches"""
+        return {record_id for batch in self.pending_batches() for record_id in batch["records"]}
+
+
+def run_batch(base_dir: str = ""):
+    parser = argparse.ArgumentParser(description="SlashBatch: runs a JSONL file of requests to SlashGPT agents")
+    parser.add_argument("input", help="JSONL file of the records ({'agent', 'messages' or 'message', 'id' (optional)})")
+    parser.add_argument("output", help="JSONL file of the results (a run resumes with the records without a result)")
+    parser.add_argument("--manifests", default="main")
+    parser.add_argument("--dir", "-d", default="")
+    parser.add_argument("--concurrency", "-c", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--provider-batch", action="store_true", help="submit the records to the batch APIs of the providers (the others are run)")
+    parser.add_argument("--collect", action="store_true", help="append the results of the finished batches of the batch APIs")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+
+    current_dir = args.dir if args.dir else base_dir if base_dir != "" else os.path.dirname(__file__)
+    config = ChatConfigWithManifests(current_dir, current_dir + "/manifests/" + args.manifests)
+    config.verbose = args.verbose
+    runner = BatchRunner(config, args.concurrency)
+
+    if args.collect:
+        print_info(f"collect: {run_sync(runner.collect(args.output, args.verbose))}")
+        return
+    if args.provider_batch:
+        print_info(f"submit: {run_sync(runner.submit(args.input, args.output, args.verbose))}")
+    print_info(f"run: {run_sync(runner.run(args.input, args.output, args.verbose))}")
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional
+import threading
+from typing import TYPE_CHECKING, AsyncGenerator, List, Optional, Set
 
 from slashgpt.chat_session import ChatSession
 from slashgpt.utils.print import print_error, print_warning
+from slashgpt.utils.utils import run_sync
 
 if TYPE_CHECKING:
     from slashgpt.chat_config_with_manifests import ChatConfigWithManifests
@@ -27,6 +29,9 @@ class ChatApplication:
         """Callback function"""
         self.session: Optional[ChatSession] = None
         """Active session, initially None"""
+        self.__call_llm_again = False
+        self.__refreshed: Set[str] = set()
+        self.__refreshed_lock = threading.Lock()
 
     def switch_session(
         self,
@@ -47,7 +52,7 @@ class ChatApplication:
         """
         if agent_name is not None:
             if self.config.has_manifest(agent_name):
-                manifest = self.config.manifests.get(agent_name)
+                manifest = self.config.get_manifest(agent_name)
                 if merge_memory and self.session and self.session.memory:
                     merged_memory = self.session.memory.copy()
                     merged_memory.update(memory or {})
@@ -81,6 +86,20 @@ class ChatApplication:
         print_warning("No agent_name was spacified")
         self.session = ChatSession(self.config, default_llm_model=self.llm_model, history_engine=history_engine)
 
+    def refresh_manifests(self, agent_names: List[str]):
+        """Queue the refreshed manifests (see ChatConfigWithManifests.watch), which are applied to the active session
+        before its next turn (see apply_refreshed_manifests), since the watcher calls it from its own thread"""
+        with self.__refreshed_lock:
+            self.__refreshed.update(agent_names)
+
+    def apply_refreshed_manifests(self):
+        """Apply the queued refreshed manifests to the active session (on the thread of the application)"""
+        with self.__refreshed_lock:
+            (agent_names, self.__refreshed) = (self.__refreshed, set())
+        if self.session and self.session.agent_name in agent_names and self.config.has_manifest(self.session.agent_name):
+            self.session.refresh_manifest(self.config.get_manifest(self.session.agent_name))
+            self._callback("info", f"Reloaded: {self.session.agent_name}")
+
     def _noop(self, callback_type, data):
         pass
 
@@ -101,17 +120,32 @@ class ChatApplication:
                     message_to_append = action_data.get("message")
                     if message_to_append:
                         self.session.append_user_question(message_to_append)
-                        self.process_llm()
+                        self.__call_llm_again = True
                     elif action_data.get("initiate"):
-                        self.process_llm()
+                        self.__call_llm_again = True
+
+    async def aprocess_llm(self) -> AsyncGenerator:
+        """Asynchronous version of process_llm, which yields the chunks of the messages from the LLM"""
+        self.apply_refreshed_manifests()
+        self.__call_llm_again = True
+        while self.__call_llm_again:
+            # an emitted switch_session may ask the newly activated agent to respond
+            self.__call_llm_again = False
+            try:
+                async for message in self.session.call_loop(self._process_event, self.runtime):
+                    yield message
+            except Exception as e:
+                print_error(f"Exception: Restarting the chat :{e}")
+                self.switch_session(self.session.agent_name)
+                if self.config.verbose:
+                    raise
 
     def process_llm(self):
         """It calls the LLM with the current context (system prompt and messages)
         and process the response (such as function call)"""
-        try:
-            self.session.call_loop(self._process_event, self.runtime)
-        except Exception as e:
-            print_error(f"Exception: Restarting the chat :{e}")
-            self.switch_session(self.session.agent_name)
-            if self.config.verbose:
-                raise
+
+        async def consume():
+            async for _ in self.aprocess_llm():
+                pass
+
+        run_sync(consume())
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from typing import TYPE_CHECKING, Optional
 
 from slashgpt.llms.default_config import default_llm_engine_configs, default_llm_models
 from slashgpt.llms.model import LlmModel
-from slashgpt.utils.print import print_warning
+from slashgpt.llms.response_cache import ResponseCache
+from slashgpt.utils.lru import LRUCache
+from slashgpt.utils.print import print_debug, print_warning
 
 if TYPE_CHECKING:
     from slashgpt.manifest import Manifest
@@ -36,6 +40,19 @@ class ChatConfig:
         """collection of LLM model definitions"""
         self.llm_engine_configs = {**default_llm_engine_configs, **llm_engine_configs} if llm_engine_configs else default_llm_engine_configs
         """collection of LLM engine definitions"""
+        self.llm_model_cache: LRUCache = LRUCache(32)
+        """LRU cache of LlmModel instances (and their engines), keyed by the hash of the model definition"""
+        self.__response_cache: Optional[ResponseCache] = None
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """Cache of LLM responses shared by all the models (setting it discards the cached models, so that new ones use it)"""
+        return self.__response_cache
+
+    @response_cache.setter
+    def response_cache(self, response_cache: Optional[ResponseCache]):
+        self.__response_cache = response_cache
+        self.clear_llm_model_cache()
 
     @classmethod
     def __get_default_llm_model_name(cls, llm_models: dict):
@@ -54,9 +71,30 @@ class ChatConfig:
             print_warning(f"ChatConfig: Failed to find the model {llm_model_name}")
             return cls.__get_default_llm_model_name(llm_models)
 
+    def __llm_model_key(self, llm_model_data: dict):
+        engine_config = self.llm_engine_configs.get(llm_model_data.get("engine_name"))
+        data = json.dumps([llm_model_data, repr(engine_config)], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def __create_llm_model(self, llm_model_data: dict):
+        key = self.__llm_model_key(llm_model_data)
+        llm_model = self.llm_model_cache.get(key)
+        if llm_model is None:
+            llm_model = LlmModel(llm_model_data, self.llm_engine_configs, response_cache=self.response_cache)
+            # Do not keep models without an engine, so that a fixed config is picked up next time.
+            if llm_model.engine:
+                self.llm_model_cache.set(key, llm_model)
+        return llm_model
+
+    def clear_llm_model_cache(self):
+        """Discard all cached LLM models (and their engines)"""
+        if self.verbose:
+            print_debug(f"llm_model_cache: {self.llm_model_cache.stats()}")
+        self.llm_model_cache.clear()
+
     def get_default_llm_model(self):
         """Returns the LLM model specified as the default LLM in the llm_models"""
-        return LlmModel(ChatConfig.__get_default_llm_model_name(self.llm_models), self.llm_engine_configs)
+        return self.__create_llm_model(ChatConfig.__get_default_llm_model_name(self.llm_models))
 
     def get_llm_model_from_manifest(self, manifest: Manifest):
         """Returns the LLM model specified in the manifest"""
@@ -69,11 +107,11 @@ class ChatConfig:
             llm_model_name = model
             llm_model = ChatConfig.__search_llm_model(llm_model_name, self.llm_models)
 
-        return LlmModel(llm_model, self.llm_engine_configs)
+        return self.__create_llm_model(llm_model)
 
     def get_llm_model_from_key(self, key: str):
         """Returns a specific LLM model"""
         llm_model = self.llm_models.get(key)
         if llm_model:
-            return LlmModel(llm_model, self.llm_engine_configs)
+            return self.__create_llm_model(llm_model)
         return self.get_default_llm_model()
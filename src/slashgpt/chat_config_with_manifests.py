@@ -1,13 +1,15 @@
-import os
-import re
 import json
-import boto3
-from typing import Optional
+import os
+import threading
+from typing import Callable, Dict, List, Optional
 
 import yaml
 
 from slashgpt.chat_config import ChatConfig
-from slashgpt.utils.print import print_error
+from slashgpt.manifest import Manifest
+from slashgpt.manifest_store import ManifestStore, default_manifest_store
+from slashgpt.manifest_watcher import ManifestWatcher
+from slashgpt.utils.print import print_debug, print_warning
 
 
 class ChatConfigWithManifests(ChatConfig):
@@ -22,6 +24,7 @@ class ChatConfigWithManifests(ChatConfig):
         path_manifests: str,
         llm_models: Optional[dict] = None,
         llm_engine_configs: Optional[dict] = None,
+        manifest_store: Optional[ManifestStore] = None,
     ):
         """
         Args:
@@ -30,33 +33,30 @@ class ChatConfigWithManifests(ChatConfig):
             path_manifests (str): path to the manifests folder (json or yaml)
             llm_models (dict, optional): collection of custom LLM model definitions
             llm_engine_configs (dict, optional): collection of custom LLM engine definitions
+            manifest_store (ManifestStore, optional): store of compiled manifests (process-wide one by default)
         """
         super().__init__(base_path, llm_models, llm_engine_configs)
+        self.manifests_lock = threading.RLock()
+        """Lock, which guards the manifests and the prepared manifests against the watcher thread"""
+        self.manifest_store: ManifestStore = manifest_store or default_manifest_store
+        """Store of compiled manifests, which parses only new or modified files"""
         self.manifests: dict = self.__load_manifests(path_manifests)
         """Set of manifests loaded from the specified folder"""
         self.path_manifests: str = path_manifests
         """Location of the folder where manifests were loaded"""
-
-    @classmethod
-    def __load_manifests(cls, path: str):
-        manifests = {}
-        files = os.listdir(path)
-        for file in files:
-            if re.search(r"\.json$", file):
-                with open(f"{path}/{file}", "r", encoding="utf-8") as f:  # encoding add for Win
-                    try:
-                        manifests[file.split(".")[0]] = json.load(f)
-                    except json.JSONDecodeError:
-                        print_error(file + " is broken")
-            elif re.search(r"\.yml$", file):
-                with open(f"{path}/{file}", "r", encoding="utf-8") as f:  # encoding add for Win
-                    try:
-                        manifests[file.split(".")[0]] = yaml.safe_load(f)
-                    except Exception:
-                        print_error(file + " is broken")
+        self.watcher: Optional[ManifestWatcher] = None
+        """Watcher of the manifest files (only if watch() was called)"""
+        self.__templates: Dict[str, Manifest] = {}
+
+    def __load_manifests(self, path: str):
+        manifests = self.manifest_store.load_folder(path)
+        if self.verbose:
+            print_debug(f"manifest_store: {self.manifest_store.stats()}")
         return manifests
 
     def load_manifests_s3(self, bucket_name: str, prefix: str):
+        import boto3
+
         s3 = boto3.client("s3")
         manifests = {}
 
@@ -91,8 +91,89 @@ class ChatConfigWithManifests(ChatConfig):
         self.reload()
 
     def reload(self):
-        """Reload manifest files"""
-        self.manifests = self.__load_manifests(self.path_manifests)
+        """Reload manifest files (only modified ones are parsed again) and discard cached LLM engines"""
+        manifests = self.__load_manifests(self.path_manifests)
+        with self.manifests_lock:
+            self.manifests = manifests
+            self.__templates = {}
+        self.clear_llm_model_cache()
+
+    def refresh_manifest_file(self, file_path: str) -> Optional[str]:
+        """Reload a single manifest file of the manifests folder (or remove the manifest if the file was deleted)
+
+        Args:
+
+            file_path (str): path to the manifest file (json or yaml)
+
+        Returns:
+
+            str: the name of the manifest (None if the file is broken, in which case the previous manifest is kept)
+        """
+        name = os.path.basename(file_path).split(".")[0]
+        self.manifest_store.forget(file_path)
+        try:
+            data = self.manifest_store.load_file(file_path)
+        except FileNotFoundError:
+            data = None
+        else:
+            if data is None:
+                # e.g, the file is half-written, so keep the last good manifest until the file is fixed
+                print_warning(f"Keeping the previous manifest of {name}")
+                return None
+        with self.manifests_lock:
+            # copy on write, so that the readers iterating the manifests (e.g, the watcher) see a consistent set
+            manifests = dict(self.manifests)
+            if data is not None:
+                manifests[name] = data
+            else:
+                manifests.pop(name, None)
+            self.manifests = manifests
+            self.invalidate_manifest(name)
+        self.manifest_store.save()
+        return name
+
+    def get_manifest(self, key: str) -> Optional[Manifest]:
+        """Returns the prepared Manifest (with parsed functions and a loaded module) of the specified agent.
+        It is created once per version of the manifest; sessions take views of it (see Manifest.view).
+
+        Args:
+
+            key (str): the name of manifest
+        """
+        with self.manifests_lock:
+            data = self.manifests.get(key)
+            if data is None:
+                return None
+            template = self.__templates.get(key)
+            if template is None or template.manifest() is not data:
+                template = Manifest(data, self.base_path, key, self.manifest_store)
+                self.__templates[key] = template
+            return template
+
+    def invalidate_manifest(self, key: str):
+        """Discard the prepared Manifest of the specified agent (e.g, when its functions or module file was modified)"""
+        with self.manifests_lock:
+            self.__templates.pop(key, None)
+
+    def watch(self, callback: Optional[Callable[[List[str]], None]] = None, interval: float = 1.0, polling: bool = False) -> ManifestWatcher:
+        """Start watching the manifest files (and the functions and modules they refer to) to hot-reload them
+
+        Args:
+
+            callback (function, optional): called with the names of refreshed manifests (from the watcher thread)
+            interval (float): polling interval in seconds
+            polling (bool): True to use polling even if inotify is available
+        """
+        if self.watcher is None:
+            self.watcher = ManifestWatcher(self, callback, interval, polling)
+            self.watcher.start()
+        return self.watcher
+
+    def stop_watching(self):
+        """Stop the watcher started by watch()"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
 
     def has_manifest(self, key: str):
         """Check if a manifest file with a specified name exits
@@ -1,13 +1,16 @@
+from __future__ import annotations
+
+import asyncio
 import random
 import re
 import uuid
-from typing import Callable, List, Optional, AsyncGenerator
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, List, Optional
 
 from slashgpt.chat_config import ChatConfig
 from slashgpt.chat_history import ChatHistory
 from slashgpt.dbs.db_base import VectorDBBase
 from slashgpt.function.function_call import FunctionCall
-from slashgpt.function.jupyter_runtime import PythonRuntime
+from slashgpt.history.context import ContextPolicy, get_context_policy
 from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
 from slashgpt.history.storage.memory import ChatHistoryMemoryStorage
 from slashgpt.llms.model import LlmModel
@@ -15,6 +18,9 @@ from slashgpt.llms.model import LlmModel
 from slashgpt.manifest import Manifest
 from slashgpt.utils.print import print_debug, print_error
 
+if TYPE_CHECKING:
+    from slashgpt.function.jupyter_runtime import PythonRuntime
+
 
 class ChatSession:
     """It represents a chat session with a particular AI agent."""
@@ -38,6 +44,7 @@ class ChatSession:
             default_llm_model (LlmModel, optional): Default LLM model
             user_id (str, optional): User Id (for history)
             history_engine (ChatHistoryAbstractStorage, optional): Histroy engine
+            manifest (dict or Manifest, optional): Manifest definition, or a prepared Manifest to take a view of
             agent_name (str, optional): Display name of agent
             intro (bool, optional): True if the introduction message should be appended.
             restore (bool, optional): True if we are restoring an existing session.
@@ -47,7 +54,11 @@ class ChatSession:
         """Configuration Object (ChatConfig), which specifies accessible LLM models"""
         self.agent_name: str = agent_name
         """Display name of the AI agent (str)"""
-        self.manifest: Manifest = Manifest(manifest if manifest else {}, config.base_path, agent_name)
+        if isinstance(manifest, Manifest):
+            # a cheap view of the prepared manifest (see ChatConfigWithManifests.get_manifest)
+            self.manifest: Manifest = manifest.view(agent_name)
+        else:
+            self.manifest = Manifest(manifest if manifest else {}, config.base_path, agent_name, getattr(config, "manifest_store", None))
         """Manifest which specifies the behavior of the AI agent (Manifest)"""
         self.user_id: str = user_id if user_id else str(uuid.uuid4())
         """Specified user id or randomly generated uuid (str)"""
@@ -88,6 +99,18 @@ class ChatSession:
         self.intro_message: Optional[str] = self.__set_intro(intro)
         """Introduction message (str, optional)"""
 
+        self.context_policy: ContextPolicy = get_context_policy(self.manifest)
+        """Policy which selects the messages sent to the LLM ("history_type" of the manifest)"""
+
+        self.on_llm_call: Optional[Callable[[List[dict]], None]] = None
+        """Function called with the messages sent to the LLM on each call (e.g, to count the prompt tokens, optional)"""
+
+    def refresh_manifest(self, manifest: Manifest):
+        """Apply the updated manifest (e.g, hot-reloaded) to this session, keeping the history as it is"""
+        self.manifest = manifest.view(self.agent_name)
+        self.functions = self.manifest.functions()
+        self.context_policy = get_context_policy(self.manifest, self.context_policy)
+
     def set_llm_model(self, llm_model: LlmModel):
         """Set the LLM model"""
         if llm_model.check_api_key():
@@ -119,15 +142,25 @@ class ChatSession:
         message = self.manifest.format_question(message)
         self.append_message("user", message, False)
         if self.vector_db:
-            articles = self.vector_db.fetch_related_articles(self.history.messages(), self.llm_model)
-            assert self.history.get_message_prop(0, "role") == "system", "Missing system message"
-            self.history.set_message(
-                0,
-                {
-                    "role": "system",
-                    "content": re.sub("\\{articles\\}", articles, self.prompt, 1),
-                },
-            )
+            self.__set_articles(self.vector_db.fetch_related_articles(self.history.messages(), self.llm_model))
+
+    async def aappend_user_question(self, message: str):
+        """Asynchronous version of append_user_question, which does not block the event loop during RAG"""
+        message = self.manifest.format_question(message)
+        self.append_message("user", message, False)
+        if self.vector_db:
+            self.__set_articles(await self.vector_db.afetch_related_articles(self.history.messages(), self.llm_model))
+
+    def __set_articles(self, articles: str):
+        assert self.history.get_message_prop(0, "role") == "system", "Missing system message"
+        self.history.set_message(
+            0,
+            {
+                "role": "system",
+                "content": re.sub("\\{articles\\}", articles, self.prompt, 1),
+                "preset": True,
+            },
+        )
 
     def __set_intro(self, use_intro: bool):
         intro_message = None
@@ -162,57 +195,70 @@ class ChatSession:
         Let the LLM generate a response based on the messages in this session.
         The application typically calls call_loop method instead.
 
-        Returns:
+        Yields:
 
-            role (str): "assistant"
-            res (str): message
-            function_call (dict): json representing the function call (optional)
+            str (a chunk of the message) or FunctionCall
         """
-        messages = self.history.messages()
-        if self.manifest.stream() is False:
-            async for message in self.llm_model.generate_response(messages, self.manifest, self.config.verbose):
-                yield message
-        else:
-            collected_messages = []
-            async for message in self.llm_model.generate_response(messages, self.manifest, self.config.verbose):
-                collected_messages.append(messages)
-                yield message
+        messages = await self.context_policy.select(self.history, self.llm_model, self.config.verbose)
+        if self.on_llm_call:
+            self.on_llm_call(messages)
+        async for message in self.llm_model.generate_response(messages, self.manifest, self.config.verbose, self.user_id):
+            yield message
 
-    async def call_loop(self, callback: Callable[[str, tuple[str, dict]], None], runtime: PythonRuntime = None) -> AsyncGenerator:
+    async def call_loop(self, callback: Callable[[str, tuple[str, dict]], None], runtime: PythonRuntime = None, depth: int = 0) -> AsyncGenerator:
         """
         Calls the LLM and process the response (functions calls).
-        It may call itself recursively if necessary.
+        It streams the chunks of the message, and calls itself recursively after function calls
+        (up to manifest.max_call_depth() times) so that the LLM can respond to their results.
+        Independent function calls in one response are executed concurrently.
+        Calls of emit-style actions are passed to the application (in the order of the calls) after the others,
+        and the loop stops there, because the application takes over the conversation.
         """
-        function_call = None
+        function_calls: List[FunctionCall] = []
         collected_messages = []
         async for message in self.call_llm():
-            if type(message) is str:
+            if isinstance(message, str):
                 collected_messages.append(message)
                 yield message
-            elif type(message) is FunctionCall:
-                function_call = message
-                break
+            elif isinstance(message, FunctionCall):
+                function_calls.append(message)
+
+        res = "".join(collected_messages)
+        if res:
+            self.append_message("assistant", res, False)
+            callback("bot", res)
+
+        if not function_calls:
+            return
 
-        if function_call:
-            # Check if this function needs to be processed by the application (emit style)
+        # Separate the functions to be processed by the application (emit style)
+        emits = []
+        calls: List[FunctionCall] = []
+        for function_call in function_calls:
             (action_data, action_method) = function_call.get_emit_data(self.config.verbose)
             if action_method:
-                # Yes, let the application process it
-                callback("emit", (action_method, action_data))
+                emits.append((action_method, action_data))
             else:
-                # No, process it by calling its process_function_call method.
-                (
-                    function_message,
-                    function_name,
-                ) = function_call.process_function_call(
-                    self.history,
-                    runtime,
-                    self.config.verbose,
-                )
-
-                # We've made the function API call, now can stream the rest of the LLM work
-                self.manifest._Manifest__manifest["stream"] = True  # TODO: better method of changing stream setting
-                if function_message:
-                    callback("function", (function_name, function_message))
-
-                self.call_loop(callback, runtime)
+                calls.append(function_call)
+
+        # Execute the others concurrently, and append the results in the order of the calls.
+        last_message = self.history.last_message()
+        results = await asyncio.gather(*[function_call.aprocess_function_call(last_message, runtime, self.config.verbose) for function_call in calls])
+        for function_call, (function_message, function_name, code_message) in zip(calls, results):
+            function_call.append_result(self.history, function_message, function_name, code_message)
+            if function_message:
+                callback("function", (function_name, function_message))
+
+        if emits:
+            # let the application process them
+            for action_method, action_data in emits:
+                callback("emit", (action_method, action_data))
+            return
+
+        has_result = any(function_message for (function_message, _, _) in results)
+        if has_result and not self.manifest.skip_function_result():
+            if depth + 1 < self.manifest.max_call_depth():
+                async for message in self.call_loop(callback, runtime, depth + 1):
+                    yield message
+            elif self.config.verbose:
+                print_debug(f"call_loop: reached the maximum depth ({self.manifest.max_call_depth()})")
@@ -5,12 +5,12 @@ import json
 import os
 import sys
 
-from slashgpt.llms.engine.google import LLMEngineGoogle
+from slashgpt.llms.response_cache import ResponseCache, default_response_cache_path
 from slashgpt.SlashGPT import ChatSlashConfig, SlashGPT
 from slashgpt.utils.help import ONELINE_HELP
 
 my_llm_engine_configs = {
-    "palm": LLMEngineGoogle,
+    "palm": {"module_name": "slashgpt.llms.engine.google", "class_name": "LLMEngineGoogle"},
 }
 
 my_llm_models = {
@@ -28,6 +28,10 @@ def cli(base_dir: str = ""):
     parser.add_argument("--agent", default="dispatcher")
     parser.add_argument("--llm-config")
     parser.add_argument("--run")
+    parser.add_argument("--watch", action="store_true", help="hot-reload manifests (and their functions and modules) when they are modified")
+    parser.add_argument(
+        "--response-cache", action="store_true", help="replay the responses to identical requests (stored in filememory/llm_cache.db)"
+    )
 
     args = parser.parse_args()
 
@@ -47,8 +51,13 @@ def cli(base_dir: str = ""):
     else:
         config = ChatSlashConfig(current_dir, current_dir + "/" + dir, my_llm_models, my_llm_engine_configs)
 
+    if args.response_cache:
+        config.response_cache = ResponseCache(db_path=default_response_cache_path)
+
     print(ONELINE_HELP)
     main = SlashGPT(config, manifests_manager, args.agent)
+    if args.watch:
+        config.watch(main.app.refresh_manifests)
     if args.autotest:
         main.talk("/autotest")
         main.talk("/bye")
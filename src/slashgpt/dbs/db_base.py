@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABCMeta, abstractmethod
 from typing import List
 
@@ -24,6 +25,18 @@ class VectorDBBase(metaclass=ABCMeta):
         results = self.fetch_data(query_embedding)
         return self.results_to_articles(results, query, messages, llm_model)
 
+    async def afetch_related_articles(self, messages: List[dict], llm_model: LlmModel) -> str:
+        """Asynchronous version of fetch_related_articles, which does not block the event loop"""
+        query = self.messages_to_query(messages)
+        query_embedding = await self.aquery_to_vector(query)
+        results = await self.afetch_data(query_embedding)
+        return self.results_to_articles(results, query, messages, llm_model)
+
+    async def afetch_data(self, query_embedding: List[float]) -> List[str]:
+        """Asynchronous version of fetch_data. Override it if the database has an asynchronous client
+        (by default, fetch_data runs in a worker thread)."""
+        return await asyncio.to_thread(self.fetch_data, query_embedding)
+
     def messages_to_query(self, messages: List[dict]) -> str:
         query = ""
         for message in messages:
@@ -34,5 +47,8 @@ class VectorDBBase(metaclass=ABCMeta):
     def query_to_vector(self, query: str) -> List[float]:
         return self.vectorEngine.query_to_vector(query)
 
+    async def aquery_to_vector(self, query: str) -> List[float]:
+        return await asyncio.to_thread(self.query_to_vector, query)
+
     def results_to_articles(self, results: List[str], query: str, messages: List[dict], llm_model: LlmModel) -> str:
         return self.vectorEngine.results_to_articles(results, query, messages, llm_model)
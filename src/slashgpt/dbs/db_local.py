@@ -0,0 +1,259 @@
+import json
+import os
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("no db_local related module. pip install numpy")
+
+from slashgpt.dbs.db_base import VectorDBBase
+from slashgpt.dbs.vector_engine import VectorEngine
+from slashgpt.utils.lru import LRUCache
+from slashgpt.utils.print import print_error, print_info
+
+SEARCH_CHUNK = 65536
+"""Number of rows scored at once by the brute-force search (bounds the memory used for scores)"""
+
+DEFAULT_NPROBE = 8
+"""Default number of IVF lists to search. Each manifest may override it with "nprobe" of embeddings."""
+
+__indices = LRUCache(16)
+
+
+class LocalVectorIndex:
+    """Vector index in a local folder, searched in-process with NumPy (no database service).
+
+    Files:
+
+        meta.json       {"dim", "count", "ivf": {"nlist"} or null}
+        vectors.f32     float32 matrix (count x dim) of unit vectors, memory-mapped for search
+        texts.jsonl     text of each vector (one JSON string per line)
+        offsets.i64     byte offset of each line of texts.jsonl
+        centroids.f32, ivf_lists.i64, ivf_offsets.i64  optional IVF index (see build_ivf)
+
+    Vectors are normalized when they are added, so the cosine similarity is a dot product.
+    It assumes a single writer (add and build_ivf) at a time.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+
+            path (str): folder of the index (created by add if it does not exist)
+        """
+        self.path = path
+        self.meta: dict = {"dim": 0, "count": 0, "ivf": None}
+        """Dimension, number of vectors and IVF parameters"""
+        self.__mtime_ns = 0
+        self.__vectors = None
+        self.__offsets = None
+        self.__ivf = None
+        self.refresh()
+
+    def __file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def refresh(self):
+        """Reopen the files if they were modified (e.g, by another process) since they were opened"""
+        try:
+            mtime_ns = os.stat(self.__file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime_ns != self.__mtime_ns:
+            with open(self.__file("meta.json"), "r") as f:
+                self.meta = json.load(f)
+            self.__mtime_ns = mtime_ns
+            self.__vectors = None
+            self.__offsets = None
+            self.__ivf = None
+
+    def __save_meta(self):
+        temp_path = self.__file("meta.json.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, self.__file("meta.json"))
+        self.__mtime_ns = os.stat(self.__file("meta.json")).st_mtime_ns
+        self.__vectors = None
+        self.__offsets = None
+        self.__ivf = None
+
+    def __len__(self) -> int:
+        return self.meta["count"]
+
+    def vectors(self):
+        """Returns the (count x dim) matrix memory-mapped from vectors.f32"""
+        if self.__vectors is None and len(self) > 0:
+            self.__vectors = np.memmap(self.__file("vectors.f32"), dtype=np.float32, mode="r", shape=(len(self), self.meta["dim"]))
+        return self.__vectors
+
+    def add(self, vectors, texts: Sequence[str]):
+        """Append vectors and their texts (it invalidates the IVF index, call build_ivf again if necessary)
+
+        Args:
+
+            vectors (array-like): (n x dim) matrix or a list of vectors
+            texts (list of str): texts of the vectors
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if len(matrix) != len(texts):
+            raise ValueError(f"LocalVectorIndex: {len(matrix)} vectors for {len(texts)} texts")
+        if self.meta["dim"] and matrix.shape[1] != self.meta["dim"]:
+            raise ValueError(f"LocalVectorIndex: dimension {matrix.shape[1]} (expected {self.meta['dim']})")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.__file("vectors.f32"), "ab") as f:
+            f.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        offsets = []
+        with open(self.__file("texts.jsonl"), "ab") as f:
+            position = f.tell()
+            for text in texts:
+                line = (json.dumps(text, ensure_ascii=False) + "\n").encode()
+                offsets.append(position)
+                f.write(line)
+                position += len(line)
+        with open(self.__file("offsets.i64"), "ab") as f:
+            f.write(np.array(offsets, dtype=np.int64).tobytes())
+        self.meta = {"dim": int(matrix.shape[1]), "count": len(self) + len(matrix), "ivf": None}
+        self.__save_meta()
+
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 10, sample_size: int = 256, seed: int = 0):
+        """Cluster the vectors with spherical k-means, so that search scores only the nprobe nearest lists
+
+        Args:
+
+            nlist (int, optional): number of lists (sqrt of the number of vectors by default)
+            iterations (int): iterations of k-means
+            sample_size (int): number of vectors per list used to train the centroids
+            seed (int): random seed
+        """
+        vectors = self.vectors()
+        if vectors is None:
+            return
+        nlist = max(1, min(nlist or int(np.sqrt(len(self))), len(self)))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(vectors[np.sort(rng.choice(len(self), min(len(self), nlist * sample_size), replace=False))])
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(labels, minlength=nlist)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.zeros_like(centroids)
+            sums[counts > 0] = np.add.reduceat(sample[np.argsort(labels, kind="stable")], starts[counts > 0], axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # a list without any vector keeps its centroid
+            centroids = np.where(norms > 0, sums / np.where(norms == 0, 1, norms), centroids)
+
+        labels = np.concatenate(
+            [np.argmax(vectors[start : start + SEARCH_CHUNK] @ centroids.T, axis=1) for start in range(0, len(self), SEARCH_CHUNK)]
+        )
+        lists = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))]).astype(np.int64)
+        centroids.astype(np.float32).tofile(self.__file("centroids.f32"))
+        lists.tofile(self.__file("ivf_lists.i64"))
+        offsets.tofile(self.__file("ivf_offsets.i64"))
+        self.meta["ivf"] = {"nlist": nlist}
+        self.__save_meta()
+
+    def __ivf_index(self):
+        if self.__ivf is None and self.meta.get("ivf"):
+            nlist = self.meta["ivf"]["nlist"]
+            centroids = np.fromfile(self.__file("centroids.f32"), dtype=np.float32).reshape(nlist, self.meta["dim"])
+            lists = np.memmap(self.__file("ivf_lists.i64"), dtype=np.int64, mode="r")
+            offsets = np.fromfile(self.__file("ivf_offsets.i64"), dtype=np.int64)
+            self.__ivf = (centroids, lists, offsets)
+        return self.__ivf
+
+    @classmethod
+    def __top(cls, scores, top_k: int):
+        if len(scores) > top_k:
+            candidates = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def search(self, query: Sequence[float], top_k: int = 5, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Returns [(row, cosine similarity)] of the top_k vectors most similar to the query
+
+        Args:
+
+            query (list of float): query vector
+            top_k (int): number of results
+            nprobe (int, optional): number of IVF lists to search (the whole index is scored if there is no IVF index or nprobe is 0)
+        """
+        self.refresh()
+        vectors = self.vectors()
+        if vectors is None or top_k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        q = q / (np.linalg.norm(q) or 1)
+
+        ivf = self.__ivf_index() if nprobe != 0 else None
+        if ivf:
+            (centroids, lists, offsets) = ivf
+            probes = self.__top(centroids @ q, nprobe or DEFAULT_NPROBE)
+            rows = np.sort(np.concatenate([lists[offsets[c] : offsets[c + 1]] for c in probes]))
+            scores = vectors[rows] @ q
+            best = self.__top(scores, top_k)
+            return [(int(rows[i]), float(scores[i])) for i in best]
+
+        candidate_rows = []
+        candidate_scores = []
+        for start in range(0, len(self), SEARCH_CHUNK):
+            scores = vectors[start : start + SEARCH_CHUNK] @ q
+            best = self.__top(scores, top_k)
+            candidate_rows.append(best + start)
+            candidate_scores.append(scores[best])
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        best = self.__top(scores, top_k)
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def texts(self, rows: Sequence[int]) -> List[str]:
+        """Returns the texts of the rows"""
+        if self.__offsets is None:
+            self.__offsets = np.memmap(self.__file("offsets.i64"), dtype=np.int64, mode="r", shape=(len(self),))
+        results = []
+        with open(self.__file("texts.jsonl"), "rb") as f:
+            for row in rows:
+                f.seek(int(self.__offsets[row]))
+                results.append(json.loads(f.readline()))
+        return results
+
+
+def get_local_index(path: str) -> LocalVectorIndex:
+    """Returns the index of the folder, which is shared by all the sessions (memory maps are opened once)"""
+    return __indices.get_or_create(os.path.abspath(path), lambda: LocalVectorIndex(path))
+
+
+class DBLocal(VectorDBBase):
+    """Local vector database (db_type: local), which needs only NumPy.
+
+    The embeddings block of the manifest may specify:
+
+        name (str): name of the index (a folder in db_path)
+        db_path (str, optional): folder of the indices (~/.slashgpt/local-db by default)
+        top_k (int, optional): number of articles to fetch (5 by default)
+        nprobe (int, optional): number of IVF lists to search, if the index has an IVF index (8 by default, 0 to score all)
+    """
+
+    def __init__(self, embeddings: dict, vector_engine: VectorEngine, verbose: bool):
+        super().__init__(embeddings, vector_engine, verbose)
+        db_path = embeddings.get("db_path") if embeddings.get("db_path") else os.path.normpath(os.path.expanduser("~/.slashgpt/local-db"))
+        table_name = embeddings.get("name")
+        if not table_name or not os.path.isdir(os.path.join(db_path, table_name)):
+            print_error(f"no local index {table_name} in {db_path}")
+            raise RuntimeError("DBLocal: no index")
+        self.index: LocalVectorIndex = get_local_index(os.path.join(db_path, table_name))
+        self.top_k: int = int(embeddings.get("top_k", 5))
+        self.nprobe: Optional[int] = embeddings.get("nprobe")
+
+    def fetch_data(self, query_embedding: List[float]) -> List[str]:
+        results = self.index.search(query_embedding, self.top_k, self.nprobe)
+        if self.verbose:
+            print_info(f"DBLocal: {results}")
+        return self.index.texts([row for (row, _) in results])
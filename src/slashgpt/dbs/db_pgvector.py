@@ -1,62 +1,107 @@
 import os
-from typing import List
+from typing import List, Optional
 
 try:
     import numpy as np
-    import psycopg2
-    from pgvector.psycopg2 import register_vector
-    from psycopg2.extensions import AsIs
+    from psycopg import sql
 except ImportError:
-    print("no db_pgvector related module. pip install psycopg2-binary pgvector numpy")
+    print("no db_pgvector related module. pip install psycopg[binary] psycopg_pool pgvector numpy")
 
 from slashgpt.dbs.db_base import VectorDBBase
 from slashgpt.dbs.vector_engine import VectorEngine
+from slashgpt.llms.transport import TransportRegistry, default_transport
 from slashgpt.utils.print import print_error, print_info
 
+DISTANCE_OPERATORS = {"cosine": "<=>", "l2": "<->", "inner_product": "<#>"}
+"""pgvector distance operators, which the "distance" property of embeddings chooses from"""
+
+DEFAULT_TOP_K = 5
+"""Default number of articles to fetch. Each manifest may override it with "top_k" of embeddings."""
+
 
 class DBPgVector(VectorDBBase):
-    def __init__(self, embeddings: dict, vector_engine: VectorEngine, verbose: bool):
+    """pgvector backend, which queries through a connection pool shared by all the sessions
+    (an asynchronous pool per event loop, and a synchronous pool for fetch_data).
+
+    The embeddings block of the manifest may specify:
+
+        name (str): table name (e.g, "articles" or "public.articles"), which has id, text and embedding columns
+        top_k (int, optional): number of articles to fetch (5 by default)
+        distance (str, optional): "cosine" (default), "l2" or "inner_product" (must match the operator class of the index)
+        ef_search (int, optional): hnsw.ef_search for an HNSW index
+        probes (int, optional): ivfflat.probes for an IVFFlat index
+        pool (dict, optional): {"min_size": 1, "max_size": 10} of the connection pool
+    """
+
+    def __init__(self, embeddings: dict, vector_engine: VectorEngine, verbose: bool, transport: Optional[TransportRegistry] = None):
         postgresql_config = os.getenv("POSTGRESQL_CONFIG", None)
         if postgresql_config is None:
             print_error("POSTGRESQL_CONFIG environment variable is missing from .env")
             raise RuntimeError("DBPgVector POSTGRESQL_CONFIG environment variable is missing")
 
         super().__init__(embeddings, vector_engine, verbose)
-        self.conn = psycopg2.connect(postgresql_config)
-        register_vector(self.conn)
+        self.conninfo: str = postgresql_config
+        self.transport: TransportRegistry = transport or default_transport
+        """Registry of the connection pools"""
+        self.top_k: int = int(embeddings.get("top_k", DEFAULT_TOP_K))
+        distance = embeddings.get("distance", "cosine")
+        if distance not in DISTANCE_OPERATORS:
+            raise ValueError(f"DBPgVector: unknown distance {distance} (one of {', '.join(DISTANCE_OPERATORS.keys())})")
+        self.settings: List[tuple] = [
+            (name, str(embeddings[key])) for (key, name) in [("ef_search", "hnsw.ef_search"), ("probes", "ivfflat.probes")] if embeddings.get(key)
+        ]
+        """Index parameters, which are set for each query (in its transaction)"""
+        metadata = embeddings.get("metadata")
+        self.storage_id: str = metadata.get("storage_id", "") if metadata else ""
 
-    def fetch_data(self, query_embedding: List[float]) -> List[str]:
-        cur = self.conn.cursor()
-        metadata = self.embeddings.get("metadata")
-        storage_id = metadata.get("storage_id") if metadata else ""
-        table_name = self.embeddings.get("name")
-
-        if storage_id == "":
-            sql = "SELECT id, text FROM %s ORDER BY embedding <=> %s LIMIT 5"
-            cur.execute(
-                sql,
-                (
-                    AsIs(table_name),
-                    np.array(query_embedding),
-                ),
-            )
-        else:
-            sql = "SELECT id, text FROM %s where storage_id = %s ORDER BY embedding <=> %s LIMIT 5"
-            cur.execute(
-                sql,
-                (
-                    AsIs(table_name),
-                    storage_id,
-                    np.array(query_embedding),
-                ),
-            )
+        # The query is composed once per table, and prepared on each pooled connection
+        table = sql.Identifier(*embeddings.get("name", "").split("."))
+        where = sql.SQL("WHERE storage_id = %(storage_id)s ") if self.storage_id else sql.SQL("")
+        self.query = sql.SQL("SELECT id, text FROM {table} {where}ORDER BY embedding {operator} %(embedding)s LIMIT %(top_k)s").format(
+            table=table, where=where, operator=sql.SQL(DISTANCE_OPERATORS[distance])
+        )
+
+    def __pool_size(self) -> tuple:
+        pool_config = self.embeddings.get("pool") or {}
+        return (pool_config.get("min_size", 1), pool_config.get("max_size", 10))
+
+    def __params(self, query_embedding: List[float]) -> dict:
+        return {"embedding": np.array(query_embedding, dtype=np.float32), "top_k": self.top_k, "storage_id": self.storage_id}
+
+    def pool(self):
+        return self.transport.pg_pool(self.conninfo, *self.__pool_size())
+
+    def sync_pool(self):
+        return self.transport.pg_sync_pool(self.conninfo, *self.__pool_size())
+
+    async def afetch_data(self, query_embedding: List[float]) -> List[str]:
+        pool = self.pool()
+        await pool.open()
+        async with pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    for name, value in self.settings:
+                        await cur.execute("SELECT set_config(%s, %s, true)", (name, value))
+                    await cur.execute(self.query, self.__params(query_embedding), prepare=True)
+                    response = await cur.fetchall()
+        results = [data[1] for data in response]
         if self.verbose:
-            print_info(sql)
+            print_info(results)
+        return results
 
-        response = cur.fetchall()
-        results = []
-        for data in response:
-            results.append(data[1])
+    def fetch_data(self, query_embedding: List[float]) -> List[str]:
+        # Synchronous callers use a synchronous pool, because an asynchronous one is bound to the event loop
+        # (run_sync inside a running loop would create a pool on a throwaway loop every time).
+        pool = self.sync_pool()
+        pool.open()
+        with pool.connection() as conn:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    for name, value in self.settings:
+                        cur.execute("SELECT set_config(%s, %s, true)", (name, value))
+                    cur.execute(self.query, self.__params(query_embedding), prepare=True)
+                    response = cur.fetchall()
+        results = [data[1] for data in response]
         if self.verbose:
             print_info(results)
         return results
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence
+
+from slashgpt.utils.tiered_cache import TieredCache
+
+default_embedding_cache_path = os.getenv("EMBEDDING_CACHE_PATH")
+"""Location of the on-disk tier of the process-wide cache (no disk tier unless EMBEDDING_CACHE_PATH is set)"""
+
+
+class EmbeddingCache(TieredCache):
+    """Cache of embedding vectors, keyed by (model, text hash).
+
+    Vectors live in an in-memory LRU (as tuples), and optionally in a SQLite table shared by processes and restarts.
+    Embeddings are deterministic for a model, so entries never expire.
+    """
+
+    def __init__(self, maxsize: int = 4096, db_path: Optional[str] = None):
+        """
+        Args:
+
+            maxsize (int): maximum number of vectors in memory
+            db_path (str, optional): location of the on-disk tier (no disk tier if not specified)
+        """
+        super().__init__(maxsize, db_path, "embedding_cache")
+
+    @classmethod
+    def key(cls, model: str, text: str) -> str:
+        """Returns the cache key of a text embedded by the model"""
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        """Returns the cached vector or None"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Returns {key: vector} of the cached vectors (looking up the on-disk tier once for all the misses)"""
+        results = {}
+        misses = []
+        for key in keys:
+            vector = self.memory.get(key)
+            if vector is None:
+                misses.append(key)
+            else:
+                results[key] = list(vector)
+        if misses and self.disk:
+            for key, (data, _) in self.disk.get_many(misses).items():
+                vector = json.loads(data)
+                self.disk_hits += 1
+                self.memory.set(key, tuple(vector))
+                results[key] = vector
+        return results
+
+    def set(self, key: str, vector: List[float]):
+        """Stores the vector"""
+        self.set_many({key: vector})
+
+    def set_many(self, vectors: Dict[str, List[float]]):
+        """Stores {key: vector} (in a single transaction of the on-disk tier)"""
+        for key, vector in vectors.items():
+            self.memory.set(key, tuple(vector))
+        if self.disk:
+            self.disk.set_many({key: json.dumps(list(vector)) for key, vector in vectors.items()})
+
+
+default_embedding_cache = EmbeddingCache(db_path=default_embedding_cache_path)
+"""The process-wide cache of embedding vectors"""
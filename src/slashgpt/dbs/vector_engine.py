@@ -13,6 +13,10 @@ class VectorEngine(metaclass=ABCMeta):
     def query_to_vector(self, query: str) -> List[float]:
         pass
 
+    def texts_to_vectors(self, texts: List[str]) -> List[List[float]]:
+        """Returns the vectors of the texts (for ingestion). Override it if the engine supports batched requests."""
+        return [self.query_to_vector(text) for text in texts]
+
     @abstractmethod
     def results_to_articles(self, results: List[str], query: str, messages: List[dict], llm_model: LlmModel) -> str:
         pass
@@ -1,36 +1,60 @@
 import os
-from typing import List
+from typing import List, Optional
 
 import openai
 
+from slashgpt.dbs.embedding_cache import EmbeddingCache, default_embedding_cache
 from slashgpt.dbs.vector_engine import VectorEngine
 from slashgpt.llms.model import LlmModel
 from slashgpt.utils.print import print_debug
 
+EMBEDDING_BATCH_SIZE = 2048
+"""Maximum number of inputs of a single embeddings request"""
+
 
 class VectorEngineOpenAI(VectorEngine):
-    def __init__(self, verbose: bool):
+    def __init__(self, verbose: bool, cache: Optional[EmbeddingCache] = None):
         self.__EMBEDDING_MODEL = os.getenv("PINECONE_EMBEDDING_MODEL", "text-embedding-ada-002")
         self.__verbose = verbose
+        self.cache: EmbeddingCache = cache or default_embedding_cache
+        """Cache of the vectors (the process-wide cache by default)"""
 
     def query_to_vector(self, query: str) -> List[float]:
-        query_embedding_response = openai.embeddings.create(
-            model=self.__EMBEDDING_MODEL,
-            input=query,
-        )
-        return query_embedding_response.data[0].embedding
+        return self.texts_to_vectors([query])[0]
+
+    def texts_to_vectors(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+        """Returns the vectors of the texts, embedding only the ones not in the cache (batch_size texts per request)"""
+        keys = [EmbeddingCache.key(self.__EMBEDDING_MODEL, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        # each distinct text is embedded once
+        missing = list({key: text for key, text in zip(keys, texts) if key not in vectors}.items())
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            response = openai.embeddings.create(
+                model=self.__EMBEDDING_MODEL,
+                input=[text for (_, text) in batch],
+            )
+            embedded = {batch[data.index][0]: data.embedding for data in response.data}
+            self.cache.set_many(embedded)
+            vectors.update(embedded)
+        if self.__verbose:
+            print_debug(f"embeddings: {len(texts) - len(missing)}/{len(texts)} cached, {self.cache.stats()}")
+        return [vectors[key] for key in keys]
 
     def results_to_articles(self, results: List[str], query: str, messages: List[dict], llm_model: LlmModel) -> str:
         articles = ""
         count = 0
         message = self.__join_messages(messages)
-        for article in results:
-            article_with_section = f'{article}\n"""'
-            if llm_model.is_within_budget(articles + article_with_section + query + message, self.__verbose):
-                count += 1
-                articles += article_with_section
-            else:
-                break
+        # Count the query and the messages once, then each article once (instead of re-encoding the concatenation)
+        budget = llm_model.token_budget()
+        if budget.add(query) and budget.add(message):
+            for article in results:
+                article_with_section = f'{article}\n"""'
+                if budget.add(article_with_section):
+                    count += 1
+                    articles += article_with_section
+                else:
+                    break
         if self.__verbose:
             print_debug(f"Articles:{count}")
         return articles
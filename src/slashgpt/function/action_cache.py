@@ -0,0 +1,70 @@
+import hashlib
+import json
+import time
+from typing import Optional
+
+from slashgpt.utils.tiered_cache import TieredCache
+
+default_action_cache_path = "filememory/action_cache.db"
+"""Location of the on-disk tier, used by the actions with "persist": true in their "cache" property"""
+
+
+class ActionCache(TieredCache):
+    """Response cache of function actions (REST and GraphQL), keyed by (url, method, normalized arguments).
+
+    It is opt-in for each action with the "cache" property in the "actions" block of the manifest. For example,
+
+        "cache": {"ttl": 3600, "persist": true}
+
+    Responses live in an in-memory LRU, and optionally in a SQLite table shared by processes and restarts.
+    Expired entries are dropped lazily, when they are looked up.
+    """
+
+    def __init__(self, maxsize: int = 1024, db_path: str = default_action_cache_path):
+        """
+        Args:
+
+            maxsize (int): maximum number of responses in memory, which are held as (expires_at, response)
+            db_path (str): location of the on-disk tier (opened on the first persistent write or lookup)
+        """
+        super().__init__(maxsize, db_path, "action_cache")
+        self.expired = 0
+        """Number of expired entries found by lookups in memory"""
+
+    @classmethod
+    def key(cls, url: str, method: str, arguments) -> str:
+        """Returns the cache key of a call (arguments are normalized by sorting the keys)"""
+        normalized = json.dumps([url, (method or "GET").upper(), arguments], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, persist: bool = False) -> Optional[str]:
+        """Returns the cached response or None (looking up the on-disk tier if persist is True)"""
+        entry = self.memory.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                return entry[1]
+            self.memory.pop(key)
+            self.expired += 1
+        if persist and self.disk:
+            row = self.disk.get(key)
+            if row is not None:
+                (response, expires_at) = row
+                self.disk_hits += 1
+                self.memory.set(key, (expires_at, response))
+                return response
+        return None
+
+    def set(self, key: str, response: str, ttl: float, persist: bool = False):
+        """Stores the response for ttl seconds (in the on-disk tier as well if persist is True)"""
+        expires_at = time.time() + ttl
+        self.memory.set(key, (expires_at, response))
+        if persist and self.disk:
+            self.disk.set(key, response, expires_at)
+
+    def stats(self) -> dict:
+        """Returns the statistics of this cache (for verbose mode)"""
+        return {**super().stats(), "expired": self.expired + (self.disk.expired if self.disk else 0)}
+
+
+default_action_cache = ActionCache()
+"""The process-wide cache of action responses"""
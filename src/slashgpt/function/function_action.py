@@ -3,7 +3,8 @@ import os
 import re
 from urllib.parse import quote_plus, urlparse
 
-from slashgpt.function.network import graphQLRequest, http_request, isLoadedGQL
+from slashgpt.function.action_cache import ActionCache, default_action_cache
+from slashgpt.function.network import async_graphql_request, async_http_request, graphQLRequest, http_request, isLoadedGQL
 from slashgpt.utils.print import print_debug, print_error, print_function
 from slashgpt.utils.utils import CallType
 
@@ -53,8 +54,46 @@ class FunctionAction:
         data = self.__get("emit_data")
         return {x: format(data.get(x)) for x in data}
 
+    def __cache_key(self, arguments: dict):
+        # only REST and GraphQL actions with the "cache" property are cached
+        cache = self.__get("cache")
+        type = self.__call_type()
+        if isinstance(cache, dict) and cache.get("ttl") and type in [CallType.REST, CallType.GRAPHQL]:
+            method = self.__get("method") or ("POST" if type == CallType.GRAPHQL else "GET")
+            return ActionCache.key(self.__get("url"), method, arguments)
+        return None
+
+    def __cached_response(self, key: str, name: str, verbose: bool):
+        response = default_action_cache.get(key, self.__get("cache").get("persist", False))
+        if verbose:
+            print_debug(f"action cache {'hit' if response is not None else 'miss'} ({name}): {default_action_cache.stats()}")
+        return response
+
+    def __store_response(self, key: str, response):
+        if not isinstance(response, str):
+            return
+        if self.__call_type() == CallType.GRAPHQL:
+            # errors of GraphQL calls are returned as (non-JSON) strings, which should not be cached
+            try:
+                json.loads(response)
+            except json.JSONDecodeError:
+                return
+        cache = self.__get("cache")
+        default_action_cache.set(key, response, cache.get("ttl"), cache.get("persist", False))
+
     def call_api(self, name: str, arguments: dict, base_dir: str, verbose: bool):
-        """Execute a function appropriately for each CallType"""
+        """Execute a function appropriately for each CallType (or returns the cached response)"""
+        key = self.__cache_key(arguments)
+        if key:
+            response = self.__cached_response(key, name, verbose)
+            if response is not None:
+                return response
+        response = self.__call_api(name, arguments, base_dir, verbose)
+        if key:
+            self.__store_response(key, response)
+        return response
+
+    def __call_api(self, name: str, arguments: dict, base_dir: str, verbose: bool):
         type = self.__call_type()
         if type == CallType.REST:
             appkey_value = self.__get_appkey_value() or ""
@@ -66,6 +105,7 @@ class FunctionAction:
                 appkey_value,
                 arguments,
                 verbose,
+                self.__get("timeout"),
             )
         if type == CallType.GRAPHQL:
             if not isLoadedGQL:
@@ -99,6 +139,51 @@ class FunctionAction:
 
         return "Success"
 
+    async def acall_api(self, name: str, arguments: dict, base_dir: str, verbose: bool):
+        """Asynchronous version of call_api. REST and GraphQL calls use the pooled aiohttp sessions
+        (with the "timeout" and "retries" of the action), so that a slow API never blocks the event loop."""
+        key = self.__cache_key(arguments)
+        if key:
+            response = self.__cached_response(key, name, verbose)
+            if response is not None:
+                return response
+        response = await self.__acall_api(name, arguments, base_dir, verbose)
+        if key:
+            self.__store_response(key, response)
+        return response
+
+    async def __acall_api(self, name: str, arguments: dict, base_dir: str, verbose: bool):
+        type = self.__call_type()
+        if type == CallType.REST:
+            appkey_value = self.__get_appkey_value() or ""
+
+            return await async_http_request(
+                self.__get("url"),
+                self.__get("method"),
+                self.__function_action_data.get("headers", {}),
+                appkey_value,
+                arguments,
+                verbose,
+                self.__get("timeout"),
+                self.__get("retries"),
+            )
+        if type == CallType.GRAPHQL:
+            if not isLoadedGQL:
+                print_error("no GraphQL module. pip install gql")
+                return None
+            return await async_graphql_request(
+                url=self.__get("url"),
+                headers=self.__function_action_data.get("headers", {}),
+                appkey_value=self.__get_appkey_value() or "",
+                arguments=arguments,
+                verbose=verbose,
+                timeout=self.__get("timeout"),
+                retries=self.__get("retries"),
+                fetch_schema=self.__get("fetch_schema") or False,
+            )
+
+        return self.__call_api(name, arguments, base_dir, verbose)
+
     def __call_type(self):
         return CallType.withKey(self.__get("type"))
 
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Optional, Union
 
 from slashgpt.chat_history import ChatHistory
 from slashgpt.function.function_action import FunctionAction
-from slashgpt.function.jupyter_runtime import PythonRuntime
 from slashgpt.utils.print import print_error, print_warning
 
 if TYPE_CHECKING:
+    from slashgpt.function.jupyter_runtime import PythonRuntime
     from slashgpt.manifest import Manifest
 
 
+function_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="slashgpt-function")
+"""Thread pool which executes Python functions (module or notebook) called by LLMs"""
+
+runtime_lock = threading.Lock()
+"""Lock for the code cells of runtimes without their own lock"""
+
+
 class FunctionCall:
     """This instance represents a function call generated by LLM."""
 
@@ -76,11 +86,41 @@ class FunctionCall:
 
     def process_function_call(self, history: ChatHistory, runtime: PythonRuntime = None, verbose: bool = False):
         """Process (=execute) the function call as specified in the "actions" section or "module" section of the manifest file"""
+        (function_message, function_name, code_message) = self.execute(history.last_message(), runtime, verbose)
+        self.append_result(history, function_message, function_name, code_message)
+        return (function_message, function_name)
+
+    async def aprocess_function_call(self, last_message: dict, runtime: PythonRuntime = None, verbose: bool = False):
+        """Asynchronous version of execute, which does not block the event loop.
+        Actions are executed by FunctionAction.acall_api, and Python functions in a thread pool.
+        The caller is responsible for appending the results to the history (see append_result)."""
         function_name = self.__name()
         if function_name is None:
-            return (None, None, False)
+            return (None, None, None)
+
+        if self.function_action:
+            arguments = self.__function_arguments(last_message, verbose)
+            function_message = await self.function_action.acall_api(function_name, arguments, self.__manifest.base_dir, verbose)
+            return (function_message, function_name, None)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(function_executor, self.execute, last_message, runtime, verbose)
 
-        arguments = self.__function_arguments(history.last_message(), verbose)
+    def execute(self, last_message: dict, runtime: PythonRuntime = None, verbose: bool = False):
+        """Execute the function call without touching the history.
+
+        Returns:
+
+            function_message (str): result of the function (optional)
+            function_name (str): name of the function
+            code_message (str): message to be appended as the assistant (e.g, executed code, optional)
+        """
+        function_name = self.__name()
+        if function_name is None:
+            return (None, None, None)
+
+        arguments = self.__function_arguments(last_message, verbose)
+        code_message = None
 
         # Check if the action is specified in the manifest
         if self.function_action:
@@ -91,28 +131,38 @@ class FunctionCall:
             function = self.get_function(runtime, function_name)
             if function:
                 # NOTE: This is a pure debug purpose code
-                if arguments.get("code"):
+                if isinstance(arguments, dict) and arguments.get("code"):
                     if isinstance(arguments["code"], list):
                         print("\n".join(arguments["code"]))
                     else:
                         print(arguments["code"])
-                if isinstance(arguments, str):
-                    (result, message) = function(arguments)
+                if self.__manifest.get("notebook") and runtime is not None:
+                    # The notebook runtime is stateful, so its code cells are executed one at a time.
+                    with getattr(runtime, "lock", runtime_lock):
+                        (result, message) = self.__call_function(function, arguments)
                 else:
-                    (result, message) = function(**arguments)
+                    (result, message) = self.__call_function(function, arguments)
 
-                if message:
-                    # Embed code for the history
-                    history.append_message({"role": "assistant", "content": message})
+                # Embed code for the history
+                code_message = message or None
                 function_message = self.__format_python_result(result)
             else:
                 function_message = None
                 print_error(f"No execution for function {function_name}")
 
+        return (function_message, function_name, code_message)
+
+    def append_result(self, history: ChatHistory, function_message: Optional[str], function_name: Optional[str], code_message: Optional[str] = None):
+        """Append the result of execute to the history"""
+        if code_message:
+            history.append_message({"role": "assistant", "content": code_message})
         if function_message:
             history.append_message({"role": "function", "content": function_message, "name": function_name})
 
-        return (function_message, function_name)
+    def __call_function(self, function, arguments: Union[dict, str]):
+        if isinstance(arguments, str):
+            return function(arguments)
+        return function(**arguments)
 
     def __format_python_result(self, result: Union[dict, str]):
         if isinstance(result, dict):
@@ -3,6 +3,7 @@ import contextlib
 import io
 import json
 import os
+import threading
 from typing import Any, Dict, List, Optional, Union
 
 from dotenv import load_dotenv
@@ -34,6 +35,8 @@ class PythonRuntime:
         self.file_path = ""
         self.codebox: Optional[cb.CodeBox] = None
         self.folder_path = path
+        self.lock = threading.Lock()
+        """Lock, which executes the code cells of this runtime one at a time (it is stateful)"""
         if not os.path.isdir(self.folder_path):
             os.makedirs(self.folder_path)
 
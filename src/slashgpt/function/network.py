@@ -1,19 +1,48 @@
+import asyncio
+import functools
+import importlib.util
 import json
+import random
 import re
 import urllib.parse
+from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-try:
-    from gql import Client, gql
-    from gql.transport.requests import RequestsHTTPTransport
+from slashgpt.llms.transport import default_transport
+from slashgpt.utils.lru import LRUCache
+from slashgpt.utils.print import print_debug, print_error, print_warning
 
-    isLoadedGQL = True
-except ImportError:
+# gql and graphql-core are imported on first use of a GraphQL action
+isLoadedGQL = importlib.util.find_spec("gql") is not None
+if not isLoadedGQL:
     print("no gql. pip install gql")
-    isLoadedGQL = False
 
-from slashgpt.utils.print import print_debug, print_error
+DEFAULT_TIMEOUT = 30.0
+"""Default timeout (seconds) of REST and GraphQL actions. Each action may override it with "timeout"."""
+DEFAULT_RETRIES = 2
+"""Default number of retries of REST and GraphQL actions. Each action may override it with "retries"."""
+RETRY_BACKOFF = 0.5
+"""Base delay (seconds) of the exponential backoff"""
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+"""Methods whose requests may be sent again after a server error, a timeout or a lost connection"""
+
+
+def __requests_adapter():
+    # urllib3 retries the idempotent methods only; failed responses are returned (not raised) after the last retry
+    retry = Retry(total=DEFAULT_RETRIES, backoff_factor=RETRY_BACKOFF, status_forcelist=sorted(RETRY_STATUSES), raise_on_status=False)
+    return HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+
+
+__requests_session = requests.Session()
+__requests_session.mount("https://", __requests_adapter())
+__requests_session.mount("http://", __requests_adapter())
+__gql_clients = LRUCache(64)
+__gql_schemas = LRUCache(64)
+__gql_no_schema = object()
 
 
 def ensure_dict(input_data):
@@ -30,6 +59,27 @@ def ensure_dict(input_data):
         raise TypeError("Input must be of type dict or str")
 
 
+def __gql_session(url: str, headers: dict):
+    # The client (and its connected requests session) is cached per (url, headers)
+    def factory():
+        from gql import Client
+        from gql.transport.requests import RequestsHTTPTransport
+
+        transport = RequestsHTTPTransport(url=url, headers=headers, use_json=True, timeout=int(DEFAULT_TIMEOUT), retries=DEFAULT_RETRIES)
+        client = Client(transport=transport)
+        return client.connect_sync()
+
+    return __gql_clients.get_or_create((url, tuple(sorted(headers.items()))), factory)
+
+
+@functools.lru_cache(maxsize=256)
+def parse_graphql(query: str):
+    """Returns the parsed GraphQL document (cached per query)"""
+    from gql import gql
+
+    return gql(query)
+
+
 def graphQLRequest(url: str, headers: dict, appkey_value: str, arguments: dict, verbose: bool):
     try:
         arguments = ensure_dict(arguments)
@@ -37,30 +87,29 @@ def graphQLRequest(url: str, headers: dict, appkey_value: str, arguments: dict,
         headers = {key: value.format(**arguments, **appkey) for key, value in headers.items()}
         if verbose:
             print_debug(f"Posting to {url} {headers}")
-        transport = RequestsHTTPTransport(url=url, headers=headers, use_json=True)
-        client = Client(transport=transport)
+        session = __gql_session(url, headers)
         query = arguments.get("query")
-        graphQuery = gql(f"query {query}")
+        graphQuery = parse_graphql(f"query {query}")
         params = arguments.get("variables")
         if params:
             if verbose:
                 print_debug(f"params={params}")
-            response = client.execute(graphQuery, variable_values=params)
+            response = session.execute(graphQuery, variable_values=params)
         else:
-            response = client.execute(graphQuery)
+            response = session.execute(graphQuery)
         return json.dumps(response)
     except Exception as e:
         return str(e)
 
 
-def http_request(url: str, method: str, headers: dict, appkey_value: str, arguments: dict, verbose: bool):
+def prepare_http_request(url: str, method: str, headers: dict, appkey_value: str, arguments: dict, verbose: bool):
+    """Returns (url, headers) after filling {arguments} and {appkey} in them"""
     appkey = {"appkey": appkey_value}
     headers = {key: value.format(**arguments, **appkey) for key, value in headers.items()}
     if method == "POST":
         headers["Content-Type"] = "application/json"
         if verbose:
             print_debug(f"Posting to {url} {headers}")
-        response = requests.post(url, headers=headers, json=arguments)
     else:
         if verbose:
             print_debug(str(arguments.items()))
@@ -70,8 +119,164 @@ def http_request(url: str, method: str, headers: dict, appkey_value: str, argume
         )
         if verbose:
             print_debug(f"Fetching from {url}")
-        response = requests.get(url, headers=headers)
+    return (url, headers)
+
+
+def http_request(url: str, method: str, headers: dict, appkey_value: str, arguments: dict, verbose: bool, timeout: Optional[float] = None):
+    (url, headers) = prepare_http_request(url, method, headers, appkey_value, arguments, verbose)
+    if method == "POST":
+        response = __requests_session.post(url, headers=headers, json=arguments, timeout=timeout or DEFAULT_TIMEOUT)
+    else:
+        response = __requests_session.get(url, headers=headers, timeout=timeout or DEFAULT_TIMEOUT)
     if response.status_code == 200:
         return response.text
     else:
         print_error(f"Got {response.status_code}:{response.text} from {url}")
+
+
+def __retry_delay(attempt: int, retry_after: Optional[str] = None):
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return RETRY_BACKOFF * (2**attempt) + random.uniform(0, RETRY_BACKOFF)
+
+
+async def request_with_retry(
+    method: str,
+    url: str,
+    headers: dict,
+    json_data: Optional[dict] = None,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    verbose: bool = False,
+    idempotent: Optional[bool] = None,
+):
+    """Send a request with the pooled aiohttp session of the host.
+
+    It retries on 429 (honoring Retry-After) and connection failures with exponential backoff.
+    5xx responses, timeouts and connections lost after sending the request are retried only for idempotent requests,
+    since the server may have processed them.
+
+    Args:
+
+        idempotent (bool, optional): True if the request may be processed twice (by default, for GET, HEAD, PUT, DELETE and OPTIONS)
+
+    Returns:
+
+        status (int): HTTP status
+        text (str): response body
+    """
+    import aiohttp
+
+    parsed_url = urllib.parse.urlparse(url)
+    session = default_transport.aiohttp_session(f"{parsed_url.scheme}://{parsed_url.netloc}")
+    retries = DEFAULT_RETRIES if retries is None else retries
+    idempotent = method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+    # errors raised before the request is sent
+    connect_errors = (aiohttp.ClientConnectorError,) + ((aiohttp.ConnectionTimeoutError,) if hasattr(aiohttp, "ConnectionTimeoutError") else ())
+    client_timeout = aiohttp.ClientTimeout(total=timeout or DEFAULT_TIMEOUT)
+    attempt = 0
+    while True:
+        try:
+            async with session.request(method, url, headers=headers, json=json_data, timeout=client_timeout) as response:
+                text = await response.text()
+                retryable = response.status == 429 or (idempotent and response.status in RETRY_STATUSES)
+                if not retryable or attempt >= retries:
+                    return (response.status, text)
+                delay = __retry_delay(attempt, response.headers.get("Retry-After"))
+                reason = f"status {response.status}"
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt >= retries or not (idempotent or isinstance(e, connect_errors)):
+                raise
+            delay = __retry_delay(attempt)
+            reason = f"{type(e).__name__} {e}"
+        if verbose:
+            print_warning(f"Retrying {url} in {delay:.2f}s ({reason})")
+        attempt += 1
+        await asyncio.sleep(delay)
+
+
+async def async_http_request(
+    url: str,
+    method: str,
+    headers: dict,
+    appkey_value: str,
+    arguments: dict,
+    verbose: bool,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+):
+    """Asynchronous version of http_request, with per-host connection pools, a timeout and retries"""
+    (url, headers) = prepare_http_request(url, method, headers, appkey_value, arguments, verbose)
+    try:
+        (status, text) = await request_with_retry(method or "GET", url, headers, arguments if method == "POST" else None, timeout, retries, verbose)
+    except Exception as e:
+        print_error(f"Failed to fetch {url}: {type(e).__name__} {e}")
+        return None
+    if status == 200:
+        return text
+    print_error(f"Got {status}:{text} from {url}")
+
+
+async def get_graphql_schema(url: str, headers: dict, timeout: Optional[float] = None, verbose: bool = False):
+    """Returns the schema of the GraphQL endpoint, fetched by the introspection query once per url (for the last 64 urls)"""
+    schema = __gql_schemas.get(url)
+    if schema is None:
+        from graphql import build_client_schema, get_introspection_query
+
+        (status, text) = await request_with_retry(
+            "POST", url, headers, {"query": get_introspection_query()}, timeout, verbose=verbose, idempotent=True
+        )
+        result = json.loads(text) if status == 200 else {}
+        schema = build_client_schema(result["data"]) if result.get("data") else __gql_no_schema
+        if schema is __gql_no_schema:
+            print_warning(f"Failed to fetch the GraphQL schema from {url}")
+        __gql_schemas.set(url, schema)
+    return None if schema is __gql_no_schema else schema
+
+
+async def async_graphql_request(
+    url: str,
+    headers: dict,
+    appkey_value: str,
+    arguments: dict,
+    verbose: bool,
+    timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    fetch_schema: bool = False,
+):
+    """Asynchronous version of graphQLRequest over the pooled aiohttp session of the host.
+    If fetch_schema is True, the query is validated against the cached schema before sending it."""
+    try:
+        arguments = ensure_dict(arguments)
+        appkey = {"appkey": appkey_value}
+        headers = {key: value.format(**arguments, **appkey) for key, value in headers.items()}
+        headers["Content-Type"] = "application/json"
+        if verbose:
+            print_debug(f"Posting to {url} {headers}")
+        from graphql import parse, validate
+
+        query = f"query {arguments.get('query')}"
+        document = parse(query)
+        if fetch_schema:
+            schema = await get_graphql_schema(url, headers, timeout, verbose)
+            if schema:
+                errors = validate(schema, document)
+                if errors:
+                    return str(errors[0])
+        payload = {"query": query}
+        params = arguments.get("variables")
+        if params:
+            if verbose:
+                print_debug(f"params={params}")
+            payload["variables"] = params
+        # queries do not change the data, so they may be sent again
+        (status, text) = await request_with_retry("POST", url, headers, payload, timeout, retries, verbose, idempotent=True)
+        result = json.loads(text)
+        if result.get("errors"):
+            return str(result["errors"][0])
+        return json.dumps(result.get("data"))
+    except Exception as e:
+        return str(e)
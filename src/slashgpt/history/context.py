@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional
+
+from slashgpt.utils.print import print_debug
+
+if TYPE_CHECKING:
+    from slashgpt.chat_history import ChatHistory
+    from slashgpt.llms.model import LlmModel
+    from slashgpt.manifest import Manifest
+
+MESSAGE_OVERHEAD = 4
+"""Tokens added to each message for its role and separators (as OpenAI counts them)"""
+
+DEFAULT_HISTORY_WINDOW = 20
+"""Default number of (non-preset) messages kept by the "window" history type"""
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for yourself, so that you can continue it without the original messages. "
+    "Keep the facts, names, numbers, decisions and open questions. Update the previous summary if there is one."
+)
+"""System prompt of the request which summarizes the older messages ("summary" history type)"""
+
+
+class ContextPolicy:
+    """Policy which selects the messages sent to the LLM from the history ("history_type" of the manifest).
+
+    The base policy ("all") sends the whole history. A policy is created for each session, so that it may keep
+    a state across turns (e.g, a summary).
+    """
+
+    def __init__(self, manifest: Manifest):
+        self.manifest = manifest
+
+    async def select(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> List[dict]:
+        """Returns the messages to send to the LLM"""
+        return history.messages()
+
+    @classmethod
+    def num_tokens(cls, message: dict, llm_model: LlmModel) -> int:
+        """Returns the number of tokens of the message (the count of each text is memoized, see slashgpt.llms.tokens)"""
+        return llm_model.num_tokens(message.get("content") or "") + MESSAGE_OVERHEAD
+
+    @classmethod
+    def start_at_user(cls, messages: List[dict]) -> List[dict]:
+        """Drops the leading messages before the first user message (e.g, a function result without its call)"""
+        for index, message in enumerate(messages):
+            if message.get("role") == "user":
+                return messages[index:]
+        return messages
+
+    def budget(self, llm_model: LlmModel) -> int:
+        """Returns the token budget of the messages ("history_budget" of the manifest, or the context window
+        of the model minus max_tokens of the response)"""
+        if self.manifest.get("history_budget"):
+            return int(self.manifest.get("history_budget"))
+        return llm_model.max_token() - self.manifest.max_tokens()
+
+    def tail(self, messages: List[dict], budget: int, llm_model: LlmModel) -> List[dict]:
+        """Returns the longest tail of the messages within the budget (at least the last message)"""
+        total = 0
+        start = len(messages)
+        while start > 0:
+            total += self.num_tokens(messages[start - 1], llm_model)
+            if total > budget and start < len(messages):
+                break
+            start -= 1
+        return self.start_at_user(messages[start:]) if start > 0 else messages
+
+
+class WindowContext(ContextPolicy):
+    """It sends the preset messages and the last "history_window" messages (20 by default)"""
+
+    async def select(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> List[dict]:
+        window = int(self.manifest.get("history_window") or DEFAULT_HISTORY_WINDOW)
+        messages = history.nonpreset_messages()
+        recent = self.start_at_user(messages[-window:]) if len(messages) > window else messages
+        return history.preset_messages() + recent
+
+
+class BudgetContext(ContextPolicy):
+    """It sends the preset messages and as many recent messages as the token budget allows"""
+
+    async def select(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> List[dict]:
+        preset = history.preset_messages()
+        budget = self.budget(llm_model) - sum(self.num_tokens(message, llm_model) for message in preset)
+        messages = history.nonpreset_messages()
+        recent = self.tail(messages, budget, llm_model)
+        if verbose and len(recent) < len(messages):
+            print_debug(f"history: {len(messages) - len(recent)} older messages are truncated")
+        return preset + recent
+
+
+class SummaryContext(ContextPolicy):
+    """It sends the preset messages, a summary of the older messages and the recent ones.
+
+    When the messages exceed the token budget, the older ones are summarized by the LLM (together with the previous
+    summary) until the recent ones fit in half of the budget, so that a summary is made once in several turns.
+    """
+
+    def __init__(self, manifest: Manifest):
+        super().__init__(manifest)
+        self.summary: Optional[str] = None
+        """Summary of the older messages"""
+        self.summarized = 0
+        """Number of the (non-preset) messages in the summary"""
+
+    def summary_message(self) -> List[dict]:
+        return [{"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}] if self.summary else []
+
+    async def select(self, history: ChatHistory, llm_model: LlmModel, verbose: bool = False) -> List[dict]:
+        preset = history.preset_messages()
+        budget = self.budget(llm_model) - sum(self.num_tokens(message, llm_model) for message in preset)
+        messages = history.nonpreset_messages()
+        if self.summarized > len(messages):
+            # the history was rewound (e.g, /undo)
+            self.summary = None
+            self.summarized = 0
+        recent = messages[self.summarized :]
+        summary_tokens = sum(self.num_tokens(message, llm_model) for message in self.summary_message())
+        if sum(self.num_tokens(message, llm_model) for message in recent) > budget - summary_tokens:
+            kept = self.tail(recent, budget // 2 - summary_tokens, llm_model)
+            older = recent[: len(recent) - len(kept)]
+            if older:
+                self.summary = await self.summarize(older, llm_model, verbose)
+                self.summarized += len(older)
+                recent = kept
+                if verbose:
+                    print_debug(f"history: {len(older)} older messages are summarized ({self.summarized} in total)")
+        return preset + self.summary_message() + recent
+
+    async def summarize(self, messages: List[dict], llm_model: LlmModel, verbose: bool) -> str:
+        from slashgpt.manifest import Manifest
+
+        transcript = "\n".join([f"{message['role']}: {message.get('content') or ''}" for message in messages])
+        if self.summary:
+            transcript = f"Previous summary:\n{self.summary}\n\nConversation:\n{transcript}"
+        request = [{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": transcript}]
+        chunks = []
+        async for message in llm_model.generate_response(request, Manifest({"temperature": 0}), verbose):
+            if isinstance(message, str):
+                chunks.append(message)
+        return "".join(chunks)
+
+
+context_policies = {
+    "all": ContextPolicy,
+    "window": WindowContext,
+    "budget": BudgetContext,
+    "summary": SummaryContext,
+}
+"""Context policies, which "history_type" of the manifest chooses from (register custom ones here)"""
+
+
+def get_context_policy(manifest: Manifest, current: Optional[ContextPolicy] = None) -> ContextPolicy:
+    """Returns the context policy for the session (the current one, if the manifest specifies the same history type)"""
+    policy_class = context_policies.get(manifest.history_type(), ContextPolicy)
+    if type(current) is policy_class:
+        current.manifest = manifest
+        return current
+    return policy_class(manifest)
@@ -39,6 +39,14 @@ class ChatHistoryAbstractStorage(metaclass=ABCMeta):
     def messages(self):
         pass
 
+    @abstractmethod
+    def preset_messages(self):
+        pass
+
+    @abstractmethod
+    def nonpreset_messages(self):
+        pass
+
     @abstractmethod
     def restore(self, data: List[dict]):
         pass
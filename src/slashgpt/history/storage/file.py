@@ -2,20 +2,32 @@ import glob
 import json
 import os
 import uuid
-from typing import List
+from typing import Dict, List
 
 from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
-from slashgpt.history.storage.log import create_log_dir
+from slashgpt.history.storage.log import JsonlLog, create_log_dir, load_log
 from slashgpt.utils.print import print_warning
 
 
 class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
-    def __init__(self, uid: str, agent_name: str, session_id: str = ""):
+    def __init__(self, uid: str, agent_name: str, session_id: str = "", log_format: str = "json", fsync: str = "never", compact_threshold: int = 64):
+        """
+        Args:
+
+            uid (str): User Id
+            agent_name (str): Name of the agent (sub folder of the history)
+            session_id (str, optional): Id of the session to restore
+            log_format (str, optional): "json" (rewrite the whole session on every change)
+                or "jsonl" (append-only operation log, O(1) on disk per message)
+            fsync (str, optional): fsync policy of the "jsonl" log ("always", "interval" or "never")
+            compact_threshold (int, optional): minimum number of lines before the "jsonl" log is compacted
+        """
         self.__messages: List[dict] = []
         self.base_dir = "filememory"
 
         self.uid = uid
         self.agent_name = agent_name
+        self.log_format = log_format
 
         # self.time = datetime.now()
 
@@ -24,26 +36,60 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
             self.session_id = str(uuid.uuid4())
         else:
             self.session_id = session_id
+        self.__log = JsonlLog(self.__path("jsonl"), fsync=fsync, compact_threshold=compact_threshold) if log_format == "jsonl" else None
+        if session_id != "":
             self.__load_session()
 
+    def __path(self, ext: str):
+        return f"{self.base_dir}/{self.agent_name}/{self.session_id}.{ext}"
+
     def _data(self):
         return {"messages": self.__messages}
 
     def __save_session(self):
-        with open(f"{self.base_dir}/{self.agent_name}/{self.session_id}.json", "w") as f:
+        with open(self.__path("json"), "w") as f:
             json.dump(self._data(), f, ensure_ascii=False, indent=2)
 
+    @classmethod
+    def __mtime(cls, path: str) -> float:
+        return os.path.getmtime(path) if os.path.exists(path) else -1
+
     def __load_session(self):
+        # the session may have been saved in the other format; the newer file wins
+        json_is_newer = self.__mtime(self.__path("json")) > self.__mtime(self.__path("jsonl"))
+        if self.__log:
+            if not json_is_newer:
+                self.__messages = self.__log.load()
+                return
+            # migrate a session saved as json into the append-only log, and remove the json
+            self.__load_json_session()
+            self.__log.compact(self.__messages)
+            os.remove(self.__path("json"))
+            return
+        if json_is_newer:
+            self.__load_json_session()
+        else:
+            self.__messages = JsonlLog.replay(self.__path("jsonl"))
+
+    def __load_json_session(self):
         try:
-            with open(f"{self.base_dir}/{self.agent_name}/{self.session_id}.json", "r") as f:
+            with open(self.__path("json"), "r") as f:
                 data = json.load(f)
                 self.__messages = data.get("messages")
         except FileNotFoundError:
             self.__messages = []
 
+    def __write(self, op: str, *args):
+        if self.__log:
+            getattr(self.__log, op)(*args)
+            if self.__log.needs_compaction(len(self.__messages)):
+                self.__log.compact(self.__messages)
+        elif op == "append":
+            self.__save_session()
+
     def append(self, data: dict):
         self.__messages.append(data)
-        self.__save_session()
+        self.__write("append", data)
 
     def get(self, index: int):
         return self.__messages[index]
@@ -56,6 +102,7 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
     def set(self, index: int, data: dict):
         if self.__messages[index]:
             self.__messages[index] = data
+            self.__write("set", index, data)
 
     def len(self):
         return len(self.__messages)
@@ -66,7 +113,9 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
 
     def pop(self):
         if self.len() > 0:
-            return self.__messages.pop()
+            message = self.__messages.pop()
+            self.__write("pop")
+            return message
 
     def messages(self):
         return self.__messages
@@ -79,11 +128,17 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
 
     def restore(self, data: List[dict]):
         self.__messages = data
+        self.__write("restore", data)
 
     def session_list(self):
         history_path = f"./{self.base_dir}/{self.agent_name}"
-        files = glob.glob(f"{history_path}/*")
-        return list(map(lambda x: {"name": x[1], "id": x[0]}, enumerate(files)))
+        # a session saved in both formats is listed once, as its newer file
+        sessions: Dict[str, str] = {}
+        for file in glob.glob(f"{history_path}/*"):
+            session_id = os.path.splitext(file)[0]
+            if session_id not in sessions or self.__mtime(file) > self.__mtime(sessions[session_id]):
+                sessions[session_id] = file
+        return list(map(lambda x: {"name": x[1], "id": x[0]}, enumerate(sessions.values())))
 
     def get_session_data(self, id: str):
         files = self.session_list()
@@ -92,6 +147,4 @@ class ChatHistoryFileStorage(ChatHistoryAbstractStorage):
             if not os.path.exists(file_name):
                 print_warning(f"No log named {file_name}")
                 return
-            with open(file_name, "r", encoding="utf-8") as f:
-                log = json.load(f)
-                return log
+            return load_log(file_name)
@@ -1,5 +1,7 @@
 import json
 import os
+import time as time_module
+from typing import List
 
 
 def create_log_dir(base_dir: str, agent_name: str):
@@ -13,3 +15,120 @@ def save_log(base_dir: str, agent_name: str, context: dict, time):
     timeStr = time.strftime("%Y-%m-%d %H-%M-%S.%f")
     with open(f"{base_dir}/{agent_name}/{timeStr}.json", "w") as f:
         json.dump(context, f, ensure_ascii=False, indent=2)
+
+
+def load_log(file_name: str):
+    """Load a log file, either a JSON snapshot or a JSONL operation log, as {"messages": [...]}"""
+    if file_name.endswith(".jsonl"):
+        return {"messages": JsonlLog.replay(file_name)}
+    with open(file_name, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+FSYNC_POLICIES = ["always", "interval", "never"]
+"""fsync policies of JsonlLog: after every write, at most once per fsync_interval seconds, or never (OS buffering)"""
+
+
+class JsonlLog:
+    """Append-only JSONL log of history operations (append, set, pop and restore).
+
+    Writing a message costs one line regardless of the length of the conversation.
+    The log is rewritten (compacted) only when it holds more stale operations than live messages.
+    """
+
+    def __init__(self, path: str, fsync: str = "never", fsync_interval: float = 1.0, compact_threshold: int = 64):
+        """
+        Args:
+
+            path (str): location of the .jsonl file
+            fsync (str): fsync policy ("always", "interval" or "never")
+            fsync_interval (float): minimum seconds between two fsyncs (when fsync is "interval")
+            compact_threshold (int): minimum number of lines before compaction is considered
+        """
+        assert fsync in FSYNC_POLICIES, f"Invalid fsync policy: {fsync}"
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self.lines = 0
+        """Number of operations in the file"""
+        self.__last_fsync = 0.0
+
+    def __write(self, lines: List[str], mode: str = "a", path: str = ""):
+        with open(path or self.path, mode, encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            now = time_module.monotonic()
+            if self.fsync == "always" or (self.fsync == "interval" and now - self.__last_fsync >= self.fsync_interval):
+                os.fsync(f.fileno())
+                self.__last_fsync = now
+
+    def __line(self, op: dict):
+        return json.dumps(op, ensure_ascii=False) + "\n"
+
+    def write(self, op: dict):
+        """Append an operation to the log"""
+        self.__write([self.__line(op)])
+        self.lines += 1
+
+    def append(self, data: dict):
+        self.write({"op": "append", "data": data})
+
+    def set(self, index: int, data: dict):
+        self.write({"op": "set", "index": index, "data": data})
+
+    def pop(self):
+        self.write({"op": "pop"})
+
+    def restore(self, messages: List[dict]):
+        self.write({"op": "restore", "messages": messages})
+
+    def needs_compaction(self, length: int):
+        """Returns True if the log holds more stale operations than live messages"""
+        return self.lines > max(self.compact_threshold, 2 * length)
+
+    def compact(self, messages: List[dict]):
+        """Rewrite the log as one append operation per live message (atomically)"""
+        tmp_path = self.path + ".tmp"
+        self.__write([self.__line({"op": "append", "data": m}) for m in messages], "w", tmp_path)
+        os.replace(tmp_path, self.path)
+        self.lines = len(messages)
+
+    def load(self):
+        """Stream the log back, returning the list of messages (and counting the lines)"""
+        messages: List[dict] = []
+        self.lines = 0
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self.lines += JsonlLog.__apply(messages, line)
+        return messages
+
+    @classmethod
+    def replay(cls, path: str):
+        """Returns the list of messages stored in the specified log"""
+        return JsonlLog(path).load()
+
+    @classmethod
+    def __apply(cls, messages: List[dict], line: str):
+        line = line.strip()
+        if not line:
+            return 0
+        try:
+            op = json.loads(line)
+        except json.JSONDecodeError:
+            # a partially written last line (e.g, after a crash) is ignored
+            return 0
+        name = op.get("op")
+        if name == "append":
+            messages.append(op.get("data"))
+        elif name == "set":
+            index = op.get("index")
+            if -len(messages) <= index < len(messages):
+                messages[index] = op.get("data")
+        elif name == "pop":
+            if len(messages) > 0:
+                messages.pop()
+        elif name == "restore":
+            messages[:] = op.get("messages") or []
+        return 1
@@ -1,31 +1,52 @@
 import glob
-import json
 import os
 from datetime import datetime
 from typing import List
 
 from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
-from slashgpt.history.storage.log import create_log_dir, save_log
+from slashgpt.history.storage.log import JsonlLog, create_log_dir, load_log, save_log
 from slashgpt.utils.print import print_warning
 
 
 class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
-    def __init__(self, uid: str, agent_name: str):
+    def __init__(self, uid: str, agent_name: str, log_format: str = "jsonl", fsync: str = "never"):
+        """
+        Args:
+
+            uid (str): User Id
+            agent_name (str): Name of the agent (sub folder of the log)
+            log_format (str, optional): "jsonl" (append-only operation log, O(1) on disk per message)
+                or "json" (rewrite the whole session on every message)
+            fsync (str, optional): fsync policy of the "jsonl" log ("always", "interval" or "never")
+        """
         self.__messages: List[dict] = []
         self.uid = uid
         self.agent_name = agent_name
         self.base_dir = "output"
+        self.log_format = log_format
 
         self.time = datetime.now()
         # init log dir
         create_log_dir(self.base_dir, agent_name)
+        self.__log = None
+        if log_format == "jsonl":
+            timeStr = self.time.strftime("%Y-%m-%d %H-%M-%S.%f")
+            self.__log = JsonlLog(f"{self.base_dir}/{agent_name}/{timeStr}.jsonl", fsync=fsync)
 
     def _data(self):
         return {"messages": self.__messages}
 
+    def __write(self, op: str, *args):
+        if self.__log:
+            getattr(self.__log, op)(*args)
+            if self.__log.needs_compaction(len(self.__messages)):
+                self.__log.compact(self.__messages)
+        elif op == "append":
+            save_log(self.base_dir, self.agent_name, self._data(), self.time)
+
     def append(self, data: dict):
         self.__messages.append(data)
-        save_log(self.base_dir, self.agent_name, self._data(), self.time)
+        self.__write("append", data)
 
     def get(self, index: int):
         return self.__messages[index]
@@ -38,6 +59,7 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
     def set(self, index: int, data: dict):
         if self.__messages[index]:
             self.__messages[index] = data
+            self.__write("set", index, data)
 
     def len(self):
         return len(self.__messages)
@@ -48,7 +70,9 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
 
     def pop(self):
         if self.len() > 0:
-            return self.__messages.pop()
+            message = self.__messages.pop()
+            self.__write("pop")
+            return message
 
     def messages(self):
         return self.__messages
@@ -61,6 +85,7 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
 
     def restore(self, data: List[dict]):
         self.__messages = data
+        self.__write("restore", data)
 
     def session_list(self):
         history_path = f"./{self.base_dir}/{self.agent_name}"
@@ -74,6 +99,4 @@ class ChatHistoryMemoryStorage(ChatHistoryAbstractStorage):
             if not os.path.exists(file_name):
                 print_warning(f"No log named {file_name}")
                 return
-            with open(file_name, "r", encoding="utf-8") as f:
-                log = json.load(f)
-                return log
+            return load_log(file_name)
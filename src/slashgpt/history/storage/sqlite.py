@@ -0,0 +1,289 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+from slashgpt.utils.print import print_warning
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS log_manager (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        uid TEXT NOT NULL,
+        session_id TEXT NOT NULL UNIQUE,
+        agent_name TEXT NOT NULL,
+        created_at INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS log_manager_uid_agent ON log_manager (uid, agent_name, created_at)",
+    """CREATE TABLE IF NOT EXISTS log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        uid TEXT NOT NULL,
+        session_id TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        role TEXT,
+        content TEXT,
+        name TEXT,
+        preset INTEGER NOT NULL DEFAULT 0,
+        data TEXT NOT NULL,
+        created_at INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS log_uid_session_created ON log (uid, session_id, created_at)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS log_session_position ON log (session_id, position)",
+    """CREATE TABLE IF NOT EXISTS session_memory (
+        session_id TEXT PRIMARY KEY,
+        uid TEXT NOT NULL,
+        data TEXT NOT NULL,
+        updated_at INTEGER NOT NULL
+    )""",
+]
+
+__connections = threading.local()
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Returns the connection to the database for the current thread (shared by all the sessions)"""
+    connections = getattr(__connections, "connections", None)
+    if connections is None:
+        connections = {}
+        __connections.connections = connections
+    conn = connections.get(db_path)
+    if conn is None:
+        directory = os.path.dirname(db_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        connections[db_path] = conn
+    return conn
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+__pending_storages: set = set()
+__pending_lock = threading.Lock()
+
+
+def _set_pending(storage, pending: bool):
+    # storages with pending messages are kept alive until they are flushed (at the latest, at exit)
+    with __pending_lock:
+        if pending:
+            __pending_storages.add(storage)
+        else:
+            __pending_storages.discard(storage)
+
+
+@atexit.register
+def flush_all():
+    """Insert the pending messages of all the storages (called at interpreter exit)"""
+    with __pending_lock:
+        storages = list(__pending_storages)
+    for storage in storages:
+        try:
+            storage.flush()
+        except sqlite3.Error as e:
+            print_warning(f"Failed to flush the chat history of {storage.session_id}: {e}")
+
+
+class ChatHistorySQLiteStorage(ChatHistoryAbstractStorage):
+    """Chat history stored in SQLite (log_manager and log tables).
+
+    Appends are buffered and inserted in batches (in WAL mode);
+    pending messages are flushed before any read, so the buffer is never visible to the caller.
+    """
+
+    def __init__(self, uid: str, agent_name: str, session_id: str = "", db_path: str = "filememory/history.db", batch_size: int = 1):
+        """
+        Args:
+
+            uid (str): User Id
+            agent_name (str): Name of the agent
+            session_id (str, optional): Id of the session to restore
+            db_path (str, optional): location of the SQLite database
+            batch_size (int, optional): number of appended messages inserted in one transaction.
+                Pending messages are flushed before any read, by flush() or close(), and at interpreter exit.
+        """
+        self.uid = uid
+        self.agent_name = agent_name
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.__pending: List[tuple] = []
+        if session_id == "":
+            self.__new_session_id()
+        else:
+            self.session_id = session_id
+            self.__registered = self.__query_one("SELECT 1 FROM log_manager WHERE session_id = ?", (session_id,)) is not None
+            row = self.__query_one("SELECT COUNT(*) FROM log WHERE uid = ? AND session_id = ?", (self.uid, self.session_id))
+            self.__len = row[0]
+
+    def __new_session_id(self):
+        self.session_id = str(uuid.uuid4())
+        self.__registered = False
+        self.__len = 0
+
+    @property
+    def __conn(self) -> sqlite3.Connection:
+        # connections are per thread (e.g, flush_all runs on the main thread at exit)
+        return get_connection(self.db_path)
+
+    def __register(self):
+        # insert into log_manager lazily, so that unused sessions do not leave any rows
+        if not self.__registered:
+            self.__conn.execute(
+                "INSERT OR IGNORE INTO log_manager (uid, session_id, agent_name, created_at) VALUES (?, ?, ?, ?)",
+                (self.uid, self.session_id, self.agent_name, now_ms()),
+            )
+            self.__registered = True
+
+    def __row(self, position: int, data: dict):
+        return (
+            self.uid,
+            self.session_id,
+            position,
+            data.get("role"),
+            data.get("content"),
+            data.get("name"),
+            1 if data.get("preset") else 0,
+            json.dumps(data, ensure_ascii=False),
+            now_ms(),
+        )
+
+    def flush(self):
+        """Insert the pending messages in a single transaction"""
+        if self.__pending:
+            with self.__conn:
+                self.__register()
+                self.__conn.executemany(
+                    "INSERT INTO log (uid, session_id, position, role, content, name, preset, data, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    self.__pending,
+                )
+            self.__pending = []
+            _set_pending(self, False)
+
+    def close(self):
+        """Insert the pending messages (the storage is still usable afterwards)"""
+        self.flush()
+
+    def __query_one(self, sql: str, params: tuple):
+        self.flush()
+        return self.__conn.execute(sql, params).fetchone()
+
+    def __query_data(self, sql: str, params: tuple):
+        self.flush()
+        return [json.loads(row[0]) for row in self.__conn.execute(sql, params)]
+
+    def __position(self, index: int) -> Optional[int]:
+        position = index + self.__len if index < 0 else index
+        if 0 <= position < self.__len:
+            return position
+        return None
+
+    def setMemory(self, memory: dict):
+        self.flush()
+        with self.__conn:
+            self.__conn.execute(
+                "INSERT OR REPLACE INTO session_memory (session_id, uid, data, updated_at) VALUES (?, ?, ?, ?)",
+                (self.session_id, self.uid, json.dumps(memory, ensure_ascii=False), now_ms()),
+            )
+
+    def memory(self):
+        row = self.__query_one("SELECT data FROM session_memory WHERE uid = ? AND session_id = ?", (self.uid, self.session_id))
+        return json.loads(row[0]) if row else {}
+
+    def append(self, data: dict):
+        self.__pending.append(self.__row(self.__len, data))
+        self.__len += 1
+        if len(self.__pending) >= self.batch_size:
+            self.flush()
+        else:
+            _set_pending(self, True)
+
+    def get(self, index: int):
+        position = self.__position(index)
+        if position is None:
+            raise IndexError("history index out of range")
+        row = self.__query_one("SELECT data FROM log WHERE session_id = ? AND position = ?", (self.session_id, position))
+        return json.loads(row[0])
+
+    def get_data(self, index: int, name: str):
+        m = self.get(index)
+        if m:
+            return m.get(name)
+
+    def set(self, index: int, data: dict):
+        position = self.__position(index)
+        if position is None:
+            raise IndexError("history index out of range")
+        self.flush()
+        with self.__conn:
+            self.__conn.execute(
+                "UPDATE log SET role = ?, content = ?, name = ?, preset = ?, data = ? WHERE session_id = ? AND position = ?",
+                self.__row(position, data)[3:8] + (self.session_id, position),
+            )
+
+    def len(self):
+        return self.__len
+
+    def last(self):
+        if self.len() > 0:
+            return self.get(self.len() - 1)
+
+    def pop(self):
+        if self.len() > 0:
+            message = self.get(self.len() - 1)
+            with self.__conn:
+                self.__conn.execute("DELETE FROM log WHERE session_id = ? AND position = ?", (self.session_id, self.__len - 1))
+            self.__len -= 1
+            return message
+
+    def messages(self):
+        return self.__query_data("SELECT data FROM log WHERE uid = ? AND session_id = ? ORDER BY position", (self.uid, self.session_id))
+
+    def preset_messages(self):
+        return self.__query_data(
+            "SELECT data FROM log WHERE uid = ? AND session_id = ? AND preset = 1 ORDER BY position", (self.uid, self.session_id)
+        )
+
+    def nonpreset_messages(self):
+        return self.__query_data(
+            "SELECT data FROM log WHERE uid = ? AND session_id = ? AND preset = 0 ORDER BY position", (self.uid, self.session_id)
+        )
+
+    def restore(self, data: List[dict]):
+        self.flush()
+        self.__new_session_id()
+        for d in data:
+            self.__pending.append(self.__row(self.__len, d))
+            self.__len += 1
+        self.flush()
+
+    def session_list(self):
+        self.flush()
+        rows = self.__conn.execute(
+            "SELECT session_id, created_at FROM log_manager WHERE uid = ? AND agent_name = ? ORDER BY created_at, id",
+            (self.uid, self.agent_name),
+        ).fetchall()
+        return list(map(lambda x: {"name": x[1][0], "id": x[0], "created_at": x[1][1]}, enumerate(rows)))
+
+    def get_session_data(self, id: str):
+        session_id = id
+        if id.isdecimal():
+            self.flush()
+            row = self.__conn.execute(
+                "SELECT session_id FROM log_manager WHERE uid = ? AND agent_name = ? ORDER BY created_at, id LIMIT 1 OFFSET ?",
+                (self.uid, self.agent_name, int(id)),
+            ).fetchone()
+            if row is None:
+                return None
+            session_id = row[0]
+        messages = self.__query_data("SELECT data FROM log WHERE uid = ? AND session_id = ? ORDER BY position", (self.uid, session_id))
+        return {"messages": messages}
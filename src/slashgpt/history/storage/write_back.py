@@ -0,0 +1,96 @@
+import threading
+from typing import List, Optional
+
+from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+
+
+class ChatHistoryWriteBackStorage(ChatHistoryAbstractStorage):
+    """In-memory chat history in front of another storage.
+
+    Changes are applied to memory immediately and queued, and flush() writes them to the backing storage
+    (e.g, from the writer thread of SessionRegistry), so that a turn never waits for the disk.
+    """
+
+    def __init__(self, storage: ChatHistoryAbstractStorage, messages: Optional[List[dict]] = None):
+        """
+        Args:
+
+            storage (ChatHistoryAbstractStorage): backing storage
+            messages (list, optional): messages already loaded from the backing storage (read from it if None)
+        """
+        self.storage = storage
+        """Backing storage"""
+        self.uid = getattr(storage, "uid", "")
+        self.agent_name = getattr(storage, "agent_name", "")
+        self.session_id = getattr(storage, "session_id", "")
+        self.__messages: List[dict] = list(storage.messages()) if messages is None else messages
+        self.__pending: List[tuple] = []
+        self.__lock = threading.Lock()
+
+    def __queue(self, op: str, *args):
+        with self.__lock:
+            self.__pending.append((op, args))
+
+    def dirty(self) -> bool:
+        """Returns if there are changes, which are not written to the backing storage yet"""
+        with self.__lock:
+            return len(self.__pending) > 0
+
+    def flush(self) -> int:
+        """Write the queued changes to the backing storage. Returns the number of them."""
+        with self.__lock:
+            pending = self.__pending
+            self.__pending = []
+        for op, args in pending:
+            getattr(self.storage, op)(*args)
+        if pending and hasattr(self.storage, "flush"):
+            self.storage.flush()
+        return len(pending)
+
+    def append(self, data: dict):
+        self.__messages.append(data)
+        self.__queue("append", data)
+
+    def get(self, index: int):
+        return self.__messages[index]
+
+    def get_data(self, index: int, name: str):
+        m = self.__messages[index]
+        if m:
+            return m.get(name)
+
+    def set(self, index: int, data: dict):
+        self.__messages[index] = data
+        self.__queue("set", index, data)
+
+    def len(self):
+        return len(self.__messages)
+
+    def last(self):
+        if self.len() > 0:
+            return self.__messages[self.len() - 1]
+
+    def pop(self):
+        if self.len() > 0:
+            message = self.__messages.pop()
+            self.__queue("pop")
+            return message
+
+    def messages(self):
+        return self.__messages
+
+    def preset_messages(self):
+        return filter(lambda x: x.get("preset"), self.__messages)
+
+    def nonpreset_messages(self):
+        return filter(lambda x: not x.get("preset"), self.__messages)
+
+    def restore(self, data: List[dict]):
+        self.__messages = list(data)
+        self.__queue("restore", data)
+
+    def session_list(self):
+        return self.storage.session_list()
+
+    def get_session_data(self, id: str):
+        return self.storage.get_session_data(id)
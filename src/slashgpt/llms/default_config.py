@@ -1,29 +1,18 @@
-from slashgpt.llms.engine.hosted import LLMEngineHosted
-from slashgpt.llms.engine.openai_gpt import LLMEngineOpenAIGPT
-from slashgpt.llms.engine.openai_legacy import LLMEngineOpenAILegacy
-from slashgpt.llms.engine.replicate import LLMEngineReplicate
-from slashgpt.llms.engine.anthropic_engine import LLMEngineAnthropic
-from slashgpt.llms.engine.google import LLMEngineGoogle
-from slashgpt.llms.engine.huggingface import LLMEngineHF
-from slashgpt.llms.engine.groq import LLMEngineGroq
-from slashgpt.llms.engine.tne import LLMEngineTNE
-from slashgpt.llms.engine.ollama import LLMEngineOllama
-from slashgpt.llms.engine.openrouter import LLMEngineOpenRouter
-from slashgpt.llms.engine.deepseek import LLMEngineDeepSeek
-
+# Engines are imported on first use (see LlmModel), so that importing slashgpt does not load every SDK.
 default_llm_engine_configs = {
-    "openai-gpt": LLMEngineOpenAIGPT,
-    "tne": LLMEngineTNE,
-    "openai-legacy": LLMEngineOpenAILegacy,
-    "replicate": LLMEngineReplicate,
-    "hosted": LLMEngineHosted,
-    "anthropic_engine": LLMEngineAnthropic,
-    "google": LLMEngineGoogle,
-    "hf": LLMEngineHF,
-    "groq": LLMEngineGroq,
-    "ollama": LLMEngineOllama,
-    "openrouter": LLMEngineOpenRouter,
-    "deepseek": LLMEngineDeepSeek
+    "openai-gpt": {"module_name": "slashgpt.llms.engine.openai_gpt", "class_name": "LLMEngineOpenAIGPT"},
+    "tne": {"module_name": "slashgpt.llms.engine.tne", "class_name": "LLMEngineTNE"},
+    "openai-legacy": {"module_name": "slashgpt.llms.engine.openai_legacy", "class_name": "LLMEngineOpenAILegacy"},
+    "replicate": {"module_name": "slashgpt.llms.engine.replicate", "class_name": "LLMEngineReplicate"},
+    "hosted": {"module_name": "slashgpt.llms.engine.hosted", "class_name": "LLMEngineHosted"},
+    "anthropic_engine": {"module_name": "slashgpt.llms.engine.anthropic_engine", "class_name": "LLMEngineAnthropic"},
+    "google": {"module_name": "slashgpt.llms.engine.google", "class_name": "LLMEngineGoogle"},
+    "hf": {"module_name": "slashgpt.llms.engine.huggingface", "class_name": "LLMEngineHF"},
+    "groq": {"module_name": "slashgpt.llms.engine.groq", "class_name": "LLMEngineGroq"},
+    "ollama": {"module_name": "slashgpt.llms.engine.ollama", "class_name": "LLMEngineOllama"},
+    "openrouter": {"module_name": "slashgpt.llms.engine.openrouter", "class_name": "LLMEngineOpenRouter"},
+    "deepseek": {"module_name": "slashgpt.llms.engine.deepseek", "class_name": "LLMEngineDeepSeek"},
+    "router": {"module_name": "slashgpt.llms.engine.router", "class_name": "LLMEngineRouter"},
 }
 
 default_llm_models = {
@@ -1,13 +1,12 @@
 from __future__ import annotations
 
 import sys
-from typing import TYPE_CHECKING, List, AsyncGenerator
+from typing import TYPE_CHECKING, List, AsyncGenerator, Optional
 
 from anthropic import AsyncAnthropic
-import tiktoken  # for counting tokens
 
 from slashgpt.llms.engine.base import LLMEngineBase
-from slashgpt.utils.print import print_error
+from slashgpt.utils.print import print_debug, print_error
 
 
 if TYPE_CHECKING:
@@ -23,7 +22,52 @@ class LLMEngineAnthropic(LLMEngineBase):
             print_error("ANTHROPIC_API_KEY environment variable is missing from .env")
             sys.exit()
 
-        self.client = AsyncAnthropic(api_key=key)
+        self.__key = key
+
+    @property
+    def client(self):
+        """Asynchronous client, pooled per event loop by the transport registry"""
+        return self.llm_model.transport.async_client(AsyncAnthropic, self.__key, None, self.llm_model.http_limits())
+
+    @classmethod
+    def convert_messages(cls, messages: List[dict]):
+        """Returns (system blocks, messages) in the Anthropic format.
+        Function results are sent as user messages, and consecutive messages of the same role are merged."""
+        system: List[dict] = []
+        conversation: List[dict] = []
+        for message in messages:
+            content = message.get("content")
+            if not content:
+                continue
+            if message.get("role") == "system":
+                system.append({"type": "text", "text": content})
+                continue
+            role = "assistant" if message.get("role") == "assistant" else "user"
+            if message.get("role") == "function":
+                content = f"Result of {message.get('name')}:\n{content}"
+            if conversation and conversation[-1]["role"] == role:
+                conversation[-1]["content"].append({"type": "text", "text": content})
+            elif conversation or role == "user":
+                # the conversation starts with a user message (e.g, the intro message is not sent)
+                conversation.append({"role": role, "content": [{"type": "text", "text": content}]})
+        return (system, conversation)
+
+    @classmethod
+    def add_cache_breakpoints(cls, system: List[dict], conversation: List[dict], marker: Optional[str] = None):
+        """Marks the end of the static system prompt and the end of the conversation with cache_control,
+        so that the next turn reads both prefixes from the cache.
+        The system prompt is split into two blocks at the marker, which begins its dynamic sections (see Manifest.prompt_cache_marker)."""
+        if system:
+            text = system[0]["text"]
+            index = text.find(marker) if marker else -1
+            if index < 0:
+                index = len(text)
+            if index > 0:
+                if index < len(text):
+                    system[0:1] = [{"type": "text", "text": text[:index]}, {"type": "text", "text": text[index:]}]
+                system[0]["cache_control"] = {"type": "ephemeral"}
+        if conversation:
+            conversation[-1]["content"][-1]["cache_control"] = {"type": "ephemeral"}
 
     async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool) -> AsyncGenerator:
         model_name = self.llm_model.name()
@@ -31,20 +75,17 @@ class LLMEngineAnthropic(LLMEngineBase):
         max_tokens = manifest.max_tokens()
 
         # Parse the format to account for Anthropic API format
-        system_prompt = None
-        processed_messages = None
-        for message in messages:
-            if message.get("role") == "system":
-                system_prompt = message.get("content")
-            if message.get("role") == "user":
-                processed_messages = message
+        (system, conversation) = self.convert_messages(messages)
+        if manifest.prompt_cache() is not False:
+            self.add_cache_breakpoints(system, conversation, manifest.prompt_cache_marker())
 
         params = {
             "model": model_name,
-            "messages": [processed_messages],
-            "system": system_prompt,
+            "messages": conversation,
             "max_tokens": max_tokens,
         }
+        if system:
+            params["system"] = system
         if functions:
             raise NotImplementedError
             # params["functions"] = functions
@@ -52,12 +93,9 @@ class LLMEngineAnthropic(LLMEngineBase):
         async with self.client.messages.stream(**params) as stream:
             async for chunk in stream.text_stream:
                 yield chunk
-
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
+            usage = (await stream.get_final_message()).usage
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        self.prompt_cache_stats.record(usage.input_tokens + cache_read + cache_write, cache_read, cache_write)
+        if verbose:
+            print_debug(f"prompt cache: {self.prompt_cache_stats.stats()}")
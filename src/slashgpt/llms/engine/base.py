@@ -1,11 +1,11 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
-from typing import TYPE_CHECKING, List, Optional
-
-import tiktoken  # for counting tokens
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from slashgpt.function.function_call import FunctionCall
+from slashgpt.llms.prompt_cache import PromptCacheStats
+from slashgpt.llms.tokens import TokenBudget, num_tokens
 from slashgpt.utils.print import print_warning
 
 if TYPE_CHECKING:
@@ -13,8 +13,13 @@ if TYPE_CHECKING:
 
 
 class LLMEngineBase(metaclass=ABCMeta):
+    accepts_user = False
+    """True if chat_completion takes the id of the user as "user" (e.g, to forward it to other models)"""
+
     def __init__(self, llm_model):
         self.llm_model = llm_model
+        self.prompt_cache_stats = PromptCacheStats()
+        """Statistics of the provider's prompt-prefix cache (for engines which report it)"""
 
     @abstractmethod
     def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
@@ -80,15 +85,35 @@ class LLMEngineBase(metaclass=ABCMeta):
         return "\n".join(prompts)
 
     """
-    is_within_budget method is for vector db/engine.
+    batch_request, submit_batch and retrieve_batch methods are for the provider's batch API (see slashgpt.batch).
+    """
+
+    def batch_request(self, messages: List[dict], manifest: Manifest) -> Optional[dict]:
+        """Returns the body of the request for the provider's batch API, or None if the engine does not support it
+        (or the manifest needs a feature which the batch API does not offer)"""
+        return None
+
+    def submit_batch(self, requests: List[dict]) -> str:
+        """Submits the requests ({"custom_id", "body"}) to the provider's batch API, and returns the id of the batch"""
+        raise NotImplementedError(f"{self.llm_model.name()} does not support the batch API")
+
+    def retrieve_batch(self, batch_id: str) -> Tuple[str, Optional[Dict[str, dict]]]:
+        """Returns the status of the batch and, once it is finished, its results
+        ({custom_id: {"content", "prompt_tokens", "completion_tokens"} or {"error"}})"""
+        raise NotImplementedError(f"{self.llm_model.name()} does not support the batch API")
+
+    """
+    is_within_budget and token_budget methods are for vector db/engine.
     """
 
     def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
-
-    def __num_tokens(self, text: str):
-        """Calculate the llm token of the text. Because this is for openai, override it if you use another language model."""
-        model_name = self.llm_model.name() if self.llm_model.name().startswith("gpt-") else "gpt-3.5-turbo-0613"
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
+        return self.num_tokens(text) <= self.token_budget().budget
+
+    def token_budget(self) -> TokenBudget:
+        """Returns an incremental accumulator of the token budget for the retrieved articles"""
+        return TokenBudget(self.llm_model.max_token() - 500, self.llm_model.name())
+
+    def num_tokens(self, text: str) -> int:
+        """Calculate the llm token of the text with a cached tiktoken encoder.
+        Unknown (non-OpenAI) model names fall back to the default encoding. Override it for an exact count."""
+        return num_tokens(text, self.llm_model.name())
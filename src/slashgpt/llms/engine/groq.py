@@ -3,8 +3,6 @@ from __future__ import annotations
 import sys
 from typing import TYPE_CHECKING, List, AsyncGenerator
 
-import tiktoken  # for counting tokens
-
 from slashgpt.llms.engine.base import LLMEngineBase
 from slashgpt.utils.print import print_error
 
@@ -23,16 +21,18 @@ class LLMEngineGroq(LLMEngineBase):
             print_error("GROQ_API_KEY environment variable is missing from .env")
             sys.exit()
 
-        self.client = Groq(api_key=key)
-        self.async_client = AsyncGroq(api_key=key)
-
-        # Override default openai endpoint for custom-hosted models
-        api_base = llm_model.get_api_base()
-        if api_base:
-            self.async_client.api_base = api_base
+        self.__key = key
+        # Override default groq endpoint for custom-hosted models
+        self.__api_base = llm_model.get_api_base()
+        self.client = llm_model.transport.client(Groq, key, self.__api_base, llm_model.http_limits())
 
         return
 
+    @property
+    def async_client(self):
+        """Asynchronous client, pooled per event loop by the transport registry"""
+        return self.llm_model.transport.async_client(AsyncGroq, self.__key, self.__api_base, self.llm_model.http_limits())
+
     async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool) -> AsyncGenerator:
         # For now, we are trying to force as much determinism as possible
         temperature = 0.00000000001
@@ -65,12 +65,3 @@ class LLMEngineGroq(LLMEngineBase):
             resp = chunk.choices[0].delta.content
             collected_messages.append(resp)
             yield resp
-
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import os
-import aiohttp
 
 from typing import TYPE_CHECKING, List, AsyncGenerator
 from slashgpt.llms.engine.base import LLMEngineBase
@@ -40,16 +39,16 @@ class LLMEngineHF(LLMEngineBase):
         self.headers = {"Authorization": f"Bearer {key}"}
 
     async def query(self, payload) -> AsyncGenerator:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.url, json=payload, headers=self.headers) as response:
-                # Success case
-                if response.status == 200:
-                    yield await response.json()
-                # Waiting for model to load into memory on inference endpoint
-                elif response.status == 503:
-                    yield RESP_503
-                else:
-                    yield "HuggingFace inference failed. Please try again later."
+        session = self.llm_model.transport.aiohttp_session(API_BASE, self.llm_model.http_limits())
+        async with session.post(self.url, json=payload, headers=self.headers) as response:
+            # Success case
+            if response.status == 200:
+                yield await response.json()
+            # Waiting for model to load into memory on inference endpoint
+            elif response.status == 503:
+                yield RESP_503
+            else:
+                yield "HuggingFace inference failed. Please try again later."
 
     async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool) -> AsyncGenerator:
         payload_str = ""
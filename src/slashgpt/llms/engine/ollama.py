@@ -3,11 +3,8 @@ from __future__ import annotations
 import sys
 from typing import TYPE_CHECKING, List, AsyncGenerator
 
-import tiktoken  # for counting tokens
-
 import json
 import base64
-import aiohttp
 import binascii
 
 from slashgpt.llms.engine.base import LLMEngineBase
@@ -72,26 +69,16 @@ class LLMEngineOllama(LLMEngineBase):
             "prompt": " ".join(msg['content'] for msg in messages)
         }
 
-        # Make the request and stream the response.
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.api_base, json=payload) as response:
-                if response.status != 200:
-                    yield f"Error: {response.status} - {await response.text()}"
-                    return
-
-                # Stream and yield the response line-by-line.
-                async for line in response.content:
-                    decoded_line = line.decode('utf-8').strip()
-                    decoded_line_json = json.loads(decoded_line)
-                    resp = decoded_line_json.get("response")
-                    yield resp
-
-
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
+        # Make the request and stream the response (the session is pooled by the transport registry).
+        session = self.llm_model.transport.aiohttp_session(self.api_base, self.llm_model.http_limits())
+        async with session.post(self.api_base, json=payload) as response:
+            if response.status != 200:
+                yield f"Error: {response.status} - {await response.text()}"
+                return
+
+            # Stream and yield the response line-by-line.
+            async for line in response.content:
+                decoded_line = line.decode('utf-8').strip()
+                decoded_line_json = json.loads(decoded_line)
+                resp = decoded_line_json.get("response")
+                yield resp
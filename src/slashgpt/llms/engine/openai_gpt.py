@@ -1,17 +1,18 @@
 from __future__ import annotations
 
+import json
 import sys
-from typing import TYPE_CHECKING, List, AsyncGenerator
+from typing import TYPE_CHECKING, Dict, List, AsyncGenerator, Optional, Tuple
 
+import httpx
 from openai import OpenAI, AsyncOpenAI
-import tiktoken  # for counting tokens
 
 import base64
 import binascii
 
 from slashgpt.function.function_call import FunctionCall
 from slashgpt.llms.engine.base import LLMEngineBase
-from slashgpt.utils.print import print_error
+from slashgpt.utils.print import print_debug, print_error
 
 
 if TYPE_CHECKING:
@@ -19,6 +20,10 @@ if TYPE_CHECKING:
     from slashgpt.manifest import Manifest
 
 
+BATCH_FINAL_STATUSES = ["completed", "failed", "expired", "cancelled"]
+"""Statuses of a batch (of the batch API) which will not change any more"""
+
+
 # Helper functions for determining image type
 def is_base64_png(s):
     """Determines if a serialized string represents a base644 encoded PNG"""
@@ -60,16 +65,17 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
             print_error("OPENAI_API_KEY environment variable is missing from .env")
             sys.exit()
 
-        api_base = llm_model.get_api_base()
-        if api_base:
-            self.client = OpenAI(api_key=key, base_url=api_base)
-            self.async_client = AsyncOpenAI(api_key=key, base_url=api_base)
-        else:
-            self.client = OpenAI(api_key=key)
-            self.async_client = AsyncOpenAI(api_key=key)
+        self.__key = key
+        self.__api_base = llm_model.get_api_base()
+        self.client = llm_model.transport.client(OpenAI, key, self.__api_base, llm_model.http_limits())
 
         return
 
+    @property
+    def async_client(self):
+        """Asynchronous client, pooled per event loop by the transport registry"""
+        return self.llm_model.transport.async_client(AsyncOpenAI, self.__key, self.__api_base, self.llm_model.http_limits())
+
     def image_completion(self, messages: List[dict], manifest: Manifest, verbose: bool) -> str:
         params = {
             "model": manifest.model().get("model_name"),
@@ -165,14 +171,16 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
                         tools_list.append({"type": "function", "function": function})
                     params.update({"tools": tools_list, "tool_choice": "auto"})
                 response = await self.async_client.chat.completions.create(**params)
+                self.__record_usage(response.usage, verbose)
 
             answer = response.choices[0].message
 
             res = answer.content
 
             if answer.tool_calls:
-                function_call = FunctionCall(answer.tool_calls[0].function, manifest)
-                yield function_call
+                # The model may ask for several (independent) calls at once; the session executes them concurrently.
+                for tool_call in answer.tool_calls:
+                    yield FunctionCall(tool_call.function, manifest)
             else:
                 yield res
 
@@ -180,6 +188,9 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
             # TODO(lucas): Support streaming and function calls (this only processes the text)
             stream_keys = ["model", "stream", "messages", "top_p", "seed"]
             stream_params = {k: params.get(k) for k in stream_keys}
+            if verbose:
+                # the last chunk reports the usage (including the cached tokens) without choices
+                stream_params["extra_body"] = {"stream_options": {"include_usage": True}}
 
             if model_name == "gpt-4-vision-preview":
                 stream = self.async_client.chat.completions.create(max_tokens=4096, **stream_params)
@@ -188,6 +199,9 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
 
             collected_messages = []
             async for chunk in await stream:
+                if not chunk.choices:
+                    self.__record_usage(getattr(chunk, "usage", None), verbose)
+                    continue
                 message = chunk.choices[0].delta.content
                 function_call = chunk.choices[0].delta.tool_calls
                 if function_call:
@@ -196,11 +210,61 @@ class LLMEngineOpenAIGPT(LLMEngineBase):
                     collected_messages.append(message)
                     yield message
 
-    def __num_tokens(self, text: str):
+    def batch_request(self, messages: List[dict], manifest: Manifest) -> Optional[dict]:
         model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
+        # function calls need the call loop, and images and o1 models need the special handling of chat_completion
+        if manifest.functions() or manifest.images() or "o1-" in model_name or model_name == "dall-e-3":
+            return None
+        body = {"model": model_name, "messages": messages, "top_p": 0.00000000000001, "n": manifest.num_completions()}
+        if manifest.manifest().get("seed") is not None:
+            body["seed"] = manifest.manifest().get("seed")
+        return body
+
+    def submit_batch(self, requests: List[dict]) -> str:
+        # the batch API is not in this version of the SDK, so it is called through the generic methods of the client
+        lines = [
+            json.dumps({"custom_id": request["custom_id"], "method": "POST", "url": "/v1/chat/completions", "body": request["body"]})
+            for request in requests
+        ]
+        file = self.client.files.create(file=("batch.jsonl", ("\n".join(lines) + "\n").encode("utf-8")), purpose="batch")
+        body = {"input_file_id": file.id, "endpoint": "/v1/chat/completions", "completion_window": "24h"}
+        return self.client.post("/batches", body=body, cast_to=httpx.Response).json()["id"]
+
+    def retrieve_batch(self, batch_id: str) -> Tuple[str, Optional[Dict[str, dict]]]:
+        batch = self.client.get(f"/batches/{batch_id}", cast_to=httpx.Response).json()
+        status = batch.get("status")
+        if status not in BATCH_FINAL_STATUSES:
+            return (status, None)
+        results: Dict[str, dict] = {}
+        # the output file has the successful requests, and the error file has the failed ones
+        for file_id in [batch.get("output_file_id"), batch.get("error_file_id")]:
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                response = data.get("response") or {}
+                body = response.get("body") or {}
+                if data.get("error") or response.get("status_code") != 200:
+                    results[data["custom_id"]] = {"error": str(data.get("error") or body.get("error") or body)}
+                else:
+                    usage = body.get("usage") or {}
+                    results[data["custom_id"]] = {
+                        "content": body["choices"][0]["message"].get("content") or "",
+                        "prompt_tokens": usage.get("prompt_tokens"),
+                        "completion_tokens": usage.get("completion_tokens"),
+                    }
+        return (status, results)
+
+    def __record_usage(self, usage, verbose: bool):
+        # OpenAI caches the longest common prefix of prompts (1024 tokens or more) automatically
+        # (fields unknown to this version of the SDK are kept as dicts)
+        def field(data, name: str):
+            return data.get(name) if isinstance(data, dict) else getattr(data, name, None)
+
+        if usage is None:
+            return
+        self.prompt_cache_stats.record(field(usage, "prompt_tokens"), field(field(usage, "prompt_tokens_details"), "cached_tokens"))
+        if verbose:
+            print_debug(f"prompt cache: {self.prompt_cache_stats.stats()}")
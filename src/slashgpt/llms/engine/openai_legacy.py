@@ -4,7 +4,6 @@ import json
 import sys
 from typing import TYPE_CHECKING, List
 
-import tiktoken  # for counting tokens
 from openai import OpenAI
 
 from slashgpt.llms.engine.base import LLMEngineBase
@@ -22,12 +21,9 @@ class LLMEngineOpenAILegacy(LLMEngineBase):
         if key == "":
             print_error("OPENAI_API_KEY environment variable is missing from .env")
             sys.exit()
-        self.client = OpenAI(api_key=key)
-
         # Override default openai endpoint for custom-hosted models
         api_base = llm_model.get_api_base()
-        if api_base:
-            self.client.base_url = api_base
+        self.client = llm_model.transport.client(OpenAI, key, api_base, llm_model.http_limits())
 
         return
 
@@ -40,7 +36,7 @@ class LLMEngineOpenAILegacy(LLMEngineBase):
             stream=manifest.stream(),
             n=manifest.num_completions(),
             logprobs=manifest.logprobs(),
-            max_tokens=self.llm_model.max_token() - self.__num_tokens(prompt),
+            max_tokens=self.llm_model.max_token() - self.num_tokens(prompt),
         )
 
         if verbose:
@@ -56,12 +52,3 @@ class LLMEngineOpenAILegacy(LLMEngineBase):
         role = "assistant"
 
         return (role, res, function_call, None)
-
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
@@ -4,7 +4,6 @@ import sys
 from typing import TYPE_CHECKING, List, AsyncGenerator
 
 from openai import OpenAI, AsyncOpenAI
-import tiktoken  # for counting tokens
 
 import base64
 import binascii
@@ -60,13 +59,17 @@ class LLMEngineOpenRouter(LLMEngineBase):
             print_error("OPENROUTER_API_KEY environment variable is missing from .env")
             sys.exit()
 
-        api_base = "https://openrouter.ai/api/v1"
-        if api_base:
-            self.client = OpenAI(api_key=key, base_url=api_base)
-            self.async_client = AsyncOpenAI(api_key=key, base_url=api_base)
+        self.__key = key
+        self.__api_base = "https://openrouter.ai/api/v1"
+        self.client = llm_model.transport.client(OpenAI, key, self.__api_base, llm_model.http_limits())
 
         return
 
+    @property
+    def async_client(self):
+        """Asynchronous client, pooled per event loop by the transport registry"""
+        return self.llm_model.transport.async_client(AsyncOpenAI, self.__key, self.__api_base, self.llm_model.http_limits())
+
     def image_completion(self, messages: List[dict], manifest: Manifest, verbose: bool) -> str:
         params = {
             "model": manifest.model().get("model_name"),
@@ -168,8 +171,9 @@ class LLMEngineOpenRouter(LLMEngineBase):
             res = answer.content
 
             if answer.tool_calls:
-                function_call = FunctionCall(answer.tool_calls[0].function, manifest)
-                yield function_call
+                # The model may ask for several (independent) calls at once; the session executes them concurrently.
+                for tool_call in answer.tool_calls:
+                    yield FunctionCall(tool_call.function, manifest)
             else:
                 yield res
 
@@ -192,12 +196,3 @@ class LLMEngineOpenRouter(LLMEngineBase):
                 if message:
                     collected_messages.append(message)
                     yield message
-
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
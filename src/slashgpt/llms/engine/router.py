@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, AsyncGenerator, List, Optional
+
+from slashgpt.llms.engine.base import LLMEngineBase
+from slashgpt.utils.print import print_debug, print_error, print_warning
+
+if TYPE_CHECKING:
+    from slashgpt.llms.model import LlmModel
+    from slashgpt.manifest import Manifest
+
+
+class MemberStats:
+    """Rolling latency (time to the first message) and error rate of a member of LLMEngineRouter"""
+
+    def __init__(self, window: int = 100, cooldown: float = 5.0):
+        """
+        Args:
+
+            window (int): number of recent requests to keep
+            cooldown (float): seconds to avoid a member after an error (doubled for each consecutive error, up to 300)
+        """
+        self.latencies: deque = deque(maxlen=window)
+        """Recent latencies of successful requests in seconds"""
+        self.outcomes: deque = deque(maxlen=window)
+        """Recent outcomes (True for success)"""
+        self.cooldown = cooldown
+        self.consecutive_errors = 0
+        self.retry_at = 0.0
+        """Monotonic time until which the member is unhealthy"""
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Returns the p-th percentile (0-100) of the recent latencies, or None if there is none"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+    def error_rate(self) -> float:
+        """Returns the rate of errors among the recent requests"""
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.retry_at
+
+    def score(self) -> float:
+        """Expected latency including retries (members without samples score 0, so that they are measured first)"""
+        return (self.percentile(50) or 0.0) / max(1.0 - self.error_rate(), 0.1)
+
+    def success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_errors = 0
+        self.retry_at = 0.0
+
+    def error(self):
+        self.outcomes.append(False)
+        self.consecutive_errors += 1
+        self.retry_at = time.monotonic() + min(self.cooldown * 2 ** (self.consecutive_errors - 1), 300.0)
+
+    def stats(self) -> dict:
+        return {
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "error_rate": self.error_rate(),
+            "requests": len(self.outcomes),
+            "healthy": self.healthy(),
+        }
+
+
+class LLMEngineRouter(LLMEngineBase):
+    """Engine which routes each request to the fastest healthy member of a pool of models.
+
+    The model data specifies:
+
+        members (list of dict): model data of the members (e.g, the same model hosted by several providers)
+        hedge_after (float or "p95", optional): seconds to wait for the first message before sending the same request
+            to the next member ("p95" waits for the p95 latency of the first member). No hedging by default.
+        cooldown (float, optional): seconds to avoid a member after an error (5 by default)
+
+    Members are ranked by their rolling p50 latency (to the first message) and error rate, and unhealthy ones
+    (recently failed) are tried last. A request fails over to the next member on an error before the first message,
+    and the first member to yield a message wins (the other one is cancelled).
+    Members with synchronous engines block the event loop, so hedging is effective for asynchronous engines only.
+    The id of the user is forwarded to the members, so that their rate limiters stay fair among users.
+    """
+
+    accepts_user = True
+
+    def __init__(self, llm_model: LlmModel):
+        super().__init__(llm_model)
+        from slashgpt.llms.model import LlmModel
+
+        cooldown = llm_model.get("cooldown") or 5.0
+        self.members: List[LlmModel] = []
+        """Member models"""
+        self.member_stats: List[MemberStats] = []
+        for member_data in llm_model.get("members") or []:
+            if member_data.get("api_key") and os.getenv(member_data.get("api_key")) is None:
+                print_warning(f"LLMEngineRouter: {member_data.get('model_name')} is skipped ({member_data.get('api_key')} is missing)")
+                continue
+            member = LlmModel(member_data, llm_model.llm_engine_configs, transport=llm_model.transport, rate_limiter=llm_model.rate_limiter)
+            if member.engine:
+                self.members.append(member)
+                self.member_stats.append(MemberStats(cooldown=cooldown))
+        if not self.members:
+            print_error(f"LLMEngineRouter: no available member in {llm_model.name()}")
+
+    def ranked(self) -> List[int]:
+        """Returns the indices of the members in the order to try"""
+        return sorted(range(len(self.members)), key=lambda i: (not self.member_stats[i].healthy(), self.member_stats[i].score()))
+
+    def hedge_delay(self, index: int) -> Optional[float]:
+        hedge_after = self.llm_model.get("hedge_after")
+        if hedge_after == "p95":
+            return self.member_stats[index].percentile(95)
+        return hedge_after
+
+    async def __first_message(self, index: int, messages: List[dict], manifest: Manifest, verbose: bool, user: str):
+        generator = self.members[index].generate_response(messages, manifest, verbose, user)
+        started = time.monotonic()
+        try:
+            first = await generator.__anext__()
+        except StopAsyncIteration:
+            first = None
+        return (generator, first, time.monotonic() - started)
+
+    async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool, user: str = "") -> AsyncGenerator:
+        if not self.members:
+            raise RuntimeError(f"LLMEngineRouter: no available member in {self.llm_model.name()}")
+        candidates = self.ranked()
+        pending: dict = {}
+        last_error: Optional[Exception] = None
+        winner = None
+
+        def launch():
+            index = candidates.pop(0)
+            task = asyncio.ensure_future(self.__first_message(index, messages, manifest, verbose, user))
+            pending[task] = index
+            return index
+
+        primary = launch()
+        hedged = False
+        try:
+            while pending and winner is None:
+                delay = self.hedge_delay(primary) if not hedged and candidates else None
+                (done, _) = await asyncio.wait(pending.keys(), timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    index = launch()
+                    if verbose:
+                        print_debug(f"LLMEngineRouter: hedged to {self.members[index].name()} after {delay}s")
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        (generator, first, latency) = task.result()
+                    except Exception as e:
+                        last_error = e
+                        self.member_stats[index].error()
+                        if verbose:
+                            print_warning(f"LLMEngineRouter: {self.members[index].name()} failed ({e})")
+                        if not pending and candidates:
+                            primary = launch()
+                            hedged = False
+                        continue
+                    self.member_stats[index].success(latency)
+                    if winner is None:
+                        winner = (index, generator, first)
+                    else:
+                        await generator.aclose()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if winner is None:
+            raise last_error
+        (index, generator, first) = winner
+        if verbose:
+            print_debug(f"LLMEngineRouter: {self.members[index].name()} {self.stats()}")
+        if first is None:
+            return
+        yield first
+        try:
+            async for message in generator:
+                yield message
+        except Exception:
+            self.member_stats[index].error()
+            raise
+
+    def stats(self) -> dict:
+        """Returns the statistics of the members (for verbose mode)"""
+        return {member.name(): stats.stats() for member, stats in zip(self.members, self.member_stats)}
@@ -4,7 +4,6 @@ import sys
 from typing import TYPE_CHECKING, List, AsyncGenerator
 
 from openai import OpenAI, AsyncOpenAI
-import tiktoken  # for counting tokens
 
 import base64
 import binascii
@@ -59,12 +58,17 @@ class LLMEngineTNE(LLMEngineBase):
             print_error("OPENAI_API_KEY environment variable is missing from .env")
             sys.exit()
 
-        api_base = "http://chatapi.app.tne.ai/v1"
-        self.client = OpenAI(api_key=key, base_url=api_base)
-        self.async_client = AsyncOpenAI(api_key=key, base_url=api_base)
+        self.__key = key
+        self.__api_base = "http://chatapi.app.tne.ai/v1"
+        self.client = llm_model.transport.client(OpenAI, key, self.__api_base, llm_model.http_limits())
 
         return
 
+    @property
+    def async_client(self):
+        """Asynchronous client, pooled per event loop by the transport registry"""
+        return self.llm_model.transport.async_client(AsyncOpenAI, self.__key, self.__api_base, self.llm_model.http_limits())
+
     async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool) -> AsyncGenerator:
         model_name = self.llm_model.name()
         temperature = 0
@@ -87,13 +91,3 @@ class LLMEngineTNE(LLMEngineBase):
             if chunk.choices[0].finish_reason is None:
                 content = chunk.choices[0].delta.content
                 yield content
-
-
-    def __num_tokens(self, text: str):
-        model_name = self.llm_model.name()
-        encoding = tiktoken.encoding_for_model(model_name)
-        return len(encoding.encode(text))
-
-    def is_within_budget(self, text: str, verbose: bool = False):
-        token_budget = self.llm_model.max_token() - 500
-        return self.__num_tokens(text) <= token_budget
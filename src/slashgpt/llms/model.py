@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import importlib
 import inspect
 import os
-from typing import TYPE_CHECKING, List, AsyncGenerator
+from typing import TYPE_CHECKING, List, AsyncGenerator, Optional
 
-from slashgpt.utils.print import print_error
+from slashgpt.llms.rate_limiter import DEFAULT_MAX_RETRIES, RateLimiter, RateLimiterRegistry, default_rate_limiter, rate_limit_delay
+from slashgpt.llms.response_cache import ResponseCache
+from slashgpt.llms.transport import TransportRegistry, default_transport
+from slashgpt.utils.print import print_debug, print_error, print_warning
+from slashgpt.utils.utils import load_class
 
 if TYPE_CHECKING:
     from slashgpt.manifest import Manifest
@@ -14,7 +17,14 @@ if TYPE_CHECKING:
 class LlmModel:
     """It represents a LLM model such as Llama2 and GPT3.5"""
 
-    def __init__(self, llm_model_data: dict, llm_engine_configs: dict):
+    def __init__(
+        self,
+        llm_model_data: dict,
+        llm_engine_configs: dict,
+        transport: Optional[TransportRegistry] = None,
+        response_cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[RateLimiterRegistry] = None,
+    ):
         """Although it is possible to create LlmModel object directly,
         you should use one of ChatConfig method to create it instead.
 
@@ -22,6 +32,9 @@ class LlmModel:
 
             llm_model_data (dict): parameters to the LLM model (dict)
             llm_engine_configs (dict): dictionary of LLM engines
+            transport (TransportRegistry, optional): registry of pooled HTTP clients (process-wide one by default)
+            response_cache (ResponseCache, optional): cache of responses (no cache by default)
+            rate_limiter (RateLimiterRegistry, optional): registry of rate limiters (process-wide one by default)
         """
         self.llm_model_data = llm_model_data
         """
@@ -33,7 +46,17 @@ class LlmModel:
             api_base (str): endpoint url hosted models compatible with OpenAI chat completions API
             max_token (str): maximum token length (e.g, 4096)
             default (boolean, optional): True if this is the default model
+            http_limits (dict, optional): connection pool limits (e.g, {"max_connections": 50})
+            rate_limits (dict, optional): budgets of the provider (e.g, {"rpm": 500, "tpm": 90000, "completion_tokens": 1024, "max_retries": 3})
         """
+        self.transport: TransportRegistry = transport or default_transport
+        """Registry of pooled HTTP clients, which engines use to talk to their endpoints"""
+        self.response_cache: Optional[ResponseCache] = response_cache
+        """Cache of responses, which replays the response to an identical request without calling the engine"""
+        self.llm_engine_configs = llm_engine_configs
+        """Dictionary of LLM engines (e.g, for engines which create member models)"""
+        self.rate_limiter: RateLimiterRegistry = rate_limiter or default_rate_limiter
+        """Registry of rate limiters, which schedules the requests to each provider"""
         self.engine = self.__get_engine(llm_engine_configs)
         """A subclass of LLEngineBase,
         which implements chat_completion method for a particular LLM
@@ -65,6 +88,10 @@ class LlmModel:
         """Returns the api key specified in the environment"""
         return os.getenv(self.get("api_key"), "")
 
+    def http_limits(self):
+        """Returns the connection pool limits specified for this model (dict, optional)"""
+        return self.get("http_limits")
+
     def get_api_base(self):
         """Returns the openai api base url"""
         if ":free" in self.name():  # Hacky detection for OpenRouter
@@ -76,17 +103,13 @@ class LlmModel:
         class_data = llm_engine_configs.get(self.engine_name())
 
         if class_data:
-            if inspect.isclass(class_data):
-                return class_data(self)
-            else:
-                module = importlib.import_module(class_data["module_name"])
-                my_class = getattr(module, class_data["class_name"])
-                return my_class(self)
+            # engines specified by module_name and class_name are imported on first use
+            return load_class(class_data)(self)
         else:
             print_error("No engine name: " + self.engine_name())
             return None
 
-    async def generate_response(self, messages: List[dict], manifest: Manifest, verbose: bool) -> AsyncGenerator:
+    async def generate_response(self, messages: List[dict], manifest: Manifest, verbose: bool, user: str = "") -> AsyncGenerator:
         """It calls the engine's chat_completion method
 
         Args:
@@ -94,27 +117,92 @@ class LlmModel:
             messages (list of dict): chat messages
             manifest (Manifest): it specifies the behavior of the LLM agent
             verbose (bool): True if it's in verbose mode.
+            user (str, optional): id of the user, for the fairness of the rate limiter
+
+        Yields:
+
+            str (a chunk of the message) or FunctionCall
         """
-        if manifest.stream() is False:
-            async for message in self.engine.chat_completion(messages, manifest, verbose):
-                yield message
-        else:
-            # Regular chat completion
-            if manifest.get("model"):
-                if manifest.get("model").get("model_name") == "dall-e-3":
-                    img_url = self.engine.image_completion(messages, manifest, verbose)
-                    yield img_url
+        if manifest.stream() is not False and manifest.get("model") and isinstance(manifest.get("model"), dict):
+            if manifest.get("model").get("model_name") == "dall-e-3":
+                yield self.engine.image_completion(messages, manifest, verbose)
+                return
+
+        key = ResponseCache.key(self, messages, manifest) if self.response_cache is not None else None
+        if key:
+            cached_events = self.response_cache.get(key)
+            if verbose:
+                print_debug(f"response_cache {'hit' if cached_events is not None else 'miss'}: {self.response_cache.stats()}")
+            if cached_events is not None:
+                for message in ResponseCache.replay(cached_events, manifest):
+                    yield message
+                return
+
+        events: Optional[List[dict]] = [] if key else None
+        async for message in self.__chat_completion(messages, manifest, verbose, user):
+            if events is not None:
+                event = ResponseCache.record(message)
+                if event:
+                    events.append(event)
+                else:
+                    # Responses with non-replayable messages (e.g, raw streaming deltas) are not cached
+                    events = None
+            yield message
+        if key and events:
+            self.response_cache.set(key, events)
+
+    def get_rate_limiter(self) -> RateLimiter:
+        """Returns the rate limiter of the provider (the engine with the api key) of this model"""
+        return self.rate_limiter.get(
+            self.engine_name(), self.get("api_base"), self.get_api_key_value() if self.get("api_key") else "", self.get("rate_limits")
+        )
+
+    def estimate_tokens(self, messages: List[dict]) -> int:
+        """Returns the estimated number of tokens of a request (the messages and "completion_tokens" of "rate_limits")"""
+        rate_limits = self.get("rate_limits") or {}
+        return sum(self.num_tokens(message.get("content") or "") for message in messages) + rate_limits.get("completion_tokens", 0)
+
+    async def __chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool, user: str) -> AsyncGenerator:
+        limiter = self.get_rate_limiter()
+        rate_limits = self.get("rate_limits") or {}
+        tokens = self.estimate_tokens(messages) if rate_limits.get("tpm") else 0
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens, user)
+            started = False
+            try:
+                if self.engine.accepts_user:
+                    result = self.engine.chat_completion(messages, manifest, verbose, user=user)
                 else:
-                    async for message in self.engine.chat_completion(messages, manifest, verbose):
+                    result = self.engine.chat_completion(messages, manifest, verbose)
+                if inspect.isasyncgen(result):
+                    async for message in result:
+                        started = True
                         yield message
-            else:
-                collected_messages = []
-                async for message in self.engine.chat_completion(messages, manifest, verbose):
-                    collected_messages.append(message)
-                    yield message
+                elif isinstance(result, tuple):
+                    # Engines implemented in the synchronous style return (role, res, function_call, token_usage)
+                    (_role, res, function_call, *_rest) = result
+                    if res:
+                        yield res
+                    if function_call:
+                        yield function_call
+                return
+            except Exception as e:
+                # rate limit errors are retried (before any message is yielded), pausing all the requests to the provider
+                delay = rate_limit_delay(e, attempt)
+                if delay is None or started or attempt >= rate_limits.get("max_retries", DEFAULT_MAX_RETRIES):
+                    raise
+                limiter.pause(delay)
+                attempt += 1
+                if verbose:
+                    print_warning(f"{self.name()}: rate limited, retrying in {delay:.1f}s {limiter.stats()}")
 
     def num_tokens(self, text: str):
         return self.engine.num_tokens(text)
 
     def is_within_budget(self, text: str, verbose: bool):
         return self.engine.is_within_budget(text, verbose)
+
+    def token_budget(self):
+        """Returns an incremental token budget accumulator (TokenBudget) for the retrieved articles"""
+        return self.engine.token_budget()
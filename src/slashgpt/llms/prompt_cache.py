@@ -0,0 +1,42 @@
+from typing import Optional
+
+
+class PromptCacheStats:
+    """Statistics of the provider's prompt-prefix cache, collected from the usage of each response (for verbose mode)"""
+
+    def __init__(self):
+        self.requests = 0
+        """Number of recorded responses"""
+        self.input_tokens = 0
+        """Number of input tokens (including the cached ones)"""
+        self.cached_tokens = 0
+        """Number of input tokens read from the cache"""
+        self.cache_write_tokens = 0
+        """Number of input tokens written to the cache (Anthropic)"""
+
+    def record(self, input_tokens: int, cached_tokens: Optional[int], cache_write_tokens: Optional[int] = None):
+        """Records the usage of a response
+
+        Args:
+
+            input_tokens (int): input tokens (including the cached ones)
+            cached_tokens (int, optional): input tokens read from the cache
+            cache_write_tokens (int, optional): input tokens written to the cache
+        """
+        self.requests += 1
+        self.input_tokens += input_tokens or 0
+        self.cached_tokens += cached_tokens or 0
+        self.cache_write_tokens += cache_write_tokens or 0
+
+    def hit_rate(self) -> float:
+        """Returns the rate of the input tokens read from the cache"""
+        return self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_write_tokens": self.cache_write_tokens,
+            "hit_rate": round(self.hit_rate(), 3),
+        }
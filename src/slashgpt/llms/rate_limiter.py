@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional
+
+RETRY_BACKOFF = 1.0
+"""Base delay (seconds) of the exponential backoff on rate limit errors without Retry-After"""
+
+DEFAULT_MAX_RETRIES = 3
+"""Default number of retries on rate limit errors (429). Each model may override it with "max_retries" of "rate_limits"."""
+
+
+class TokenBucket:
+    """Token bucket, which refills "per_minute" units per minute (and holds up to a minute worth of them)"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def __refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Returns seconds until the amount is available"""
+        self.__refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def consume(self, amount: float, now: float):
+        self.__refill(now)
+        self.level -= min(amount, self.capacity)
+
+
+class _Ticket:
+    def __init__(self, tokens: int, loop: asyncio.AbstractEventLoop):
+        self.tokens = tokens
+        self.loop = loop
+        self.future: asyncio.Future = loop.create_future()
+
+
+class RateLimiter:
+    """Scheduler of the requests to a provider (an engine with an api key), which enforces requests-per-minute
+    and tokens-per-minute budgets. Waiting requests are granted round-robin across users (FIFO for each user),
+    so that a user with many requests does not starve the others.
+
+    It is shared by event loops and threads (the queue is guarded by a lock, and each request waits on its own loop).
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        """
+        Args:
+
+            rpm (float, optional): requests per minute (unlimited if not specified)
+            tpm (float, optional): tokens per minute (unlimited if not specified)
+        """
+        self.requests: Optional[TokenBucket] = TokenBucket(rpm) if rpm else None
+        """Bucket of requests per minute"""
+        self.tokens: Optional[TokenBucket] = TokenBucket(tpm) if tpm else None
+        """Bucket of tokens per minute"""
+        self.paused_until = 0.0
+        """Monotonic time until which no request is granted (after a rate limit error)"""
+        self.granted = 0
+        """Number of granted requests"""
+        self.rate_limited = 0
+        """Number of rate limit errors reported by pause"""
+        self.__queues: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__timer: Optional[tuple] = None
+
+    async def acquire(self, tokens: int = 0, user: str = ""):
+        """Waits until the request (of the estimated number of tokens) is within the budgets
+
+        Args:
+
+            tokens (int): estimated number of tokens (prompt and completion) of the request
+            user (str): id of the user, whose requests are queued in order
+        """
+        ticket = _Ticket(tokens, asyncio.get_running_loop())
+        with self.__lock:
+            self.__queues.setdefault(user, deque()).append(ticket)
+            self.__dispatch()
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            with self.__lock:
+                queue = self.__queues.get(user)
+                if queue and ticket in queue:
+                    queue.remove(ticket)
+                    if not queue:
+                        del self.__queues[user]
+                    self.__dispatch()
+            raise
+
+    def pause(self, seconds: float):
+        """Stops granting requests for the seconds (e.g, Retry-After of a rate limit error)"""
+        with self.__lock:
+            self.rate_limited += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def __wait_time(self, tokens: int, now: float) -> float:
+        wait = self.paused_until - now
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return wait
+
+    def __dispatch(self):
+        # called with the lock held: grants the requests at the head of the round-robin while they are within the budgets
+        now = time.monotonic()
+        while self.__queues:
+            (user, queue) = next(iter(self.__queues.items()))
+            ticket = queue[0]
+            if ticket.loop.is_closed():
+                queue.popleft()
+                if not queue:
+                    del self.__queues[user]
+                continue
+            wait = self.__wait_time(ticket.tokens, now)
+            if wait > 0:
+                self.__arm(ticket.loop, now + wait)
+                return
+            if self.requests:
+                self.requests.consume(1, now)
+            if self.tokens and ticket.tokens:
+                self.tokens.consume(ticket.tokens, now)
+            self.granted += 1
+            queue.popleft()
+            if queue:
+                self.__queues.move_to_end(user)
+            else:
+                del self.__queues[user]
+            ticket.loop.call_soon_threadsafe(self.__grant, ticket.future)
+
+    @classmethod
+    def __grant(cls, future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+
+    def __arm(self, loop: asyncio.AbstractEventLoop, deadline: float):
+        # one timer at a time (unless its loop is gone), which dispatches again at the deadline
+        if self.__timer and self.__timer[0] <= deadline and not self.__timer[1].is_closed():
+            return
+        self.__timer = (deadline, loop)
+        loop.call_soon_threadsafe(lambda: loop.call_later(max(0.0, deadline - time.monotonic()), self.__wake))
+
+    def __wake(self):
+        with self.__lock:
+            self.__timer = None
+            self.__dispatch()
+
+    def queued(self) -> int:
+        """Returns the number of waiting requests"""
+        with self.__lock:
+            return sum(len(queue) for queue in self.__queues.values())
+
+    def stats(self) -> dict:
+        """Returns the statistics of this limiter (for verbose mode)"""
+        return {"queued": self.queued(), "granted": self.granted, "rate_limited": self.rate_limited}
+
+
+class RateLimiterRegistry:
+    """Process-wide registry of RateLimiter, keyed by (engine name, api base, api key)"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__limiters: Dict[tuple, RateLimiter] = {}
+
+    def get(self, engine_name: str, api_base: Optional[str], api_key: str, limits: Optional[dict] = None) -> RateLimiter:
+        """Returns the limiter of the provider, created with the limits ({"rpm", "tpm"}) of the first model using it"""
+        key = (engine_name, api_base, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+        with self.__lock:
+            if key not in self.__limiters:
+                self.__limiters[key] = RateLimiter((limits or {}).get("rpm"), (limits or {}).get("tpm"))
+            return self.__limiters[key]
+
+    def stats(self) -> dict:
+        """Returns the statistics of the limiters (for verbose mode)"""
+        with self.__lock:
+            return {key[0]: limiter.stats() for key, limiter in self.__limiters.items()}
+
+
+def rate_limit_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Returns the seconds to wait before retrying, if the error is a rate limit error (429) of an SDK, or None.
+    It honors the Retry-After header, and falls back to an exponential backoff."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status != 429:
+        return None
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in [("retry-after-ms", 0.001), ("retry-after", 1.0)]:
+        try:
+            if headers.get(name):
+                return float(headers.get(name)) * scale
+        except ValueError:
+            pass
+    return RETRY_BACKOFF * (2**attempt) + random.uniform(0, RETRY_BACKOFF)
+
+
+default_rate_limiter = RateLimiterRegistry()
+"""The process-wide registry of rate limiters used by LlmModel unless another one is specified"""
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING, List, Optional
+
+from slashgpt.function.function_call import FunctionCall
+from slashgpt.utils.tiered_cache import TieredCache
+
+if TYPE_CHECKING:
+    from slashgpt.llms.model import LlmModel
+    from slashgpt.manifest import Manifest
+
+default_response_cache_path = "filememory/llm_cache.db"
+"""Default location of the on-disk tier of ResponseCache"""
+
+
+class ResponseCache(TieredCache):
+    """Cache of LLM responses, keyed by (model, normalized messages, functions, seed).
+
+    A response is recorded as the list of events yielded by the engine (text chunks and function calls),
+    so that it is replayed chunk by chunk to streaming agents, or as a whole to non-streaming agents.
+    Responses live in an in-memory LRU, and optionally in a SQLite table shared by processes and restarts.
+
+    It is meant for deterministic agents (e.g, /autotest and dispatchers). Set ChatConfig.response_cache to enable it,
+    and specify "response_cache": false in the manifest of agents whose answers must not be reused.
+    """
+
+    def __init__(self, maxsize: int = 256, db_path: Optional[str] = None):
+        """
+        Args:
+
+            maxsize (int): maximum number of responses in memory, which are held as the lists of events
+            db_path (str, optional): location of the on-disk tier (no disk tier if not specified)
+        """
+        super().__init__(maxsize, db_path, "llm_cache")
+
+    @classmethod
+    def key(cls, llm_model: LlmModel, messages: List[dict], manifest: Manifest) -> Optional[str]:
+        """Returns the cache key of a request (None if the agent opts out)"""
+        if manifest.get("response_cache") is False:
+            return None
+        normalized_messages = [{k: message.get(k) for k in ["role", "content", "name"] if message.get(k) is not None} for message in messages]
+        data = [
+            llm_model.engine_name(),
+            llm_model.name(),
+            llm_model.get_api_base(),
+            normalized_messages,
+            manifest.functions(),
+            manifest.get("seed"),
+            manifest.temperature(),
+            manifest.num_completions(),
+            manifest.images(),
+        ]
+        normalized = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def record(cls, message) -> Optional[dict]:
+        """Returns the event to record for a message yielded by the engine (None if it is not replayable)"""
+        if isinstance(message, str):
+            return {"text": message}
+        if isinstance(message, FunctionCall):
+            data = message.data()
+            data = data if isinstance(data, dict) else dict(data)
+            return {"function_call": {"name": data.get("name"), "arguments": data.get("arguments")}}
+        return None
+
+    @classmethod
+    def replay(cls, events: List[dict], manifest: Manifest):
+        """Yields the recorded response: text chunks for streaming agents, or the whole text otherwise"""
+        stream = manifest.stream()
+        text = ""
+        for event in events:
+            if "text" in event:
+                if stream:
+                    yield event["text"]
+                else:
+                    text += event["text"]
+            else:
+                if text:
+                    yield text
+                    text = ""
+                yield FunctionCall(event["function_call"], manifest)
+        if text:
+            yield text
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Returns the recorded events of the response or None"""
+        events = self.memory.get(key)
+        if events is None and self.disk:
+            row = self.disk.get(key)
+            if row is not None:
+                events = json.loads(row[0])
+                self.disk_hits += 1
+                self.memory.set(key, events)
+        return events
+
+    def set(self, key: str, events: List[dict]):
+        """Stores the recorded events of the response"""
+        self.memory.set(key, events)
+        if self.disk:
+            self.disk.set(key, json.dumps(events, ensure_ascii=False))
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import functools
+
+import tiktoken  # for counting tokens
+
+from slashgpt.utils.lru import LRUCache
+
+DEFAULT_ENCODING = "cl100k_base"
+"""Encoding used for model names unknown to tiktoken (e.g, Llama, Claude, Gemini)"""
+
+__token_counts = LRUCache(4096)
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """Returns the (cached) tiktoken encoder for the model, falling back to DEFAULT_ENCODING"""
+    try:
+        return tiktoken.encoding_for_model(model_name or "")
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def num_tokens(text: str, model_name: str) -> int:
+    """Returns the number of tokens of the text, memoized per (encoding, text)"""
+    if not text:
+        return 0
+    encoding = get_encoding(model_name)
+    key = (encoding.name, text)
+    count = __token_counts.get(key)
+    if count is None:
+        count = len(encoding.encode(text, disallowed_special=()))
+        __token_counts.set(key, count)
+    return count
+
+
+def token_count_stats() -> dict:
+    """Returns the statistics of the token-count memo (for verbose mode)"""
+    return __token_counts.stats()
+
+
+class TokenBudget:
+    """Incremental token budget accumulator.
+
+    Each text is counted once and the counts are summed up,
+    instead of re-encoding the growing concatenation for every check.
+    """
+
+    def __init__(self, budget: int, model_name: str):
+        """
+        Args:
+
+            budget (int): maximum number of tokens
+            model_name (str): name of the model to pick the encoder
+        """
+        self.budget = budget
+        """Maximum number of tokens"""
+        self.used = 0
+        """Number of tokens accumulated so far"""
+        self.model_name = model_name
+
+    def remaining(self) -> int:
+        """Returns the number of tokens left in the budget"""
+        return self.budget - self.used
+
+    def fits(self, text: str) -> bool:
+        """Returns if the text fits in the remaining budget (without consuming it)"""
+        return num_tokens(text, self.model_name) <= self.remaining()
+
+    def add(self, text: str) -> bool:
+        """Consumes the budget for the text if it fits. Returns False (and consumes nothing) otherwise."""
+        count = num_tokens(text, self.model_name)
+        if count > self.remaining():
+            return False
+        self.used += count
+        return True
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+
+default_http_limits = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "timeout": 600.0,
+    "dns_cache_ttl": 300,
+}
+"""Default connection pool limits. Each LLM model may override them with its "http_limits" property."""
+
+
+class TransportRegistry:
+    """Process-wide registry of pooled HTTP clients shared by all LLM engines.
+
+    Clients are keyed by (client class, api_base, api_key, limits), so every LlmModel that talks to
+    the same endpoint with the same key reuses one keep-alive connection pool instead of paying
+    TLS setup and DNS lookups on every chat turn.
+    Asynchronous clients are bound to the event loop that created them, therefore they are cached per loop.
+    """
+
+    def __init__(self, limits: Optional[dict] = None):
+        """
+        Args:
+
+            limits (dict, optional): default connection pool limits (see default_http_limits)
+        """
+        self.limits: dict = {**default_http_limits, **(limits or {})}
+        """Default connection pool limits"""
+        self.__lock = threading.Lock()
+        self.__clients: Dict[tuple, Any] = {}
+        self.__loop_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def configure(self, **limits):
+        """Update the default connection pool limits (affects clients created afterwards)"""
+        self.limits.update(limits)
+
+    def __merged_limits(self, limits: Optional[dict]) -> dict:
+        return {**self.limits, **(limits or {})}
+
+    @classmethod
+    def __httpx_args(cls, limits: dict) -> dict:
+        return {
+            "limits": httpx.Limits(
+                max_connections=limits.get("max_connections"),
+                max_keepalive_connections=limits.get("max_keepalive_connections"),
+                keepalive_expiry=limits.get("keepalive_expiry"),
+            ),
+            "timeout": limits.get("timeout"),
+        }
+
+    def __get(self, key: tuple, factory: Callable[[], Any], per_loop: bool):
+        if per_loop:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                with self.__lock:
+                    clients = self.__loop_clients.setdefault(loop, {})
+                    if key not in clients:
+                        clients[key] = factory()
+                    return clients[key]
+        with self.__lock:
+            if key not in self.__clients:
+                self.__clients[key] = factory()
+            return self.__clients[key]
+
+    def client(self, client_class, api_key: str, api_base: Optional[str] = None, limits: Optional[dict] = None):
+        """Returns a synchronous SDK client (e.g, OpenAI, Groq) backed by a shared httpx connection pool
+
+        Args:
+
+            client_class (class): SDK client class, which accepts api_key, base_url and http_client
+            api_key (str): secret key
+            api_base (str, optional): endpoint url
+            limits (dict, optional): connection pool limits to override the default
+        """
+        merged = self.__merged_limits(limits)
+        key = (client_class, api_base, api_key, tuple(sorted(merged.items())))
+
+        def factory():
+            params = {"api_key": api_key, "http_client": httpx.Client(**self.__httpx_args(merged))}
+            if api_base:
+                params["base_url"] = api_base
+            return client_class(**params)
+
+        return self.__get(key, factory, False)
+
+    def async_client(self, client_class, api_key: str, api_base: Optional[str] = None, limits: Optional[dict] = None):
+        """Returns an asynchronous SDK client (e.g, AsyncOpenAI, AsyncAnthropic) for the running event loop
+
+        Args:
+
+            client_class (class): SDK client class, which accepts api_key, base_url and http_client
+            api_key (str): secret key
+            api_base (str, optional): endpoint url
+            limits (dict, optional): connection pool limits to override the default
+        """
+        merged = self.__merged_limits(limits)
+        key = (client_class, api_base, api_key, tuple(sorted(merged.items())))
+
+        def factory():
+            params = {"api_key": api_key, "http_client": httpx.AsyncClient(**self.__httpx_args(merged))}
+            if api_base:
+                params["base_url"] = api_base
+            return client_class(**params)
+
+        return self.__get(key, factory, True)
+
+    def aiohttp_session(self, api_base: str, limits: Optional[dict] = None):
+        """Returns an aiohttp.ClientSession with a keep-alive connector for the running event loop
+
+        Args:
+
+            api_base (str): endpoint url (used as the key of the pool)
+            limits (dict, optional): connection pool limits to override the default
+        """
+        import aiohttp
+
+        merged = self.__merged_limits(limits)
+        key = ("aiohttp", api_base, tuple(sorted(merged.items())))
+
+        def factory():
+            connector = aiohttp.TCPConnector(
+                limit=merged.get("max_connections"),
+                keepalive_timeout=merged.get("keepalive_expiry"),
+                ttl_dns_cache=merged.get("dns_cache_ttl"),
+            )
+            return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=merged.get("timeout")))
+
+        return self.__get(key, factory, True)
+
+    def pg_pool(self, conninfo: str, min_size: int = 1, max_size: int = 10):
+        """Returns a psycopg AsyncConnectionPool (with the pgvector types registered) for the running event loop.
+        It is not opened yet (call "await pool.open()", which is a no-op if it is already open).
+
+        Args:
+
+            conninfo (str): PostgreSQL connection string
+            min_size (int): minimum number of connections
+            max_size (int): maximum number of connections
+        """
+        from pgvector.psycopg import register_vector_async
+        from psycopg_pool import AsyncConnectionPool
+
+        key = ("pg_pool", conninfo, min_size, max_size)
+
+        def factory():
+            return AsyncConnectionPool(conninfo, min_size=min_size, max_size=max_size, open=False, configure=register_vector_async)
+
+        return self.__get(key, factory, True)
+
+    def pg_sync_pool(self, conninfo: str, min_size: int = 1, max_size: int = 10):
+        """Returns a psycopg ConnectionPool (with the pgvector types registered) shared by synchronous callers.
+        It is not opened yet (call "pool.open()", which is a no-op if it is already open), and closed by close().
+
+        Args:
+
+            conninfo (str): PostgreSQL connection string
+            min_size (int): minimum number of connections
+            max_size (int): maximum number of connections
+        """
+        from pgvector.psycopg import register_vector
+        from psycopg_pool import ConnectionPool
+
+        key = ("pg_sync_pool", conninfo, min_size, max_size)
+
+        def factory():
+            return ConnectionPool(conninfo, min_size=min_size, max_size=max_size, open=False, configure=register_vector)
+
+        return self.__get(key, factory, False)
+
+    def stats(self) -> dict:
+        """Returns the number of pooled clients (for verbose mode)"""
+        with self.__lock:
+            return {
+                "clients": len(self.__clients),
+                "loop_clients": sum(len(clients) for clients in self.__loop_clients.values()),
+            }
+
+    async def aclose(self):
+        """Close all the asynchronous clients bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self.__lock:
+            clients = self.__loop_clients.pop(loop, {})
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if close:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+
+    def close(self):
+        """Close all the synchronous clients"""
+        with self.__lock:
+            clients = self.__clients
+            self.__clients = {}
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if close:
+                close()
+
+
+default_transport = TransportRegistry()
+"""The process-wide transport registry used by LlmModel unless another one is specified"""
@@ -1,39 +1,64 @@
+import copy
 import json
 import random
-import re
 from datetime import datetime
-from typing import List, Optional
+from typing import Optional
 
 from slashgpt.chat_config import ChatConfig
-from slashgpt.dbs.db_pgvector import DBPgVector
-from slashgpt.dbs.db_pinecone import DBPinecone
-from slashgpt.dbs.vector_engine_openai import VectorEngineOpenAI
+from slashgpt.manifest_store import ManifestStore, default_manifest_store
+from slashgpt.prompt_template import PromptTemplate, read_resource
 from slashgpt.utils.print import print_debug, print_info, print_warning
-
-__vector_dbs = {
-    "pinecone": DBPinecone,
-    "pgvector": DBPgVector,
+from slashgpt.utils.utils import load_class
+
+# imported on first use, like the LLM engines
+# (not named with a double underscore, which would be mangled in the Manifest class)
+vector_dbs = {
+    "pinecone": {"module_name": "slashgpt.dbs.db_pinecone", "class_name": "DBPinecone"},
+    "pgvector": {"module_name": "slashgpt.dbs.db_pgvector", "class_name": "DBPgVector"},
+    "chroma": {"module_name": "slashgpt.dbs.db_chroma", "class_name": "DBChroma"},
+    "local": {"module_name": "slashgpt.dbs.db_local", "class_name": "DBLocal"},
 }
+"""Vector databases available as "db_type" of embeddings"""
 
-__vector_engines = {"openai": VectorEngineOpenAI}
+vector_engines = {"openai": {"module_name": "slashgpt.dbs.vector_engine_openai", "class_name": "VectorEngineOpenAI"}}
+"""Vector engines available as "engine_type" of embeddings"""
 
 
 class Manifest:
-    """Manifest specifies the behavior of an LLM agent"""
+    """Manifest specifies the behavior of an LLM agent.
+
+    ChatConfigWithManifests keeps a prepared Manifest (with parsed functions and a loaded module) for each agent,
+    and sessions take cheap views of it (see view), so treat the definition, functions and module as read-only.
+    """
 
-    def __init__(self, manifest: dict = {}, base_dir: str = "", agent_name=None):
+    def __init__(self, manifest: dict = {}, base_dir: str = "", agent_name=None, manifest_store: Optional[ManifestStore] = None):
         """
         Args:
             manifest (dict): Manifest definition
             base_dir (str): The base folder location
             agent_name (str, optional): The display name of LLM agent
+            manifest_store (ManifestStore, optional): store of compiled functions and modules (process-wide one by default)
         """
         self.base_dir = base_dir
         """The base folder location"""
+        self.__store = manifest_store or default_manifest_store
         self.__manifest = manifest
         self.__agent_name = agent_name
         self.__module = self.__read_module()
         self.__functions = self.__read_functions()
+        self.__prompt_template = self.__read_prompt()
+
+    def view(self, agent_name: Optional[str] = None):
+        """Returns a per-session view, which shares the definition, the functions and the module of this manifest
+
+        Args:
+
+            agent_name (str, optional): The display name of LLM agent (the same as this manifest if not specified)
+        """
+        view = copy.copy(self)
+        if agent_name is not None:
+            view.__agent_name = agent_name
+        return view
 
     def get(self, key: str):
         """Returns the specified property of the manifest definition (str, dict or list)"""
@@ -87,11 +112,26 @@ class Manifest:
         """Returns the specified LLM model (str or dict)"""
         return self.get("model")
 
-    # NOTE: Let's keep it hidden until we implement it.
-    def __history_type(self):
-        """Returns the history type, which controls the behavior of history"""
+    def max_call_depth(self):
+        """Returns the maximum number of chained LLM calls after function results - default is 8 (int)"""
+        if "max_call_depth" in self.__manifest:
+            return int(self.get("max_call_depth"))
+        return 8
+
+    def history_type(self):
+        """Returns the history type, which selects the messages sent to the LLM - default is "all" (str, see slashgpt.history.context)"""
         return self.get("history_type") or "all"
 
+    def prompt_cache(self) -> Optional[bool]:
+        """Returns the "prompt_cache" property: True moves the dynamic sections of the prompt ({now}, {memory} and {articles})
+        to the end, and False disables the cache breakpoints of the engines (bool, optional)"""
+        return self.get("prompt_cache")
+
+    def prompt_cache_marker(self) -> Optional[str]:
+        """Returns the text which begins the dynamic sections of the prompt moved to the end by "prompt_cache" (str, optional),
+        so that the engines can mark the static part before it as the cacheable prefix"""
+        return self.__prompt_template.dynamic_marker if self.__prompt_template else None
+
     def manifest(self):
         """Returns the manifest definition (dict)"""
         return self.__manifest
@@ -105,13 +145,14 @@ class Manifest:
         if value:
             # load a file if the location is specified
             if isinstance(value, str):
-                with open(self.base_dir + "/" + value, "r") as f:
-                    value = json.load(f)
+                value = self.__store.load_file(self.base_dir + "/" + value)
             # validation
             if value and isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
                 agents = self.get("agents")
                 # If agents are specified, inject their keys into the definition of categorize function.
                 if agents:
+                    # The definitions are shared by the manifest store, so modify a copy
+                    value = copy.deepcopy(value)
                     # WARNING: It assumes that categorize(category, ...) function
                     for function in value:
                         if function.get("name") == "categorize":
@@ -130,15 +171,8 @@ class Manifest:
     def __read_module(self):
         module = self.get("module")
         if module:
-            with open(f"{self.base_dir}/{module}", "r") as f:
-                try:
-                    code = f.read()
-                    namespace = {}
-                    exec(code, namespace)
-                    print(f" {module}")
-                    return namespace
-                except ImportError:
-                    print(f"Failed to import module: {module}")
+            # executed once per version of the file (the namespace is shared by sessions)
+            return self.__store.load_module(f"{self.base_dir}/{module}")
 
         return None
 
@@ -151,59 +185,30 @@ class Manifest:
         if isinstance(prompt, list):
             prompt = "\n".join(prompt)
         if prompt:
-            if re.search("\\{now\\}", prompt):
-                time = datetime.now()
-                prompt = re.sub("\\{now\\}", time.strftime("%Y%m%dT%H%M%SZ"), prompt, 1)
-        return prompt
-
-    """
-    Read manifest data and shuffle data
-    """
+            template = PromptTemplate(prompt)
+            return template.dynamic_last() if self.prompt_cache() else template
+        return None
 
     def __get_random_manifest_data(self):
+        # shuffle a copy, since the definition is shared by sessions
         list_data = self.get("list")
         if list_data:
-            # Shuffle
-            for i in range(len(list_data)):
-                j = random.randrange(0, len(list_data))
-                temp = list_data[i]
-                list_data[i] = list_data[j]
-                list_data[j] = temp
-            return list_data
-
-    def __replace_random(self, prompt, data):
-        j = 0
-        # TODO: fix array bounds bug
-        while re.search("\\{random\\}", prompt):
-            prompt = re.sub("\\{random\\}", data[j], prompt, 1)
-            j += 1
-        return prompt
-
-    def __replace_from_resource_file(self, prompt, resource_file_name):
-        with open(f"{self.base_dir}/{resource_file_name}", "r") as f:
-            contents = f.read()
-            return re.sub("\\{resource\\}", contents, prompt, 1)
+            return random.sample(list_data, len(list_data))
 
     def prompt_data(self, manifests: dict = {}, memory: Optional[dict] = None):
         """Generate an appropriate prompt for a ChatSession (str)"""
-        prompt = self.__read_prompt()
-        agents = self.get("agents")
-        if prompt:
-            data = self.__get_random_manifest_data()
-            if data:
-                prompt = self.__replace_random(prompt, data)
+        template = self.__prompt_template
+        if template:
             resource = self.get("resource")
-            if resource:
-                prompt = self.__replace_from_resource_file(prompt, resource)
-            if agents:
-                prompt = self.__apply_agent(prompt, agents, manifests)
-            if memory is not None:
-                prompt = re.sub("\\{memory\\}", json.dumps(memory, ensure_ascii=False), prompt, 1)
-            return prompt
-
-    def __apply_agent(self, prompt: str, agents: List[str], manifests: dict = {}):
-        descriptions = [f"{agent}: {manifests[agent].get('description')}" for agent in agents]
-        return re.sub("\\{agents\\}", "\n".join(descriptions), prompt, 1)
+            agents = self.get("agents")
+            values = {
+                "now": lambda: datetime.now().strftime("%Y%m%dT%H%M%SZ"),
+                "random": self.__get_random_manifest_data() if template.has("random") else None,
+                "resource": (lambda: read_resource(f"{self.base_dir}/{resource}")) if resource else None,
+                "agents": (lambda: "\n".join([f"{agent}: {manifests[agent].get('description')}" for agent in agents])) if agents else None,
+                "memory": json.dumps(memory, ensure_ascii=False) if memory is not None else None,
+            }
+            return template.render(values)
 
     def format_question(self, question: str):
         """Format the question if the "form" property is specified in the manifest (str)"""
@@ -228,8 +233,8 @@ class Manifest:
         embeddings = self.get("embeddings")
         if embeddings:
             try:
-                dbs = __vector_dbs[embeddings["db_type"]]
-                engine = __vector_engines[embeddings["engine_type"]]
+                dbs = load_class(vector_dbs[embeddings["db_type"]])
+                engine = load_class(vector_engines[embeddings["engine_type"]])
                 if dbs and engine:
                     return dbs(embeddings, engine, config.verbose)
             except Exception as e:
@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+
+from slashgpt.utils.print import print_error, print_warning
+
+SNAPSHOT_VERSION = 2
+
+default_manifest_snapshot_path = os.getenv("MANIFEST_SNAPSHOT_PATH")
+"""Location of the on-disk snapshot of compiled manifests (MANIFEST_SNAPSHOT_PATH, no snapshot if not set)"""
+
+
+class ManifestStore:
+    """Store of compiled manifest files, keyed by (path, mtime, size).
+
+    Each file is parsed once; loading a folder again only stats the files and re-parses the changed ones.
+    Parsed manifests (and function definitions) can also be saved in an on-disk JSON snapshot (opt-in),
+    so that a new process does not parse unchanged files either. Entries of deleted files are pruned.
+    Python modules referenced by manifests are executed once per version of the file (in memory only).
+    The returned objects are shared, so treat them as read-only.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        """
+        Args:
+
+            snapshot_path (str, optional): location of the on-disk snapshot (no snapshot if not specified)
+        """
+        self.snapshot_path = snapshot_path
+        self.parsed = 0
+        """Number of files parsed (for verbose mode)"""
+        self.reused = 0
+        """Number of files reused without parsing (for verbose mode)"""
+        self.__entries: Dict[str, Tuple[int, int, Any]] = {}
+        self.__modules: Dict[str, Tuple[int, int, Optional[dict]]] = {}
+        self.__lock = threading.Lock()
+        self.__snapshot_loaded = False
+        self.__dirty = False
+
+    @classmethod
+    def __parse(cls, file_path: str):
+        with open(file_path, "r", encoding="utf-8") as f:  # encoding add for Win
+            try:
+                if file_path.endswith(".json"):
+                    return json.load(f)
+                return yaml.safe_load(f)
+            except Exception:
+                print_error(os.path.basename(file_path) + " is broken")
+                return None
+
+    def __load_snapshot(self):
+        if self.__snapshot_loaded:
+            return
+        self.__snapshot_loaded = True
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+                if snapshot.get("version") == SNAPSHOT_VERSION:
+                    for file_path, (mtime_ns, size, data) in snapshot.get("entries", {}).items():
+                        if os.path.exists(file_path):
+                            self.__entries[file_path] = (mtime_ns, size, data)
+                        else:
+                            self.__dirty = True
+            except Exception as e:
+                print_warning(f"Ignoring the manifest snapshot {self.snapshot_path}: {e}")
+
+    def save(self):
+        """Write the on-disk snapshot if any file was parsed since the last save"""
+        if not self.snapshot_path or not self.__dirty:
+            return
+        with self.__lock:
+            for file_path in [file_path for file_path in self.__entries if not os.path.exists(file_path)]:
+                del self.__entries[file_path]
+            directory = os.path.dirname(self.snapshot_path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            tmp_path = self.snapshot_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": SNAPSHOT_VERSION, "entries": self.__entries}, f, default=str)
+                os.replace(tmp_path, self.snapshot_path)
+            except Exception as e:
+                print_warning(f"Failed to write the manifest snapshot {self.snapshot_path}: {e}")
+                return
+            self.__dirty = False
+
+    def load_file(self, file_path: str, stat: Optional[os.stat_result] = None) -> Any:
+        """Returns the parsed file, parsing it only if it has changed since the last time
+
+        Args:
+
+            file_path (str): path to the manifest (or functions) file (json or yaml)
+            stat (os.stat_result, optional): result of os.stat of the file, if the caller already has it
+        """
+        file_path = os.path.abspath(file_path)
+        stat = stat or os.stat(file_path)
+        with self.__lock:
+            self.__load_snapshot()
+            entry = self.__entries.get(file_path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self.reused += 1
+                return entry[2]
+        data = ManifestStore.__parse(file_path)
+        with self.__lock:
+            self.__entries[file_path] = (stat.st_mtime_ns, stat.st_size, data)
+            self.parsed += 1
+            self.__dirty = True
+        return data
+
+    def load_folder(self, path: str) -> dict:
+        """Returns the set of manifests (json or yaml) in the folder, keyed by their names"""
+        manifests = {}
+        with os.scandir(path) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                if entry.name.endswith(".json") or entry.name.endswith(".yml"):
+                    data = self.load_file(f"{path}/{entry.name}", entry.stat())
+                    if data is not None:
+                        manifests[entry.name.split(".")[0]] = data
+        self.save()
+        return manifests
+
+    def load_module(self, file_path: str) -> Optional[dict]:
+        """Returns the namespace of the Python module, executing the file only if it has changed since the last time"""
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        with self.__lock:
+            entry = self.__modules.get(file_path)
+            if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+                self.reused += 1
+                return entry[2]
+        with open(file_path, "r") as f:
+            try:
+                code = f.read()
+                namespace: Optional[dict] = {}
+                exec(compile(code, file_path, "exec"), namespace)
+                print(f" {os.path.basename(file_path)}")
+            except ImportError:
+                print(f"Failed to import module: {os.path.basename(file_path)}")
+                namespace = None
+        with self.__lock:
+            self.__modules[file_path] = (stat.st_mtime_ns, stat.st_size, namespace)
+            self.parsed += 1
+        return namespace
+
+    def forget(self, file_path: str):
+        """Discard the compiled manifest, functions or module of the file (e.g, when it was modified or deleted)"""
+        file_path = os.path.abspath(file_path)
+        with self.__lock:
+            self.__modules.pop(file_path, None)
+            if self.__entries.pop(file_path, None) is not None:
+                self.__dirty = True
+
+    def stats(self) -> dict:
+        """Returns the statistics of this store (for verbose mode)"""
+        return {"files": len(self.__entries), "modules": len(self.__modules), "parsed": self.parsed, "reused": self.reused}
+
+
+default_manifest_store = ManifestStore(default_manifest_snapshot_path)
+"""The process-wide store of compiled manifests used by ChatConfigWithManifests unless another one is specified"""
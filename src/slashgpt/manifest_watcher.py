@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
+
+from slashgpt.utils.print import print_debug, print_warning
+
+if TYPE_CHECKING:
+    from slashgpt.chat_config_with_manifests import ChatConfigWithManifests
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal binding of Linux inotify (through libc, without any third party package)"""
+
+    def __init__(self):
+        self.__libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.__libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    def add_watch(self, directory: str) -> int:
+        """Watch the files written, moved or deleted in the directory. Returns the watch descriptor."""
+        wd = self.__libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self.__libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[int, str]]:
+        """Wait for events up to timeout seconds. Returns the list of (watch descriptor, file name)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + IN_EVENT_HEADER.size <= len(buffer):
+            (wd, _mask, _cookie, length) = IN_EVENT_HEADER.unpack_from(buffer, offset)
+            offset += IN_EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ManifestWatcher:
+    """Opt-in watcher, which hot-reloads manifests when their files change.
+
+    It watches the manifests folder, the "functions" files and the "module" files referenced by manifests
+    (with inotify on Linux, or by polling their mtime and size with the standard library elsewhere),
+    and refreshes only the affected manifests and their compiled functions and modules.
+    Use ChatConfigWithManifests.watch() to start it.
+    """
+
+    def __init__(
+        self, config: ChatConfigWithManifests, callback: Optional[Callable[[List[str]], None]] = None, interval: float = 1.0, polling: bool = False
+    ):
+        """
+        Args:
+
+            config (ChatConfigWithManifests): the configuration, whose manifests are refreshed
+            callback (function, optional): called with the names of refreshed manifests (from the watcher thread)
+            interval (float): polling interval in seconds (also the latency to notice a switch of the manifests folder)
+            polling (bool): True to use polling even if inotify is available
+        """
+        self.config = config
+        self.callback = callback
+        self.interval = interval
+        self.polling = polling or not sys.platform.startswith("linux")
+        """True if the watcher polls the files instead of using inotify"""
+        self.__stop = threading.Event()
+        self.__thread: Optional[threading.Thread] = None
+        self.__inotify: Optional[Inotify] = None
+        self.__watches: Dict[str, int] = {}
+        self.__snapshot: Dict[str, Tuple[int, int]] = {}
+        self.__folder = ""
+
+    def start(self):
+        """Start watching in a daemon thread"""
+        if not self.polling:
+            try:
+                self.__inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                print_warning(f"inotify is not available ({e}), falling back to polling")
+                self.polling = True
+        self.__folder = self.__manifests_dir()
+        self.__snapshot = self.__scan()
+        self.__update_watches()
+        self.__thread = threading.Thread(target=self.__run, name="slashgpt-manifest-watcher", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+        if self.__inotify:
+            self.__inotify.close()
+            self.__inotify = None
+        self.__watches = {}
+
+    def __manifests_dir(self) -> str:
+        return os.path.abspath(self.config.path_manifests)
+
+    def referenced_files(self) -> Dict[str, Set[str]]:
+        """Returns the files referenced by manifests (functions and module), mapped to the names of the manifests"""
+        files: Dict[str, Set[str]] = {}
+        for name, manifest in self.config.manifests.items():
+            if not isinstance(manifest, dict):
+                continue
+            for key in ["functions", "module"]:
+                value = manifest.get(key)
+                if isinstance(value, str):
+                    files.setdefault(os.path.abspath(f"{self.config.base_path}/{value}"), set()).add(name)
+        return files
+
+    def __is_manifest_file(self, path: str) -> bool:
+        return os.path.dirname(path) == self.__manifests_dir() and (path.endswith(".json") or path.endswith(".yml"))
+
+    def __scan(self) -> Dict[str, Tuple[int, int]]:
+        # (mtime, size) of the manifest files and the referenced files, for polling
+        snapshot = {}
+        paths = set(self.referenced_files().keys())
+        try:
+            with os.scandir(self.__manifests_dir()) as entries:
+                paths |= {os.path.abspath(entry.path) for entry in entries if self.__is_manifest_file(os.path.abspath(entry.path))}
+        except FileNotFoundError:
+            pass
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                pass
+        return snapshot
+
+    def __update_watches(self):
+        if self.__inotify is None:
+            return
+        directories = {self.__manifests_dir()} | {os.path.dirname(path) for path in self.referenced_files().keys()}
+        for directory in set(self.__watches.keys()) - directories:
+            self.__inotify.rm_watch(self.__watches.pop(directory))
+        for directory in directories - set(self.__watches.keys()):
+            try:
+                self.__watches[directory] = self.__inotify.add_watch(directory)
+            except OSError as e:
+                print_warning(f"Failed to watch {directory}: {e}")
+
+    def __wait_for_changes(self) -> Set[str]:
+        if self.__manifests_dir() != self.__folder:
+            # the manifests folder was switched (and reloaded), so start over without refreshing anything
+            self.__folder = self.__manifests_dir()
+            self.__snapshot = self.__scan()
+            self.__update_watches()
+
+        if self.__inotify is None:
+            self.__stop.wait(self.interval)
+            snapshot = self.__scan()
+            changed = {path for path in set(snapshot.keys()) | set(self.__snapshot.keys()) if snapshot.get(path) != self.__snapshot.get(path)}
+            self.__snapshot = snapshot
+            return changed
+
+        directories = {wd: directory for directory, wd in self.__watches.items()}
+        events = self.__inotify.read(self.interval)
+        if events:
+            # editors often write a file in several steps, so wait for the rest of the events
+            time.sleep(0.05)
+            events += self.__inotify.read(0)
+        referenced = self.referenced_files()
+        paths = {os.path.join(directories[wd], name) for (wd, name) in events if wd in directories and name}
+        return {path for path in paths if self.__is_manifest_file(path) or path in referenced}
+
+    def __run(self):
+        while not self.__stop.is_set():
+            try:
+                changed = self.__wait_for_changes()
+                if changed and not self.__stop.is_set():
+                    self.refresh(changed)
+            except Exception as e:
+                print_warning(f"ManifestWatcher: {e}")
+                # back off, so that a persistent error does not spin the loop
+                self.__stop.wait(self.interval)
+
+    def refresh(self, changed: Set[str]) -> List[str]:
+        """Refresh the manifests affected by the changed files. Returns their names."""
+        names: Set[str] = set()
+        referenced = self.referenced_files()
+        for path in sorted(changed):
+            if self.__is_manifest_file(path):
+                name = self.config.refresh_manifest_file(path)
+                if name:
+                    names.add(name)
+            if path in referenced:
+                self.config.manifest_store.forget(path)
+                for name in referenced[path]:
+                    self.config.invalidate_manifest(name)
+                names |= referenced[path]
+        if names:
+            self.__update_watches()
+            if self.config.verbose:
+                print_debug(f"ManifestWatcher: refreshed {sorted(names)}")
+            if self.callback:
+                self.callback(sorted(names))
+        return sorted(names)
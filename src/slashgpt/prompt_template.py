@@ -0,0 +1,122 @@
+import os
+import re
+from typing import Callable, Dict, List, Optional, Union
+
+from slashgpt.utils.lru import LRUCache
+
+PLACEHOLDERS = ["now", "random", "resource", "agents", "memory"]
+"""Placeholders rendered by PromptTemplate. Others (e.g, {articles}) are kept as literals for later stages."""
+
+REPEATED_PLACEHOLDERS = ["random"]
+"""Placeholders replaced at every occurrence. Others are replaced only at their first occurrence."""
+
+DYNAMIC_PLACEHOLDERS = ["now", "memory", "articles"]
+"""Placeholders whose values change across sessions or turns, which dynamic_last moves to the end of the prompt"""
+
+__resources = LRUCache(64)
+
+
+def read_resource(file_path: str) -> str:
+    """Returns the contents of the resource file, reading it only if it has changed (mtime, size) since the last time"""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    contents = __resources.get(key)
+    if contents is None:
+        with open(file_path, "r") as f:
+            contents = f.read()
+        __resources.set(key, contents)
+    return contents
+
+
+class PromptTemplate:
+    """Prompt compiled into literal and placeholder segments, which renders in a single pass.
+
+    Values are inserted as they are (they are never scanned for placeholders or escapes).
+    """
+
+    def __init__(self, prompt: str):
+        """
+        Args:
+
+            prompt (str): prompt with placeholders such as {now}, {random}, {resource}, {agents} and {memory}
+        """
+        self.segments: List[Union[str, tuple]] = []
+        """List of literal strings and ("placeholder name",) tuples"""
+        found = set()
+        position = 0
+        for match in re.finditer(r"\{(" + "|".join(PLACEHOLDERS) + r")\}", prompt):
+            name = match.group(1)
+            if name in found and name not in REPEATED_PLACEHOLDERS:
+                continue
+            found.add(name)
+            self.__literal(prompt[position : match.start()])
+            self.segments.append((name,))
+            position = match.end()
+        self.__literal(prompt[position:])
+        self.placeholders = found
+        """Set of placeholder names in this template"""
+        self.dynamic_marker: Optional[str] = None
+        """Text which begins the dynamic sections moved to the end by dynamic_last (None if there is none)"""
+
+    def __literal(self, text: str):
+        if text:
+            self.segments.append(text)
+
+    def dynamic_last(self) -> "PromptTemplate":
+        """Returns a template with the dynamic sections (DYNAMIC_PLACEHOLDERS) moved to the end, referred to by name
+        in their original places, so that the static part of the prompt is a stable prefix for prompt caching"""
+        segments: List[Union[str, tuple]] = []
+        for segment in self.segments:
+            if isinstance(segment, str) and "{articles}" in segment:
+                # {articles} is filled in by the session on each turn, so it is split from the literal
+                (before, after) = segment.split("{articles}", 1)
+                segments += [text for text in [before, ("articles",), after] if text]
+            else:
+                segments.append(segment)
+
+        def is_static(segment) -> bool:
+            return segment[0] not in DYNAMIC_PLACEHOLDERS if isinstance(segment, tuple) else bool(segment.strip())
+
+        last_static = max([index for index, segment in enumerate(segments) if is_static(segment)], default=-1)
+        moved = [segment for segment in segments[:last_static] if isinstance(segment, tuple) and segment[0] in DYNAMIC_PLACEHOLDERS]
+        trailing = [segment for segment in segments[last_static + 1 :] if isinstance(segment, tuple)]
+        if not moved and not trailing:
+            return self
+        template = PromptTemplate("")
+        for segment in segments[: last_static + 1]:
+            template.segments.append(f"({segment[0]} below)" if segment in moved else segment)
+        # sections which change on each turn ({articles}) come after the ones which change per session
+        for segment in sorted(moved + trailing, key=lambda segment: segment[0] == "articles"):
+            template.segments += [f"\n\n{segment[0]}:\n", segment]
+        template.dynamic_marker = template.segments[last_static + 1]
+        template.placeholders = self.placeholders
+        return template
+
+    def has(self, name: str) -> bool:
+        """Returns if the template has the specified placeholder"""
+        return name in self.placeholders
+
+    def render(self, values: Dict[str, Union[str, List[str], Callable[[], str], None]]) -> str:
+        """Render the prompt
+
+        Args:
+
+            values (dict): value of each placeholder. A list is consumed one item per occurrence ({random}),
+                and a function is called only if the placeholder exists. Placeholders without a value are kept as they are.
+        """
+        counters: Dict[str, int] = {}
+        results: List[str] = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                results.append(segment)
+                continue
+            name = segment[0]
+            value: Optional[Union[str, List[str], Callable[[], str]]] = values.get(name)
+            if callable(value):
+                value = value()
+            if isinstance(value, list):
+                index = counters.get(name, 0)
+                counters[name] = index + 1
+                value = value[index] if index < len(value) else None
+            results.append("{" + name + "}" if value is None else value)
+        return "".join(results)
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+try:
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route, WebSocketRoute
+    from starlette.websockets import WebSocket, WebSocketDisconnect
+except ImportError:
+    print("no starlette. pip install starlette uvicorn")
+
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests
+from slashgpt.chat_session import ChatSession
+from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+from slashgpt.history.storage.file import ChatHistoryFileStorage
+from slashgpt.llms.transport import default_transport
+from slashgpt.session_registry import SessionEntry, SessionRegistry
+from slashgpt.utils.print import print_debug, print_error
+
+if TYPE_CHECKING:
+    from slashgpt.function.jupyter_runtime import PythonRuntime
+
+
+def file_history_engine(agent_name: str, session_id: str) -> ChatHistoryAbstractStorage:
+    """Default history engine of ChatServer, which appends each message to filememory/{agent_name}/{session_id}.jsonl"""
+    return ChatHistoryFileStorage("sample", agent_name, session_id=session_id, log_format="jsonl")
+
+
+def sse_event(event: str, data) -> str:
+    """Returns a Server-Sent Event, whose data is JSON encoded (so that a chunk may contain newlines)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class ChatServer:
+    """ASGI (Starlette) server, which streams the responses of ChatSession.call_loop
+    with Server-Sent Events and WebSockets. All sessions run concurrently on one event loop.
+
+    Routes:
+
+        GET  /manifests                                       manifests sets (e.g, "main")
+        GET  /manifests/{manifests}                           manifests in the set
+        GET  /llms/{manifests}                                LLM models available to the set
+        POST /manifests/{manifests}/{agent}/talk[/{id}]       {"message", "llm"} -> {"session_id", "messages"}
+        POST /manifests/{manifests}/{agent}/stream[/{id}]     {"message", "llm"} -> text/event-stream
+        WS   /manifests/{manifests}/{agent}/ws[/{id}]         {"message", "llm"} -> {"event", "data"} per event
+
+    Streamed events are "session" ({"session_id"}), "token" (chunk of the message),
+    "function" ({"name", "result"}), "emit" ({"method", "data"}), "error" (message) and "done" ({"session_id", "message"}).
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        manifests_sets: dict,
+        llm_models: Optional[dict] = None,
+        llm_engine_configs: Optional[dict] = None,
+        history_engine: Callable[[str, str], ChatHistoryAbstractStorage] = file_history_engine,
+        runtime_factory: Optional[Callable[[], PythonRuntime]] = None,
+        verbose: bool = False,
+        registry: Optional[SessionRegistry] = None,
+    ):
+        """
+        Args:
+
+            base_path (str): path to the folder, which has manifests sets, resources and modules
+            manifests_sets (dict): manifests sets (e.g, the contents of manifests/manifests.json)
+            llm_models (dict, optional): collection of custom LLM model definitions
+            llm_engine_configs (dict, optional): collection of custom LLM engine definitions
+            history_engine (function, optional): creates the history engine of a session from (agent_name, session_id),
+                restoring it if session_id is not empty
+            runtime_factory (function, optional): creates the runtime of a session of a notebook agent (each session has
+                its own runtime and notebook, in {base_path}/output/notebooks by default)
+            verbose (bool, optional): verbose mode
+            registry (SessionRegistry, optional): registry of live sessions (1024 sessions, 30 minutes by default)
+        """
+        self.base_path = base_path
+        self.manifests_sets = manifests_sets
+        self.llm_models = llm_models
+        self.llm_engine_configs = llm_engine_configs
+        self.history_engine = history_engine
+        self.runtime_factory: Callable[[], PythonRuntime] = runtime_factory or self.__default_runtime
+        self.verbose = verbose
+        self.__configs: Dict[str, ChatConfigWithManifests] = {}
+        self.registry: SessionRegistry = registry or SessionRegistry()
+        """Live sessions, which are kept hot between requests"""
+
+    def get_config(self, manifests: str) -> Optional[ChatConfigWithManifests]:
+        """Returns the configuration of the manifests set, which is loaded only once"""
+        if manifests not in self.manifests_sets:
+            return None
+        if manifests not in self.__configs:
+            manifests_dir = self.manifests_sets[manifests].get("manifests_dir", f"manifests/{manifests}")
+            config = ChatConfigWithManifests(self.base_path, f"{self.base_path}/{manifests_dir}", self.llm_models, self.llm_engine_configs)
+            config.verbose = self.verbose
+            self.__configs[manifests] = config
+        return self.__configs[manifests]
+
+    async def open_session(self, manifests: str, agent: str, session_id: Optional[str] = None, llm: Optional[str] = None) -> Optional[SessionEntry]:
+        """Returns the live session, rehydrates it from the history engine, or creates a new one (if session_id is None).
+        The session is pinned in the registry until the request calls close_session (stream does not)."""
+
+        async def create() -> Optional[ChatSession]:
+            config = self.get_config(manifests)
+            if config is None or not config.has_manifest(agent):
+                return None
+            engine = await self.registry.open_storage(lambda: self.history_engine(agent, session_id or ""))
+            return ChatSession(
+                config, manifest=config.get_manifest(agent), agent_name=agent, history_engine=engine, intro=not session_id, restore=bool(session_id)
+            )
+
+        if session_id:
+            entry = await self.registry.open(session_id, create)
+        else:
+            session = await create()
+            entry = self.registry.put(self.session_id(session), session, pin=True) if session is not None else None
+        if entry is None:
+            return None
+        if entry.runtime is None and entry.session.manifest.get("notebook"):
+            entry.runtime = self.runtime_factory()
+            entry.runtime.create_notebook(entry.session.llm_model.name())
+        if self.verbose:
+            print_debug(f"session_registry: {self.registry.stats()}")
+        if llm:
+            entry.session.set_llm_model(entry.session.config.get_llm_model_from_key(llm))
+        return entry
+
+    def close_session(self, entry: SessionEntry):
+        """Unpins the session opened by open_session, so that it may be evicted"""
+        self.registry.release(entry)
+
+    def __default_runtime(self) -> PythonRuntime:
+        from slashgpt.function.jupyter_runtime import PythonRuntime
+
+        return PythonRuntime(os.path.join(self.base_path, "output", "notebooks"))
+
+    @classmethod
+    def session_id(cls, session: ChatSession) -> str:
+        return getattr(session.history.repository, "session_id", session.user_id)
+
+    async def stream(self, entry: SessionEntry, message: str) -> AsyncGenerator[Tuple[str, object], None]:
+        """Appends the message to the session, and yields (event, data) as the LLM (and functions) respond.
+        Turns of the same session are processed one by one, and the history is written back after each turn."""
+        session = entry.session
+        session_id = self.session_id(session)
+        async with entry.lock:
+            yield ("session", {"session_id": session_id})
+            pending: List[Tuple[str, object]] = []
+
+            def callback(callback_type, data):
+                if callback_type == "function":
+                    (function_name, function_message) = data
+                    pending.append(("function", {"name": function_name, "result": function_message}))
+                elif callback_type == "emit":
+                    (action_method, action_data) = data
+                    pending.append(("emit", {"method": action_method, "data": action_data}))
+
+            chunks: List[str] = []
+            try:
+                if message:
+                    await session.aappend_user_question(message)
+                async for chunk in session.call_loop(callback, entry.runtime):
+                    while pending:
+                        yield pending.pop(0)
+                    chunks.append(chunk)
+                    yield ("token", chunk)
+                while pending:
+                    yield pending.pop(0)
+            except Exception as e:
+                print_error(f"ChatServer: {e}")
+                yield ("error", str(e))
+            self.registry.write_back(session)
+            yield ("done", {"session_id": session_id, "message": "".join(chunks)})
+
+    def routes(self) -> list:
+        """Returns the Starlette routes, so that an application can mount them with its own routes"""
+        return [
+            Route("/manifests", self.__manifests_sets),
+            Route("/manifests/{manifests}", self.__manifests),
+            Route("/llms/{manifests}", self.__llms),
+            Route("/manifests/{manifests}/{agent}/talk", self.__talk, methods=["POST"]),
+            Route("/manifests/{manifests}/{agent}/talk/{session_id}", self.__talk, methods=["POST"]),
+            Route("/manifests/{manifests}/{agent}/stream", self.__stream, methods=["POST"]),
+            Route("/manifests/{manifests}/{agent}/stream/{session_id}", self.__stream, methods=["POST"]),
+            WebSocketRoute("/manifests/{manifests}/{agent}/ws", self.__websocket),
+            WebSocketRoute("/manifests/{manifests}/{agent}/ws/{session_id}", self.__websocket),
+        ]
+
+    def app(self, routes: Optional[list] = None) -> "Starlette":
+        """Returns the ASGI application (e.g, uvicorn.run(server.app()))
+
+        Args:
+
+            routes (list, optional): additional routes of the application
+        """
+
+        @contextlib.asynccontextmanager
+        async def lifespan(app):
+            yield
+            # write back the histories of live sessions on shutdown
+            self.registry.flush()
+            await default_transport.aclose()
+
+        return Starlette(routes=(routes or []) + self.routes(), lifespan=lifespan)
+
+    async def __manifests_sets(self, request: Request):
+        return JSONResponse({"modes": self.manifests_sets})
+
+    async def __manifests(self, request: Request):
+        config = self.get_config(request.path_params["manifests"])
+        if config is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return JSONResponse({"manifests": config.manifests})
+
+    async def __llms(self, request: Request):
+        config = self.get_config(request.path_params["manifests"])
+        if config is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        return JSONResponse({"llms": list(config.llm_models.keys())})
+
+    async def __open(self, request: Request):
+        body = await request.json()
+        params = request.path_params
+        entry = await self.open_session(params["manifests"], params["agent"], params.get("session_id"), body.get("llm"))
+        return (entry, body.get("message"))
+
+    async def __talk(self, request: Request):
+        (entry, message) = await self.__open(request)
+        if entry is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        try:
+            async for _ in self.stream(entry, message):
+                pass
+        finally:
+            self.close_session(entry)
+        return JSONResponse({"session_id": self.session_id(entry.session), "messages": entry.session.history.messages()})
+
+    async def __stream(self, request: Request):
+        (entry, message) = await self.__open(request)
+        if entry is None:
+            return JSONResponse({"error": "not found"}, status_code=404)
+
+        async def events():
+            try:
+                async for event, data in self.stream(entry, message):
+                    yield sse_event(event, data)
+            finally:
+                self.close_session(entry)
+
+        # X-Accel-Buffering disables the buffering of reverse proxies (nginx), which would delay the first token
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    async def __websocket(self, websocket: WebSocket):
+        await websocket.accept()
+        params = websocket.path_params
+        session_id = params.get("session_id")
+        try:
+            while True:
+                body = await websocket.receive_json()
+                entry = await self.open_session(params["manifests"], params["agent"], session_id, body.get("llm"))
+                if entry is None:
+                    await websocket.send_json({"event": "error", "data": "not found"})
+                    await websocket.close()
+                    return
+                session_id = self.session_id(entry.session)
+                try:
+                    async for event, data in self.stream(entry, body.get("message")):
+                        await websocket.send_json({"event": event, "data": data})
+                finally:
+                    self.close_session(entry)
+        except WebSocketDisconnect:
+            pass
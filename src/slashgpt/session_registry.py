@@ -0,0 +1,201 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, Optional
+
+from slashgpt.chat_session import ChatSession
+from slashgpt.history.storage.abstract import ChatHistoryAbstractStorage
+from slashgpt.history.storage.write_back import ChatHistoryWriteBackStorage
+from slashgpt.utils.print import print_error
+
+if TYPE_CHECKING:
+    from slashgpt.function.jupyter_runtime import PythonRuntime
+
+
+class SessionEntry:
+    """Live session in SessionRegistry"""
+
+    def __init__(self, session: ChatSession, session_id: str = ""):
+        self.session = session
+        self.session_id = session_id
+        self.lock = asyncio.Lock()
+        """Lock, which serializes the turns of the session"""
+        self.last_used = time.monotonic()
+        self.refs = 0
+        """Number of requests holding the session (see SessionRegistry.open and release), which pin it in the registry"""
+        self.runtime: Optional[PythonRuntime] = None
+        """Python runtime of the session (only for notebook agents), which has its own notebook"""
+
+
+class SessionRegistry:
+    """In-process registry, which keeps live ChatSession objects hot for the server.
+
+    Sessions are evicted when they are least recently used (beyond maxsize) or idle (beyond ttl).
+    Their histories are ChatHistoryWriteBackStorage, which are written back to the history storage
+    by a single writer thread, and evicted sessions are rehydrated from the storage on the next request.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 1800.0):
+        """
+        Args:
+
+            maxsize (int): maximum number of live sessions
+            ttl (float): seconds until an idle session is evicted
+        """
+        self.maxsize = maxsize
+        """Maximum number of live sessions"""
+        self.ttl = ttl
+        """Seconds until an idle session is evicted"""
+        self.hits = 0
+        """Number of requests served by live sessions"""
+        self.misses = 0
+        """Number of requests, which needed to rehydrate or create a session"""
+        self.evictions = 0
+        """Number of evicted sessions"""
+        self.__entries: OrderedDict = OrderedDict()
+        self.__loading: Dict[str, Future] = {}
+        self.__lock = threading.RLock()
+        # all the access to the history storages (loading and writing back) happens in this thread,
+        # since some of them (e.g, SQLite) are bound to the thread
+        self.__writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slashgpt-session-writer")
+
+    def get(self, session_id: str) -> Optional[SessionEntry]:
+        """Returns the live session (and marks it as recently used), or None"""
+        with self.__lock:
+            self.expire()
+            entry = self.__entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry.last_used = time.monotonic()
+            self.__entries.move_to_end(session_id)
+            return entry
+
+    async def open(self, session_id: str, create: Callable[[], Awaitable[Optional[ChatSession]]]) -> Optional[SessionEntry]:
+        """Returns the live session, or registers the one created (or rehydrated) by create, pinning it until release.
+        Only one request creates the session of an id at a time, and the others wait for it.
+
+        Args:
+
+            session_id (str): id of the session
+            create (function): coroutine function, which returns the session (or None if it can not be created)
+        """
+        while True:
+            with self.__lock:
+                entry = self.get(session_id)
+                if entry is not None:
+                    entry.refs += 1
+                    return entry
+                loading = self.__loading.get(session_id)
+                if loading is None:
+                    loading = self.__loading[session_id] = Future()
+                    break
+            # another request is creating the session (the loop looks it up again, and creates it if that failed)
+            await asyncio.wrap_future(loading)
+        try:
+            session = await create()
+            return self.put(session_id, session, pin=True) if session is not None else None
+        finally:
+            with self.__lock:
+                self.__loading.pop(session_id, None)
+            loading.set_result(None)
+
+    def put(self, session_id: str, session: ChatSession, pin: bool = False) -> SessionEntry:
+        """Registers the session (pinning it until release if pin is True), evicting the least recently used ones if necessary"""
+        with self.__lock:
+            entry = SessionEntry(session, session_id)
+            entry.refs = 1 if pin else 0
+            self.__entries[session_id] = entry
+            for oldest in [key for key, value in self.__entries.items() if value.refs == 0][: max(0, len(self.__entries) - self.maxsize)]:
+                self.evict(oldest)
+            return entry
+
+    def release(self, entry: SessionEntry):
+        """Unpins the session returned by open (when the request is finished)"""
+        with self.__lock:
+            entry.refs = max(0, entry.refs - 1)
+            entry.last_used = time.monotonic()
+            if self.__entries.get(entry.session_id) is entry:
+                self.__entries.move_to_end(entry.session_id)
+
+    def expire(self):
+        """Evicts the sessions idle beyond ttl (they are at the least recently used end), unless they are pinned"""
+        deadline = time.monotonic() - self.ttl
+        with self.__lock:
+            for session_id, entry in list(self.__entries.items()):
+                if entry.last_used > deadline:
+                    break
+                if entry.refs == 0 and not entry.lock.locked():
+                    self.evict(session_id)
+
+    def evict(self, session_id: str):
+        """Removes the session from the registry, writing its history back"""
+        with self.__lock:
+            entry = self.__entries.pop(session_id, None)
+        if entry:
+            self.evictions += 1
+            self.write_back(entry.session)
+            if entry.runtime is not None:
+                entry.runtime.stop()
+
+    def write_back(self, session: ChatSession) -> Optional[Future]:
+        """Writes the changes of the history back to the storage in the writer thread (without waiting for it)"""
+        storage = session.history.repository
+        if isinstance(storage, ChatHistoryWriteBackStorage) and storage.dirty():
+            return self.__writer.submit(self.__flush, storage)
+        return None
+
+    def __flush(self, storage: ChatHistoryWriteBackStorage):
+        try:
+            storage.flush()
+        except Exception as e:
+            print_error(f"SessionRegistry: failed to write back {storage.session_id}: {e}")
+
+    async def open_storage(self, factory: Callable[[], ChatHistoryAbstractStorage]) -> ChatHistoryWriteBackStorage:
+        """Creates (and loads) the history storage in the writer thread, after the pending write-backs"""
+
+        def load():
+            storage = factory()
+            return ChatHistoryWriteBackStorage(storage, list(storage.messages()))
+
+        return await asyncio.wrap_future(self.__writer.submit(load))
+
+    def flush(self):
+        """Writes back all the live sessions, and waits for the writer thread"""
+        with self.__lock:
+            sessions = [entry.session for entry in self.__entries.values()]
+        for session in sessions:
+            self.write_back(session)
+        self.__writer.submit(lambda: None).result()
+
+    def clear(self):
+        """Evicts all the sessions, and waits for their histories to be written back"""
+        with self.__lock:
+            for session_id in list(self.__entries.keys()):
+                self.evict(session_id)
+        self.__writer.submit(lambda: None).result()
+
+    def close(self):
+        """Evicts all the sessions, and stops the writer thread"""
+        self.clear()
+        self.__writer.shutdown()
+
+    def __contains__(self, session_id: str) -> bool:
+        with self.__lock:
+            return session_id in self.__entries
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+    def keys(self):
+        """Returns the ids of the live sessions from the least to the most recently used"""
+        with self.__lock:
+            return list(self.__entries.keys())
+
+    def stats(self) -> dict:
+        """Returns the statistics of this registry (for verbose mode)"""
+        return {"size": len(self), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -10,6 +10,7 @@ import sys
 import yaml
 
 from slashgpt import ChatConfigWithManifests, ChatSession  # noqa: E402
+from slashgpt.utils.utils import run_sync
 
 
 def run_bot(base_dir: str = ""):
@@ -56,7 +57,11 @@ def run_bot(base_dir: str = ""):
         question += line
 
     session.append_user_question(question)
-    (message, _, _) = session.call_llm()
+
+    async def collect():
+        return "".join([m async for m in session.call_llm() if isinstance(m, str)])
+
+    message = run_sync(collect())
 
     if message:
         print(f"\033[92m\033[1m{session.botname()}\033[95m\033[0m: {message}")
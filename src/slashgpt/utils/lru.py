@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe, bounded least-recently-used cache with hit/miss counters"""
+
+    def __init__(self, maxsize: int = 128):
+        """
+        Args:
+
+            maxsize (int): maximum number of entries (0 disables the cache)
+        """
+        self.maxsize = maxsize
+        """Maximum number of entries"""
+        self.hits = 0
+        """Number of cache hits"""
+        self.misses = 0
+        """Number of cache misses"""
+        self.__data: OrderedDict = OrderedDict()
+        self.__lock = threading.RLock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value (and marks it as recently used) or the default"""
+        with self.__lock:
+            if key in self.__data:
+                self.__data.move_to_end(key)
+                self.hits += 1
+                return self.__data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Stores the value, evicting the least recently used entry if necessary"""
+        if self.maxsize <= 0:
+            return
+        with self.__lock:
+            self.__data[key] = value
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Returns the cached value or stores the one created by the factory"""
+        with self.__lock:
+            if key in self.__data:
+                self.__data.move_to_end(key)
+                self.hits += 1
+                return self.__data[key]
+            self.misses += 1
+        value = factory()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Removes the entry and returns its value"""
+        with self.__lock:
+            return self.__data.pop(key, default)
+
+    def clear(self):
+        """Removes all the entries"""
+        with self.__lock:
+            self.__data.clear()
+
+    def keys(self):
+        """Returns the keys from the least to the most recently used"""
+        with self.__lock:
+            return list(self.__data.keys())
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.__lock:
+            return key in self.__data
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__data)
+
+    def stats(self) -> dict:
+        """Returns the statistics of this cache (for verbose mode)"""
+        return {"size": len(self), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+from slashgpt.utils.lru import LRUCache
+
+
+class DiskTier:
+    """SQLite table of (key, value, expires_at) shared by processes and restarts, which is the on-disk tier of TieredCache.
+
+    The database is opened on first use (in WAL mode) and shared by threads. Expired entries are deleted when they are looked up.
+    """
+
+    def __init__(self, db_path: str, table: str):
+        """
+        Args:
+
+            db_path (str): location of the SQLite database
+            table (str): name of the table
+        """
+        self.db_path = db_path
+        self.table = table
+        self.expired = 0
+        """Number of expired entries found by lookups"""
+        self.__conn: Optional[sqlite3.Connection] = None
+        self.__lock = threading.Lock()
+
+    def __db(self) -> sqlite3.Connection:
+        if self.__conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            self.__conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.__conn.execute("PRAGMA journal_mode=WAL")
+            with self.__conn:
+                self.__conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+        return self.__conn
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        """Returns (value, expires_at) or None"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Tuple[str, Optional[float]]]:
+        """Returns {key: (value, expires_at)} of the entries which have not expired"""
+        now = time.time()
+        results = {}
+        with self.__lock:
+            conn = self.__db()
+            # stay below the limit of SQLite variables
+            for start in range(0, len(keys), 500):
+                chunk = list(keys[start : start + 500])
+                rows = conn.execute(f"SELECT key, value, expires_at FROM {self.table} WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                for key, value, expires_at in rows.fetchall():
+                    if expires_at is None or expires_at > now:
+                        results[key] = (value, expires_at)
+                    else:
+                        with conn:
+                            conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                        self.expired += 1
+        return results
+
+    def set(self, key: str, value: str, expires_at: Optional[float] = None):
+        """Stores the value (which never expires if expires_at is not specified)"""
+        self.set_many({key: value}, expires_at)
+
+    def set_many(self, values: Dict[str, str], expires_at: Optional[float] = None):
+        """Stores {key: value} in a single transaction"""
+        if values:
+            with self.__lock:
+                conn = self.__db()
+                with conn:
+                    conn.executemany(
+                        f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                        [(key, value, expires_at) for key, value in values.items()],
+                    )
+
+    def clear(self):
+        """Removes all the entries (without creating the database if it does not exist)"""
+        with self.__lock:
+            if self.__conn is not None or os.path.exists(self.db_path):
+                conn = self.__db()
+                with conn:
+                    conn.execute(f"DELETE FROM {self.table}")
+
+
+class TieredCache:
+    """Base of the two-tier caches: an in-memory LRU in front of an optional DiskTier.
+    Subclasses define the keys and how the values are held in memory and serialized on disk."""
+
+    def __init__(self, maxsize: int, db_path: Optional[str], table: str):
+        """
+        Args:
+
+            maxsize (int): maximum number of entries in memory
+            db_path (str, optional): location of the on-disk tier (no disk tier if not specified)
+            table (str): name of the table of the on-disk tier
+        """
+        self.memory = LRUCache(maxsize)
+        """In-memory tier"""
+        self.db_path = db_path
+        self.disk: Optional[DiskTier] = DiskTier(db_path, table) if db_path else None
+        """On-disk tier (None if there is none)"""
+        self.disk_hits = 0
+        """Number of hits in the on-disk tier"""
+
+    def clear(self):
+        """Removes all the entries from both tiers"""
+        self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        """Returns the statistics of this cache (for verbose mode)"""
+        return {**self.memory.stats(), "disk_hits": self.disk_hits}
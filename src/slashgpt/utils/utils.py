@@ -1,3 +1,7 @@
+import asyncio
+import concurrent.futures
+import importlib
+import inspect
 from enum import Enum
 
 
@@ -25,11 +29,49 @@ class CallType(Enum):
         return None
 
 
+__event_loop = None
+
+
+def run_sync(coroutine):
+    """Run a coroutine to completion from synchronous code (e.g, the CLI).
+    It reuses one event loop across calls, so that the pooled asynchronous clients stay alive between turns.
+    Inside a running event loop (e.g, Jupyter), the coroutine runs on a worker thread (on a new event loop) instead,
+    and the pooled asynchronous clients of that loop are closed at the end."""
+    global __event_loop
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if __event_loop is None or __event_loop.is_closed():
+            __event_loop = asyncio.new_event_loop()
+        return __event_loop.run_until_complete(coroutine)
+    with concurrent.futures.ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, __run_and_close(coroutine)).result()
+
+
+async def __run_and_close(coroutine):
+    # the loop is thrown away afterwards, so close the pooled clients bound to it
+    from slashgpt.llms.transport import default_transport
+
+    try:
+        return await coroutine
+    finally:
+        await default_transport.aclose()
+
+
 COLOR_DEBUG = "cyan"
 COLOR_INFO = "blue"
 COLOR_WARNING = "yellow"
 COLOR_ERROR = "red"
 
+
+def load_class(class_data):
+    """Returns the class itself, or imports it on first use if it is specified as {"module_name": ..., "class_name": ...}"""
+    if inspect.isclass(class_data):
+        return class_data
+    module = importlib.import_module(class_data["module_name"])
+    return getattr(module, class_data["class_name"])
+
+
 if __name__ == "__main__":
     assert CallType.withKey("rest") == CallType.REST
     assert CallType.withKey("bar") is None
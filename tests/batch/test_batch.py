@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+import sys
+from typing import List
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.batch import BatchRunner, read_results  # noqa: E402
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests  # noqa: E402
+from slashgpt.history.context import MESSAGE_OVERHEAD  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class MockBatchEngine(LLMEngineBase):
+    """It echoes the last message (after a short delay), fails on "fail", and offers an in-memory batch API"""
+
+    in_flight = 0
+    max_in_flight = 0
+    calls: List[str] = []
+    batches: dict = {}
+
+    async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        last_message = messages[-1]["content"]
+        MockBatchEngine.calls.append(last_message)
+        MockBatchEngine.in_flight += 1
+        MockBatchEngine.max_in_flight = max(MockBatchEngine.max_in_flight, MockBatchEngine.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            MockBatchEngine.in_flight -= 1
+        if last_message == "fail":
+            raise ConnectionError("unavailable")
+        yield "echo: "
+        yield last_message
+
+    def num_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def batch_request(self, messages: List[dict], manifest: Manifest):
+        return {"model": self.llm_model.name(), "messages": messages}
+
+    def submit_batch(self, requests: List[dict]) -> str:
+        batch_id = f"batch_{len(MockBatchEngine.batches)}"
+        MockBatchEngine.batches[batch_id] = {"status": "in_progress", "requests": requests}
+        return batch_id
+
+    def retrieve_batch(self, batch_id: str):
+        batch = MockBatchEngine.batches[batch_id]
+        if batch["status"] != "completed":
+            return (batch["status"], None)
+        results = {}
+        for request in batch["requests"]:
+            content = request["body"]["messages"][-1]["content"]
+            results[request["custom_id"]] = {"content": f"batch: {content}", "prompt_tokens": 10, "completion_tokens": 2}
+        return ("completed", results)
+
+
+llm_models = {"mock": {"engine_name": "mock_engine", "model_name": "mock_model"}}
+llm_engine_configs = {"mock_engine": MockBatchEngine}
+
+
+@pytest.fixture
+def config(tmp_path):
+    MockBatchEngine.max_in_flight = 0
+    MockBatchEngine.calls = []
+    MockBatchEngine.batches = {}
+    (tmp_path / "manifests").mkdir()
+    with open(tmp_path / "manifests" / "echo.json", "w") as f:
+        json.dump({"title": "Echo", "model": "mock_model", "prompt": "You echo"}, f)
+    with open(tmp_path / "manifests" / "window.json", "w") as f:
+        json.dump({"title": "Window", "model": "mock_model", "prompt": "You echo", "history_type": "window", "history_window": 1}, f)
+    return ChatConfigWithManifests(str(tmp_path), str(tmp_path / "manifests"), llm_models, llm_engine_configs)
+
+
+def write_records(path, records: List[dict]):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def test_run(config, tmp_path):
+    records = [{"agent": "echo", "message": f"hello {i}"} for i in range(10)]
+    records.append({"id": "multi", "agent": "echo", "messages": ["one", "two"]})
+    records.append({"id": "broken", "agent": "echo", "message": "fail"})
+    records.append({"id": "unknown", "agent": "nobody", "message": "hi"})
+    write_records(tmp_path / "requests.jsonl", records)
+
+    runner = BatchRunner(config, concurrency=4)
+    stats = asyncio.run(runner.run(str(tmp_path / "requests.jsonl"), str(tmp_path / "results.jsonl")))
+    assert stats["records"] == 13 and stats["succeeded"] == 11 and stats["failed"] == 2 and stats["skipped"] == 0
+    assert 1 < MockBatchEngine.max_in_flight <= 4
+    assert stats["p50"] <= stats["p95"]
+
+    results = read_results(str(tmp_path / "results.jsonl"))
+    # ids default to the line numbers
+    assert results["1"]["responses"] == ["echo: hello 0"] and results["1"]["model"] == "mock_model"
+    assert results["1"]["completion_tokens"] == 3 and results["1"]["prompt_tokens"] > 0 and results["1"]["latency"] > 0
+    assert results["multi"]["responses"] == ["echo: one", "echo: two"]
+    assert results["broken"]["error"] == "unavailable"
+    assert "nobody" in results["unknown"]["error"]
+
+
+def test_prompt_tokens(config, tmp_path):
+    write_records(tmp_path / "requests.jsonl", [{"id": "window", "agent": "window", "messages": ["one", "two", "three"]}])
+    asyncio.run(BatchRunner(config).run(str(tmp_path / "requests.jsonl"), str(tmp_path / "results.jsonl")))
+    # only the messages sent by the context policy are counted: the prompt and the last message on each call
+    result = read_results(str(tmp_path / "results.jsonl"))["window"]
+    assert result["prompt_tokens"] == 3 * (2 + 1 + 2 * MESSAGE_OVERHEAD)
+
+
+def test_resume(config, tmp_path):
+    write_records(tmp_path / "requests.jsonl", [{"id": str(i), "agent": "echo", "message": f"hello {i}"} for i in range(5)])
+    # a previous run finished two records (and failed one), and was interrupted while writing a line
+    with open(tmp_path / "results.jsonl", "w") as f:
+        f.write(json.dumps({"id": "0", "responses": ["echo: hello 0"], "error": None}) + "\n")
+        f.write(json.dumps({"id": "1", "responses": [], "error": "timeout"}) + "\n")
+        f.write(json.dumps({"id": "2", "responses": ["echo: hello 2"], "error": None}) + "\n")
+        f.write('{"id": "3", "respon')
+
+    runner = BatchRunner(config)
+    stats = asyncio.run(runner.run(str(tmp_path / "requests.jsonl"), str(tmp_path / "results.jsonl")))
+    assert stats["skipped"] == 2 and stats["succeeded"] == 3
+    assert sorted(MockBatchEngine.calls) == ["hello 1", "hello 3", "hello 4"]
+    results = read_results(str(tmp_path / "results.jsonl"))
+    assert [results[str(i)]["responses"] for i in range(5)] == [[f"echo: hello {i}"] for i in range(5)]
+
+    # nothing is left
+    stats = asyncio.run(runner.run(str(tmp_path / "requests.jsonl"), str(tmp_path / "results.jsonl")))
+    assert stats["skipped"] == 5 and stats["succeeded"] == 0
+
+
+def test_provider_batch(config, tmp_path):
+    records = [{"id": f"q{i}", "agent": "echo", "message": f"hello {i}"} for i in range(3)]
+    records.append({"id": "multi", "agent": "echo", "messages": ["one", "two"]})
+    write_records(tmp_path / "requests.jsonl", records)
+    (input_path, output_path) = (str(tmp_path / "requests.jsonl"), str(tmp_path / "results.jsonl"))
+
+    runner = BatchRunner(config)
+    assert asyncio.run(runner.submit(input_path, output_path)) == {"records": 4, "submitted": 3, "batches": 1, "online": 1}
+    body = MockBatchEngine.batches["batch_0"]["requests"][0]["body"]
+    assert body["messages"] == [{"role": "system", "content": "You echo"}, {"role": "user", "content": "hello 0"}]
+    # the submitted records are neither submitted again nor run
+    assert asyncio.run(runner.submit(input_path, output_path))["submitted"] == 0
+    assert asyncio.run(runner.run(input_path, output_path))["succeeded"] == 1
+    assert MockBatchEngine.calls == ["one", "two"]
+
+    stats = asyncio.run(runner.collect(output_path))
+    assert stats == {"succeeded": 0, "failed": 0, "batches": {"batch_0": "in_progress"}, "pending": 1}
+
+    MockBatchEngine.batches["batch_0"]["status"] = "completed"
+    stats = asyncio.run(runner.collect(output_path))
+    assert stats == {"succeeded": 3, "failed": 0, "batches": {"batch_0": "completed"}, "pending": 0}
+    results = read_results(output_path)
+    assert results["q1"]["responses"] == ["batch: hello 1"] and results["q1"]["batch_id"] == "batch_0" and results["q1"]["prompt_tokens"] == 10
+    assert asyncio.run(runner.run(input_path, output_path))["skipped"] == 4
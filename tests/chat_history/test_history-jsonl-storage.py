@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.file import ChatHistoryFileStorage  # noqa: E402
+
+
+@pytest.fixture
+def storage():
+    storage = ChatHistoryFileStorage("123", "key", log_format="jsonl", compact_threshold=8)
+    history = ChatHistory(storage)
+    history.append_message({"name": "1", "content": "1"})
+    history.append_message({"name": "2", "content": "2"})
+    history.append_message({"name": "3", "content": "3"})
+    return storage
+
+
+def restored(storage):
+    return ChatHistoryFileStorage("123", "key", session_id=storage.session_id, log_format="jsonl")
+
+
+def test_append_only(storage):
+    path = f"{storage.base_dir}/{storage.agent_name}/{storage.session_id}.jsonl"
+    size = os.path.getsize(path)
+    storage.append({"name": "4", "content": "4"})
+    with open(path, "r") as f:
+        assert len(f.readlines()) == 4
+    assert os.path.getsize(path) > size
+
+
+def test_restore(storage):
+    assert restored(storage).messages() == storage.messages()
+
+
+def test_set_and_pop(storage):
+    storage.set(0, {"name": "set", "content": "set_data"})
+    storage.pop()
+    assert restored(storage).messages() == [{"name": "set", "content": "set_data"}, {"name": "2", "content": "2"}]
+
+
+def test_compaction(storage):
+    for i in range(10):
+        storage.set(0, {"name": "set", "content": str(i)})
+    path = f"{storage.base_dir}/{storage.agent_name}/{storage.session_id}.jsonl"
+    with open(path, "r") as f:
+        assert len(f.readlines()) <= 8
+    assert restored(storage).messages() == storage.messages()
+
+
+def test_session_data(storage):
+    ids = [x["id"] for x in storage.session_list() if x["name"].endswith(f"{storage.session_id}.jsonl")]
+    assert storage.get_session_data(str(ids[0])) == {"messages": storage.messages()}
+
+
+def test_migration():
+    storage = ChatHistoryFileStorage("123", "key")
+    storage.append({"name": "1", "content": "1"})
+    path = f"{storage.base_dir}/{storage.agent_name}/{storage.session_id}"
+
+    migrated = restored(storage)
+    assert migrated.messages() == [{"name": "1", "content": "1"}]
+    assert not os.path.exists(path + ".json") and os.path.exists(path + ".jsonl")
+    assert [x["name"] for x in storage.session_list() if storage.session_id in x["name"]] == [f"./{path}.jsonl"]
+
+    # a reader of the json format sees the migrated session
+    migrated.append({"name": "2", "content": "2"})
+    reader = ChatHistoryFileStorage("123", "key", session_id=storage.session_id)
+    assert reader.messages() == migrated.messages()
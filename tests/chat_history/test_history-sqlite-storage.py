@@ -0,0 +1,88 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.history.storage.sqlite import ChatHistorySQLiteStorage, flush_all  # noqa: E402
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = ChatHistorySQLiteStorage("123", "key", db_path=str(tmp_path / "history.db"), batch_size=2)
+    history = ChatHistory(storage)
+    history.append_message({"name": "1", "content": "1"})
+    history.append_message({"name": "2", "content": "2"})
+    history.append_message({"name": "3", "content": "3", "preset": True})
+    return storage
+
+
+@pytest.fixture
+def history(storage):
+    return ChatHistory(storage)
+
+
+def test_get(history):
+    assert history.get_message(0).get("name") == "1"
+    assert history.get_message(-1).get("name") == "3"
+
+
+def test_set(history):
+    data = {"name": "set", "content": "set_data", "role": None}
+    history.set_message(2, data)
+    assert history.get_message(2) == data
+
+
+def test_len_last_pop(history):
+    assert history.len_messages() == 3
+    assert history.last_message() == {"name": "3", "content": "3", "role": None}
+    history.pop_message()
+    assert history.len_messages() == 2
+    assert history.last_message() == {"name": "2", "content": "2", "role": None}
+
+
+def test_preset(history):
+    assert history.preset_messages() == [{"name": "3", "content": "3", "role": None}]
+    assert len(history.nonpreset_messages()) == 2
+
+
+def test_reopen(storage):
+    storage.flush()
+    reopened = ChatHistorySQLiteStorage("123", "key", session_id=storage.session_id, db_path=storage.db_path)
+    assert reopened.len() == 3
+    assert reopened.messages() == storage.messages()
+
+
+def test_sessions(storage):
+    other = ChatHistorySQLiteStorage("123", "key", db_path=storage.db_path)
+    other.restore([{"role": "user", "content": "restored"}])
+    sessions = storage.session_list()
+    assert [x["name"] for x in sessions] == [storage.session_id, other.session_id]
+    assert storage.get_session_data("1") == {"messages": [{"role": "user", "content": "restored"}]}
+    assert storage.get_session_data(storage.session_id) == {"messages": storage.messages()}
+
+
+def test_memory(storage):
+    assert storage.memory() == {}
+    storage.setMemory({"name": "Joe Smith"})
+    reopened = ChatHistorySQLiteStorage("123", "key", session_id=storage.session_id, db_path=storage.db_path)
+    assert reopened.memory() == {"name": "Joe Smith"}
+    assert ChatHistorySQLiteStorage("123", "key", db_path=storage.db_path).memory() == {}
+
+
+def test_pending_messages(tmp_path):
+    db_path = str(tmp_path / "history.db")
+    storage = ChatHistorySQLiteStorage("123", "key", db_path=db_path, batch_size=10)
+    storage.append({"role": "user", "content": "1"})
+    storage.close()
+    assert ChatHistorySQLiteStorage("123", "key", session_id=storage.session_id, db_path=db_path).len() == 1
+
+    # the pending messages are flushed at exit (even on another thread)
+    storage.append({"role": "user", "content": "2"})
+    thread = threading.Thread(target=flush_all)
+    thread.start()
+    thread.join()
+    assert ChatHistorySQLiteStorage("123", "key", session_id=storage.session_id, db_path=db_path).len() == 2
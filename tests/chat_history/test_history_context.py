@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.history.context import BudgetContext, SummaryContext, WindowContext  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class MockLlmEngine(LLMEngineBase):
+    """It counts words as tokens, and summarizes a conversation by the number of its lines"""
+
+    summaries = 0
+
+    def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        if messages[0]["content"].startswith("Summarize"):
+            MockLlmEngine.summaries += 1
+            return ("assistant", f"summary of {len(messages[-1]['content'].splitlines())} lines", None, 0)
+        return ("assistant", "ok", None, 0)
+
+    def num_tokens(self, text: str) -> int:
+        return len(text.split())
+
+
+config = ChatConfig(os.path.dirname(__file__), {"mock": {"engine_name": "mock_engine", "model_name": "mock_model"}}, {"mock_engine": MockLlmEngine})
+
+
+def new_session(**manifest) -> ChatSession:
+    session = ChatSession(config, manifest={"prompt": "You are a bot", "model": "mock_model", "intro": ["Hello"], **manifest})
+    for i in range(30):
+        session.append_message("user", f"question {i} " + "word " * 10, False)
+        session.append_message("assistant", f"answer {i} " + "word " * 10, False)
+    return session
+
+
+def select(session: ChatSession) -> List[dict]:
+    return asyncio.run(session.context_policy.select(session.history, session.llm_model))
+
+
+def test_all():
+    session = new_session()
+    assert select(session) == session.history.messages()
+
+
+def test_window():
+    session = new_session(history_type="window", history_window=5)
+    assert isinstance(session.context_policy, WindowContext)
+    messages = select(session)
+    # the preset messages, then the recent ones from a user message
+    assert [m["content"] for m in messages[:2]] == ["You are a bot", "Hello"]
+    assert [m["role"] for m in messages[2:]] == ["user", "assistant", "user", "assistant"]
+    assert messages[-1]["content"].startswith("answer 29")
+
+
+def test_budget():
+    session = new_session(history_type="budget", history_budget=100)
+    assert isinstance(session.context_policy, BudgetContext)
+    messages = select(session)
+    assert messages[0]["content"] == "You are a bot" and messages[2]["role"] == "user"
+    assert sum(BudgetContext.num_tokens(m, session.llm_model) for m in messages) <= 100
+    assert messages[-1]["content"].startswith("answer 29")
+
+
+def test_summary():
+    MockLlmEngine.summaries = 0
+    session = new_session(history_type="summary", history_budget=200)
+    policy: SummaryContext = session.context_policy
+    messages = select(session)
+    assert MockLlmEngine.summaries == 1
+    assert messages[2] == {"role": "system", "content": f"Summary of the earlier conversation:\nsummary of {policy.summarized} lines"}
+    assert sum(SummaryContext.num_tokens(m, session.llm_model) for m in messages) <= 200
+
+    # the summary is reused until the recent messages exceed the budget again, and the prompt stays bounded
+    for i in range(30, 40):
+        session.append_message("user", f"question {i} " + "word " * 10, False)
+        session.append_message("assistant", f"answer {i} " + "word " * 10, False)
+        messages = select(session)
+        assert sum(SummaryContext.num_tokens(m, session.llm_model) for m in messages) <= 200
+        assert messages[-1]["content"].startswith(f"answer {i}")
+    assert 1 < MockLlmEngine.summaries < 6
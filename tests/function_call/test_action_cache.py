@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.function.action_cache import ActionCache  # noqa: E402
+
+
+def test_key_is_normalized():
+    assert ActionCache.key("https://a.com", "get", {"a": 1, "b": 2}) == ActionCache.key("https://a.com", "GET", {"b": 2, "a": 1})
+    assert ActionCache.key("https://a.com", "GET", {"a": 1}) != ActionCache.key("https://a.com", "POST", {"a": 1})
+    assert ActionCache.key("https://a.com", "GET", {"a": 1}) != ActionCache.key("https://a.com", "GET", {"a": 2})
+
+
+def test_memory_ttl(tmp_path):
+    cache = ActionCache(db_path=str(tmp_path / "cache.db"))
+    cache.set("k", "response", 0.05)
+    assert cache.get("k") == "response"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1
+    assert not os.path.exists(tmp_path / "cache.db")
+
+
+def test_disk_tier(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    ActionCache(db_path=db_path).set("k", "response", 60, persist=True)
+
+    cache = ActionCache(db_path=db_path)
+    assert cache.get("k") is None
+    assert cache.get("k", persist=True) == "response"
+    assert cache.get("k") == "response"
+    assert cache.stats()["disk_hits"] == 1
+
+    cache.clear()
+    assert ActionCache(db_path=db_path).get("k", persist=True) is None
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import sys
+
+from aiohttp import web
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+import slashgpt.function.function_action as function_action  # noqa: E402
+import slashgpt.function.network as network  # noqa: E402
+from slashgpt.function.action_cache import ActionCache  # noqa: E402
+from slashgpt.function.function_action import FunctionAction  # noqa: E402
+from slashgpt.llms.transport import default_transport  # noqa: E402
+
+
+async def serve(routes, test):
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await test(f"http://127.0.0.1:{port}")
+    finally:
+        await default_transport.aclose()
+        await runner.cleanup()
+
+
+def test_rest_retry(monkeypatch):
+    monkeypatch.setattr(network, "RETRY_BACKOFF", 0.01)
+    calls = []
+
+    async def handler(request):
+        calls.append(request.query["city"])
+        if len(calls) < 3:
+            return web.Response(status=503 if len(calls) == 1 else 429, headers={"Retry-After": "0"})
+        return web.Response(text=f"sunny in {request.query['city']}")
+
+    async def test(base):
+        action = FunctionAction({"type": "rest", "url": base + "/weather?city={city}", "retries": 2})
+        return await action.acall_api("weather", {"city": "Tokyo"}, "", False)
+
+    assert asyncio.run(serve([web.get("/weather", handler)], test)) == "sunny in Tokyo"
+    assert calls == ["Tokyo", "Tokyo", "Tokyo"]
+
+
+def test_sync_rest_server_error():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.method)
+        return web.Response(status=503, headers={"Retry-After": "0"})
+
+    async def test(base):
+        # the synchronous path returns None (instead of raising) after the retries
+        action = FunctionAction({"type": "rest", "url": base + "/weather"})
+        return await asyncio.to_thread(action.call_api, "weather", {}, "", False)
+
+    assert asyncio.run(serve([web.get("/weather", handler)], test)) is None
+    assert calls == ["GET"] * (network.DEFAULT_RETRIES + 1)
+
+
+def test_rest_post_is_not_retried_on_server_error():
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.json())
+        return web.Response(status=500)
+
+    async def test(base):
+        action = FunctionAction({"type": "rest", "method": "POST", "url": base + "/order", "retries": 2})
+        return await action.acall_api("order", {"item": "pen"}, "", False)
+
+    assert asyncio.run(serve([web.post("/order", handler)], test)) is None
+    assert calls == [{"item": "pen"}]
+
+
+def test_rest_timeout():
+    async def handler(request):
+        await asyncio.sleep(1)
+        return web.Response(text="late")
+
+    async def test(base):
+        action = FunctionAction({"type": "rest", "url": base + "/slow", "timeout": 0.1, "retries": 0})
+        return await action.acall_api("slow", {}, "", False)
+
+    assert asyncio.run(serve([web.get("/slow", handler)], test)) is None
+
+
+def test_timeout_is_retried_only_for_idempotent_methods(monkeypatch):
+    monkeypatch.setattr(network, "RETRY_BACKOFF", 0.01)
+    calls = []
+
+    async def handler(request):
+        calls.append(request.method)
+        await asyncio.sleep(0.3)
+        return web.Response(text="late")
+
+    async def test(base):
+        results = []
+        for method in ["POST", "GET"]:
+            action = FunctionAction({"type": "rest", "method": method, "url": base + "/slow", "timeout": 0.1, "retries": 1})
+            results.append(await action.acall_api("slow", {}, "", False))
+        return results
+
+    assert asyncio.run(serve([web.post("/slow", handler), web.get("/slow", handler)], test)) == [None, None]
+    # the POST may have been processed by the server, so it is not sent again
+    assert calls == ["POST", "GET", "GET"]
+
+
+def test_graphql():
+    async def handler(request):
+        body = await request.json()
+        assert body["query"] == "query { company { ceo } }"
+        return web.json_response({"data": {"company": {"ceo": "Elon Musk"}}})
+
+    async def test(base):
+        action = FunctionAction({"type": "graphQL", "url": base + "/graphql"})
+        return await action.acall_api("call_graphQL", {"query": "{ company { ceo } }"}, "", False)
+
+    assert json.loads(asyncio.run(serve([web.post("/graphql", handler)], test))) == {"company": {"ceo": "Elon Musk"}}
+
+
+def test_cached_action(monkeypatch, tmp_path):
+    monkeypatch.setattr(function_action, "default_action_cache", ActionCache(db_path=str(tmp_path / "cache.db")))
+    calls = []
+
+    async def handler(request):
+        calls.append(request.query["q"])
+        return web.Response(text=f"result of {request.query['q']}")
+
+    async def test(base):
+        action = FunctionAction({"type": "rest", "url": base + "/search?q={q}", "cache": {"ttl": 60}})
+        results = [await action.acall_api("search", {"q": q}, "", False) for q in ["a", "b", "a"]]
+        return results + [action.call_api("search", {"q": "b"}, "", False)]
+
+    assert asyncio.run(serve([web.get("/search", handler)], test)) == ["result of a", "result of b", "result of a", "result of b"]
+    assert calls == ["a", "b"]
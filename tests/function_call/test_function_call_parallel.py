@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_history import ChatHistory  # noqa: E402
+from slashgpt.function.function_call import FunctionCall  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+module_code = """
+import time
+
+def lookup(city):
+    time.sleep(0.3)
+    return ({"city": city}, None)
+"""
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    with open(tmp_path / "lookup.py", "w") as f:
+        f.write(module_code)
+    return Manifest({"module": "lookup.py"}, str(tmp_path), "parallel")
+
+
+def test_parallel_module_functions(manifest):
+    cities = ["Tokyo", "Paris", "London"]
+    function_calls = [FunctionCall({"name": "lookup", "arguments": f'{{"city": "{city}"}}'}, manifest) for city in cities]
+    last_message = {"role": "user", "content": "weather?"}
+
+    async def run():
+        return await asyncio.gather(*[function_call.aprocess_function_call(last_message) for function_call in function_calls])
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    assert time.perf_counter() - start < 0.8
+
+    history = ChatHistory(ChatHistoryMemoryStorage("123", "parallel"))
+    for function_call, (function_message, function_name, code_message) in zip(function_calls, results):
+        function_call.append_result(history, function_message, function_name, code_message)
+    assert [m["content"] for m in history.messages()] == ['{"city": "Tokyo"}', '{"city": "Paris"}', '{"city": "London"}']
+
+
+def test_action_is_async():
+    manifest = Manifest({"actions": {"lookup": {"type": "message_template", "message": "weather of {city}"}}})
+    function_call = FunctionCall({"name": "lookup", "arguments": '{"city": "Tokyo"}'}, manifest)
+    result = asyncio.run(function_call.aprocess_function_call({"role": "user", "content": "weather?"}))
+    assert result == ("weather of Tokyo", "lookup", None)
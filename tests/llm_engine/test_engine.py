@@ -9,8 +9,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
 
 from slashgpt.chat_config import ChatConfig  # noqa: E402
 from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.function.function_call import FunctionCall  # noqa: E402
 from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.llms.model import LlmModel  # noqa: E402
+from slashgpt.llms.response_cache import ResponseCache  # noqa: E402
 from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.utils.utils import run_sync  # noqa: E402
 
 load_dotenv()
 current_dir = os.path.dirname(__file__)
@@ -40,8 +44,37 @@ class MockLlmEngine(LLMEngineBase):
         return (role, res, function_call, 0)
 
 
+class MockAsyncLlmEngine(LLMEngineBase):
+    def __init__(self, llm_model):
+        super().__init__(llm_model)
+
+    async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        last_message = messages[len(messages) - 1]
+        if last_message.get("content") == "notify":
+            # an emit-style call between two lookups
+            yield FunctionCall({"name": "lookup", "arguments": '{"city": "Tokyo"}'}, manifest)
+            yield FunctionCall({"name": "notify", "arguments": '{"city": "Tokyo"}'}, manifest)
+            yield FunctionCall({"name": "lookup", "arguments": '{"city": "Paris"}'}, manifest)
+        elif last_message.get("role") == "user":
+            # ask for two independent lookups at once
+            yield FunctionCall({"name": "lookup", "arguments": '{"city": "Tokyo"}'}, manifest)
+            yield FunctionCall({"name": "lookup", "arguments": '{"city": "Paris"}'}, manifest)
+        else:
+            results = [m.get("content") for m in messages if m.get("role") == "function"]
+            yield "Results: "
+            yield ", ".join(results)
+
+
+def call_llm(session: ChatSession):
+    async def collect():
+        return "".join([m async for m in session.call_llm() if isinstance(m, str)])
+
+    return run_sync(collect())
+
+
 my_llm_engine_configs = {
     "mock_engine": MockLlmEngine,
+    "mock_async_engine": MockAsyncLlmEngine,
 }
 config = ChatConfig(current_dir, llm_engine_configs=my_llm_engine_configs)
 
@@ -60,22 +93,22 @@ class Test:
         }
         session = ChatSession(config, manifest=manifest)
         session.append_user_question("Hi")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == "Hello World"
         session.append_user_question("Bye")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == "Sayonara"
         session.append_user_question("Repeat this message.")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == "Repeat this message."
         session.append_user_question("prompt")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == manifest.get("prompt")
         session.append_user_question("model")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == "mock_model"
         session.append_user_question("custom")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == "mock_value"
 
     def test_memory(self):
@@ -86,5 +119,129 @@ class Test:
         memory = {"name": "Joe Smith"}
         session = ChatSession(config, manifest=manifest, memory=memory)
         session.append_user_question("prompt")
-        (message, _function_call, _) = session.call_llm()
+        message = call_llm(session)
         assert message == manifest.get("prompt").format(memory=json.dumps(memory))
+
+
+def test_llm_model_cache():
+    cached_config = ChatConfig(current_dir, llm_models={"mock": mock_model}, llm_engine_configs=my_llm_engine_configs)
+    llm_model = cached_config.get_llm_model_from_key("mock")
+    assert cached_config.get_llm_model_from_key("mock") is llm_model
+    assert cached_config.get_llm_model_from_manifest(Manifest({"model": dict(mock_model)})) is llm_model
+    assert cached_config.get_llm_model_from_manifest(Manifest({"model": {**mock_model, "x_custom": "other"}})) is not llm_model
+
+    cached_config.clear_llm_model_cache()
+    assert cached_config.get_llm_model_from_key("mock") is not llm_model
+
+
+def test_call_loop():
+    manifest = {
+        "model": {"engine_name": "mock_async_engine", "model_name": "mock_async_model"},
+        "prompt": "This is prompt",
+        "actions": {"lookup": {"type": "message_template", "message": "weather of {city}"}},
+    }
+    session = ChatSession(config, manifest=manifest)
+    session.append_user_question("weather?")
+    events = []
+
+    async def collect():
+        return [m async for m in session.call_loop(lambda callback_type, data: events.append((callback_type, data)))]
+
+    chunks = run_sync(collect())
+    assert "".join(chunks) == "Results: weather of Tokyo, weather of Paris"
+    assert events == [
+        ("function", ("lookup", "weather of Tokyo")),
+        ("function", ("lookup", "weather of Paris")),
+        ("bot", "Results: weather of Tokyo, weather of Paris"),
+    ]
+    assert session.history.last_message() == {"role": "assistant", "content": "Results: weather of Tokyo, weather of Paris"}
+
+
+def test_call_loop_max_depth():
+    manifest = {
+        "model": {"engine_name": "mock_async_engine", "model_name": "mock_async_model"},
+        "actions": {"lookup": {"type": "message_template", "message": "weather of {city}"}},
+        "max_call_depth": 1,
+    }
+    session = ChatSession(config, manifest=manifest)
+    session.append_user_question("weather?")
+
+    async def collect():
+        return [m async for m in session.call_loop(lambda callback_type, data: None)]
+
+    assert run_sync(collect()) == []
+    assert session.history.last_message() == {"role": "function", "content": "weather of Paris", "name": "lookup"}
+
+
+def test_call_loop_emit():
+    manifest = {
+        "model": {"engine_name": "mock_async_engine", "model_name": "mock_async_model"},
+        "actions": {
+            "lookup": {"type": "message_template", "message": "weather of {city}"},
+            "notify": {"type": "emit", "emit_method": "notify", "emit_data": {"city": "{city}"}},
+        },
+    }
+    session = ChatSession(config, manifest=manifest)
+    session.append_user_question("notify")
+    events = []
+
+    async def collect():
+        return [m async for m in session.call_loop(lambda callback_type, data: events.append((callback_type, data)))]
+
+    # all the calls are processed, and the loop stops after the emit
+    assert run_sync(collect()) == []
+    assert events == [
+        ("function", ("lookup", "weather of Tokyo")),
+        ("function", ("lookup", "weather of Paris")),
+        ("emit", ("notify", {"city": "Tokyo"})),
+    ]
+    assert session.history.last_message() == {"role": "function", "content": "weather of Paris", "name": "lookup"}
+
+
+def test_response_cache(tmp_path, monkeypatch):
+    cached_config = ChatConfig(current_dir, llm_engine_configs=my_llm_engine_configs)
+    manifest = {
+        "model": {"engine_name": "mock_async_engine", "model_name": "mock_async_model"},
+        "actions": {"lookup": {"type": "message_template", "message": "weather of {city}"}},
+    }
+    # a model created before the cache is set does not keep the config from using it
+    cached_config.get_llm_model_from_manifest(Manifest(manifest))
+    cached_config.response_cache = ResponseCache(db_path=str(tmp_path / "llm_cache.db"))
+    calls = []
+    original = MockAsyncLlmEngine.chat_completion
+
+    def counting(self, messages, manifest, verbose):
+        calls.append(len(messages))
+        return original(self, messages, manifest, verbose)
+
+    monkeypatch.setattr(MockAsyncLlmEngine, "chat_completion", counting)
+    for _ in range(2):
+        session = ChatSession(cached_config, manifest=manifest)
+        session.append_user_question("weather?")
+
+        async def collect():
+            return [m async for m in session.call_loop(lambda callback_type, data: None)]
+
+        assert "".join(run_sync(collect())) == "Results: weather of Tokyo, weather of Paris"
+    assert len(calls) == 2
+    assert cached_config.response_cache.stats()["hits"] == 2
+
+    # the on-disk tier is shared by another cache
+    disk_cache = ResponseCache(db_path=str(tmp_path / "llm_cache.db"))
+    llm_model = LlmModel({"engine_name": "mock_async_engine", "model_name": "mock_async_model"}, my_llm_engine_configs, response_cache=disk_cache)
+    messages = [{"role": "user", "content": "weather?"}]
+
+    async def generate(manifest):
+        return [m async for m in llm_model.generate_response(messages, manifest, False)]
+
+    function_calls = run_sync(generate(Manifest(manifest)))
+    assert [function_call.data() for function_call in function_calls] == [
+        {"name": "lookup", "arguments": '{"city": "Tokyo"}'},
+        {"name": "lookup", "arguments": '{"city": "Paris"}'},
+    ]
+    assert disk_cache.stats()["disk_hits"] == 1
+    assert len(calls) == 2
+
+    # agents may opt out
+    run_sync(generate(Manifest({**manifest, "response_cache": False})))
+    assert len(calls) == 3
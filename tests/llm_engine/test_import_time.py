@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+src_path = os.path.join(os.path.dirname(__file__), "../../src")
+
+heavy_modules = ["anthropic", "openai", "google.generativeai", "groq", "replicate", "IPython", "boto3", "gql", "pinecone", "psycopg2"]
+
+
+def import_in_subprocess(statement: str):
+    # a fresh interpreter, so that the modules imported by other tests do not count
+    code = f"import sys, time\nstart = time.perf_counter()\n{statement}\nprint(time.perf_counter() - start)\nprint(__import__('json').dumps(sorted(sys.modules.keys())))"
+    env = dict(os.environ, GROQ_API_KEY="dummy")
+    result = subprocess.run([sys.executable, "-c", code], cwd=src_path, env=env, capture_output=True, text=True, check=True)
+    lines = result.stdout.strip().split("\n")
+    return float(lines[-2]), set(json.loads(lines[-1]))
+
+
+def test_import_time():
+    elapsed, modules = import_in_subprocess("from slashgpt import ChatSession, ChatConfig, LlmModel, Manifest")
+    assert modules.isdisjoint(heavy_modules)
+    assert elapsed < 2.0
+
+    # the engine is imported when the model is used for the first time
+    _, modules = import_in_subprocess(
+        "from slashgpt import LlmModel\n"
+        "from slashgpt.llms.default_config import default_llm_engine_configs\n"
+        "LlmModel({'engine_name': 'groq', 'model_name': 'llama3-8b-8192', 'api_key': 'GROQ_API_KEY'}, default_llm_engine_configs)"
+    )
+    assert "slashgpt.llms.engine.groq" in modules and "groq" in modules
+    assert "slashgpt.llms.engine.anthropic_engine" not in modules
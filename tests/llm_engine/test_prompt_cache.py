@@ -0,0 +1,81 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms.engine.anthropic_engine import LLMEngineAnthropic  # noqa: E402
+from slashgpt.llms.prompt_cache import PromptCacheStats  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.prompt_template import PromptTemplate  # noqa: E402
+
+
+def test_dynamic_last():
+    template = PromptTemplate("You are a nurse.\nPatient info: {memory}\n{articles}\nGreet the patient at {now}.\n")
+    rendered = template.dynamic_last().render({"memory": '{"name": "Joe"}', "now": "20240101T000000Z"})
+    # the static part is a stable prefix, and {articles} (filled in on each turn) comes last
+    assert rendered == (
+        "You are a nurse.\nPatient info: (memory below)\n(articles below)\nGreet the patient at (now below).\n"
+        '\n\nmemory:\n{"name": "Joe"}\n\nnow:\n20240101T000000Z\n\narticles:\n{articles}'
+    )
+    # a trailing section is headed too, so that the static part can be split from it
+    template = PromptTemplate("Use the articles below.\n{articles}")
+    assert template.dynamic_last().render({}) == "Use the articles below.\n\n\narticles:\n{articles}"
+    assert template.dynamic_last().dynamic_marker == "\n\narticles:\n"
+    # nothing to move
+    template = PromptTemplate("You are a nurse.")
+    assert template.dynamic_last() is template and template.dynamic_marker is None
+
+    # it is opt-in for each manifest
+    prompt = ["Patient info: {memory}", "Greet the patient."]
+    assert Manifest({"prompt": prompt}).prompt_data({}, {"name": "Joe"}) == 'Patient info: {"name": "Joe"}\nGreet the patient.'
+    assert Manifest({"prompt": prompt, "prompt_cache": True}).prompt_data({}, {}).startswith("Patient info: (memory below)\nGreet the patient.")
+
+
+def test_anthropic_messages():
+    messages = [
+        {"role": "system", "content": "You are a bot"},
+        {"role": "assistant", "content": "Hello"},
+        {"role": "user", "content": "What is the weather?"},
+        {"role": "assistant", "content": ""},
+        {"role": "function", "name": "weather", "content": "sunny"},
+        {"role": "assistant", "content": "It is sunny"},
+        {"role": "user", "content": "Thanks"},
+    ]
+    (system, conversation) = LLMEngineAnthropic.convert_messages(messages)
+    LLMEngineAnthropic.add_cache_breakpoints(system, conversation)
+    assert system == [{"type": "text", "text": "You are a bot", "cache_control": {"type": "ephemeral"}}]
+    assert [(m["role"], [block["text"] for block in m["content"]]) for m in conversation] == [
+        ("user", ["What is the weather?", "Result of weather:\nsunny"]),
+        ("assistant", ["It is sunny"]),
+        ("user", ["Thanks"]),
+    ]
+    assert conversation[-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in conversation[0]["content"][-1]
+
+
+def test_anthropic_static_prefix():
+    manifest = Manifest({"prompt": ["Patient info: {memory}", "Use the articles.", "{articles}"], "prompt_cache": True})
+    prompt = manifest.prompt_data({}, {"name": "Joe"}).replace("{articles}", "Article 1")
+    (system, conversation) = LLMEngineAnthropic.convert_messages([{"role": "system", "content": prompt}, {"role": "user", "content": "Hi"}])
+    LLMEngineAnthropic.add_cache_breakpoints(system, conversation, manifest.prompt_cache_marker())
+    # only the static part is marked, and the dynamic sections follow in another block
+    assert system == [
+        {"type": "text", "text": "Patient info: (memory below)\nUse the articles.\n", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": '\n\nmemory:\n{"name": "Joe"}\n\narticles:\nArticle 1'},
+    ]
+    assert "".join(block["text"] for block in system) == prompt
+
+    # the whole prompt is static without prompt_cache
+    (system, conversation) = LLMEngineAnthropic.convert_messages([{"role": "system", "content": "You are a bot"}])
+    LLMEngineAnthropic.add_cache_breakpoints(system, conversation, Manifest({"prompt": "You are a bot"}).prompt_cache_marker())
+    assert system == [{"type": "text", "text": "You are a bot", "cache_control": {"type": "ephemeral"}}]
+
+
+def test_prompt_cache_stats():
+    stats = PromptCacheStats()
+    stats.record(2000, 0, 1800)
+    stats.record(2100, 1800)
+    usage = SimpleNamespace(prompt_tokens=100, prompt_tokens_details=None)
+    stats.record(usage.prompt_tokens, None)
+    assert stats.stats() == {"requests": 3, "input_tokens": 4200, "cached_tokens": 1800, "cache_write_tokens": 1800, "hit_rate": 0.429}
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import List
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms.default_config import default_llm_engine_configs  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.llms.model import LlmModel  # noqa: E402
+from slashgpt.llms.rate_limiter import RateLimiter, RateLimiterRegistry  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class RateLimitError(Exception):
+    def __init__(self):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after-ms": "50"})
+
+
+class MockRateLimitedEngine(LLMEngineBase):
+    """It fails with a rate limit error on the first request"""
+
+    calls = 0
+
+    async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        MockRateLimitedEngine.calls += 1
+        if MockRateLimitedEngine.calls == 1:
+            raise RateLimitError()
+        yield "Hello"
+
+
+def test_token_budget():
+    async def run():
+        limiter = RateLimiter(tpm=6000)
+        started = time.monotonic()
+        # the bucket holds a minute worth of tokens, and refills 100 tokens per second
+        await limiter.acquire(6000)
+        assert time.monotonic() - started < 0.1
+        await limiter.acquire(30)
+        return time.monotonic() - started
+
+    assert 0.25 < asyncio.run(run()) < 0.6
+
+
+def test_fairness():
+    async def run():
+        limiter = RateLimiter(tpm=6000)
+        await limiter.acquire(6000)
+        granted = []
+
+        async def request(user, name):
+            await limiter.acquire(3, user)
+            granted.append(name)
+
+        tasks = [asyncio.create_task(request("alice", f"a{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request("bob", "b0")))
+        await asyncio.gather(*tasks)
+        return (granted, limiter.stats())
+
+    (granted, stats) = asyncio.run(run())
+    # bob does not wait for all the requests of alice
+    assert granted == ["a0", "b0", "a1", "a2", "a3"]
+    assert stats == {"queued": 0, "granted": 6, "rate_limited": 0}
+
+
+def test_retry_after():
+    rate_limiter = RateLimiterRegistry()
+    llm_model = LlmModel(
+        {"engine_name": "mock", "model_name": "mock", "rate_limits": {"rpm": 60}},
+        {**default_llm_engine_configs, "mock": MockRateLimitedEngine},
+        rate_limiter=rate_limiter,
+    )
+
+    async def talk():
+        return [message async for message in llm_model.generate_response([{"role": "user", "content": "Hi"}], Manifest({}), False, "alice")]
+
+    started = time.monotonic()
+    assert asyncio.run(talk()) == ["Hello"]
+    assert time.monotonic() - started >= 0.05
+    assert rate_limiter.stats() == {"mock": {"queued": 0, "granted": 2, "rate_limited": 1}}
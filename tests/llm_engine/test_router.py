@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import time
+from typing import List
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms.default_config import default_llm_engine_configs  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.llms.engine.router import LLMEngineRouter  # noqa: E402
+from slashgpt.llms.model import LlmModel  # noqa: E402
+from slashgpt.llms.rate_limiter import RateLimiter  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+
+class MockStreamingEngine(LLMEngineBase):
+    """It streams the model name after "delay" seconds, or raises an error if "fail" is set"""
+
+    async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        await asyncio.sleep(self.llm_model.get("delay") or 0)
+        if self.llm_model.get("fail"):
+            raise ConnectionError(self.llm_model.name())
+        yield self.llm_model.name()
+        yield "!"
+
+
+engine_configs = {**default_llm_engine_configs, "mock": MockStreamingEngine}
+
+
+def router(members: List[dict], **params) -> LlmModel:
+    members = [{"engine_name": "mock", **member} for member in members]
+    return LlmModel({"engine_name": "router", "model_name": "router", "members": members, **params}, engine_configs)
+
+
+def talk(llm_model: LlmModel, user: str = "") -> str:
+    async def collect():
+        return "".join([message async for message in llm_model.generate_response([{"role": "user", "content": "Hi"}], Manifest({}), False, user)])
+
+    return asyncio.run(collect())
+
+
+def test_fastest_member():
+    llm_model = router([{"model_name": "slow", "delay": 0.05}, {"model_name": "fast", "delay": 0.0}])
+    engine: LLMEngineRouter = llm_model.engine
+    # members are measured first, then the fastest one is preferred
+    assert [talk(llm_model) for _ in range(3)] == ["slow!", "fast!", "fast!"]
+    assert engine.stats()["slow"]["requests"] == 1 and engine.stats()["fast"]["requests"] == 2
+    assert engine.stats()["fast"]["p95"] < engine.stats()["slow"]["p50"]
+
+
+def test_failover():
+    llm_model = router([{"model_name": "broken", "fail": True}, {"model_name": "backup", "delay": 0.01}])
+    engine: LLMEngineRouter = llm_model.engine
+    assert talk(llm_model) == "backup!"
+    assert talk(llm_model) == "backup!"
+    # the broken member is not tried again during its cooldown
+    assert engine.stats()["broken"] == {"p50": None, "p95": None, "error_rate": 1.0, "requests": 1, "healthy": False}
+
+    with pytest.raises(ConnectionError):
+        talk(router([{"model_name": "a", "fail": True}, {"model_name": "b", "fail": True}]))
+
+
+def test_hedging():
+    llm_model = router([{"model_name": "first", "delay": 0.0}, {"model_name": "second", "delay": 0.0}], hedge_after=0.02)
+    engine: LLMEngineRouter = llm_model.engine
+    assert talk(llm_model) == "first!"
+    assert talk(llm_model) == "second!"
+
+    # the first member became slow: a hedged duplicate goes to the second one, which wins
+    engine.members[0].llm_model_data["delay"] = 0.5
+    started = time.monotonic()
+    assert talk(llm_model) == "second!"
+    assert time.monotonic() - started < 0.4
+    # the cancelled request is not counted
+    assert engine.stats()["first"]["requests"] == 1 and engine.stats()["second"]["requests"] == 2
+
+
+def test_user_is_forwarded(monkeypatch):
+    users = []
+    original = RateLimiter.acquire
+
+    async def acquire(self, tokens: int = 0, user: str = ""):
+        users.append(user)
+        return await original(self, tokens, user)
+
+    monkeypatch.setattr(RateLimiter, "acquire", acquire)
+    assert talk(router([{"model_name": "member"}]), "alice") == "member!"
+    # both the router and its member queue the request under the user
+    assert users == ["alice", "alice"]
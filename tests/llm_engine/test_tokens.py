@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms.tokens import DEFAULT_ENCODING, TokenBudget, get_encoding, num_tokens  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def encodings():
+    # tiktoken downloads the encoding files on first use
+    try:
+        get_encoding("gpt-4-0613")
+    except Exception as e:
+        pytest.skip(f"tiktoken encodings are not available: {e}")
+
+
+def test_encoding_is_cached():
+    assert get_encoding("gpt-3.5-turbo-0613") is get_encoding("gpt-3.5-turbo-0613")
+
+
+def test_unknown_model_falls_back():
+    assert get_encoding("Llama-3.1-70B-Instruct").name == DEFAULT_ENCODING
+    assert num_tokens("Hello World", "claude-3-opus") == num_tokens("Hello World", "gpt-4-0613")
+
+
+def test_empty_text():
+    assert num_tokens("", "gpt-4-0613") == 0
+
+
+def test_budget():
+    budget = TokenBudget(5, "gpt-4-0613")
+    assert budget.add("Hello World")
+    assert budget.used == num_tokens("Hello World", "gpt-4-0613")
+    assert not budget.add("This sentence does not fit in the remaining budget")
+    assert budget.used == num_tokens("Hello World", "gpt-4-0613")
+    assert budget.remaining() == 5 - budget.used
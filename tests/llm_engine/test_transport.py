@@ -0,0 +1,60 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.llms.model import LlmModel  # noqa: E402
+from slashgpt.llms.transport import TransportRegistry, default_transport  # noqa: E402
+from slashgpt.utils.utils import run_sync  # noqa: E402
+
+
+@pytest.fixture
+def transport():
+    return TransportRegistry({"max_connections": 10})
+
+
+def test_client_is_pooled(transport):
+    client1 = transport.client(OpenAI, "key", "http://localhost:8000/v1")
+    client2 = transport.client(OpenAI, "key", "http://localhost:8000/v1")
+    assert client1 is client2
+    assert str(client1.base_url).startswith("http://localhost:8000/v1")
+
+
+def test_client_key_and_limits(transport):
+    client1 = transport.client(OpenAI, "key", None)
+    assert transport.client(OpenAI, "another", None) is not client1
+    assert transport.client(OpenAI, "key", None, {"max_connections": 5}) is not client1
+    assert transport.stats()["clients"] == 3
+
+
+def test_async_client_per_loop(transport):
+    async def get_client():
+        return transport.async_client(AsyncOpenAI, "key")
+
+    async def same_loop():
+        return (await get_client()) is (await get_client())
+
+    assert asyncio.run(same_loop())
+    assert asyncio.run(get_client()) is not asyncio.run(get_client())
+
+
+def test_llm_model_transport(transport):
+    model = LlmModel({"engine_name": "none", "model_name": "mock", "http_limits": {"timeout": 5}}, {}, transport)
+    assert model.transport is transport
+    assert model.http_limits() == {"timeout": 5}
+
+
+def test_run_sync_closes_throwaway_clients():
+    async def open_session():
+        return default_transport.aiohttp_session("http://localhost:8000")
+
+    async def in_loop():
+        # run_sync uses a new event loop on a worker thread inside a running loop
+        return run_sync(open_session())
+
+    session = asyncio.run(in_loop())
+    assert session.closed
@@ -0,0 +1,41 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.prompt_template import PromptTemplate  # noqa: E402
+
+
+def test_prompt_template():
+    template = PromptTemplate("A {random} B {random} C {memory} D {memory} {articles} {random}")
+    assert template.has("random") and template.has("memory") and not template.has("articles")
+    assert template.render({"random": ["x", "y"], "memory": '{"a": 1}'}) == 'A x B y C {"a": 1} D {memory} {articles} {random}'
+    # values are inserted as they are
+    assert template.render({"random": ["\\d", "\\1"], "memory": None}) == "A \\d B \\1 C {memory} D {memory} {articles} {random}"
+
+
+def test_prompt_data(tmp_path):
+    with open(tmp_path / "resource.txt", "w") as f:
+        f.write("resource {memory} \\n")
+    manifest = Manifest(
+        {
+            "prompt": ["Now: {now}", "{random}, {random}", "{resource}", "{agents}", "{memory}"],
+            "list": ["apple", "orange"],
+            "resource": "resource.txt",
+            "agents": ["a"],
+        },
+        str(tmp_path),
+    )
+    prompt = manifest.prompt_data({"a": {"description": "agent A"}}, {"name": "Joe"})
+    lines = prompt.split("\n")
+    assert len(lines[0]) == len("Now: 20240101T000000Z")
+    assert sorted(lines[1].split(", ")) == ["apple", "orange"]
+    assert lines[2:] == ["resource {memory} \\n", "a: agent A", json.dumps({"name": "Joe"})]
+    assert manifest.get("list") == ["apple", "orange"]
+
+    # the resource file is read again only when it is modified
+    with open(tmp_path / "resource.txt", "w") as f:
+        f.write("updated resource")
+    assert manifest.prompt_data({"a": {"description": "agent A"}}).split("\n")[2] == "updated resource"
@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests  # noqa: E402
+from slashgpt.manifest_store import ManifestStore  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+def write_manifests(path):
+    with open(path / "a.json", "w") as f:
+        json.dump({"title": "A"}, f)
+    with open(path / "b.yml", "w") as f:
+        f.write("title: B\n")
+    with open(path / "broken.json", "w") as f:
+        f.write("{")
+
+
+def test_manifest_store(tmp_path):
+    write_manifests(tmp_path)
+    store = ManifestStore()
+    assert store.load_folder(str(tmp_path)) == {"a": {"title": "A"}, "b": {"title": "B"}}
+    assert store.stats() == {"files": 3, "modules": 0, "parsed": 3, "reused": 0}
+
+    # only the modified file is parsed again
+    with open(tmp_path / "b.yml", "w") as f:
+        f.write("title: B2\n")
+    os.remove(tmp_path / "a.json")
+    assert store.load_folder(str(tmp_path)) == {"b": {"title": "B2"}}
+    assert store.stats()["parsed"] == 4
+    assert store.stats()["reused"] == 1
+
+
+def test_manifest_snapshot(tmp_path):
+    folder = tmp_path / "manifests"
+    folder.mkdir()
+    write_manifests(folder)
+    snapshot_path = str(tmp_path / "cache" / "manifests.json")
+    manifests = ManifestStore(snapshot_path).load_folder(str(folder))
+    with open(snapshot_path) as f:
+        assert len(json.load(f)["entries"]) == 3
+
+    store = ManifestStore(snapshot_path)
+    assert store.load_folder(str(folder)) == manifests
+    assert store.stats()["parsed"] == 0
+
+    # entries of deleted files are pruned
+    os.remove(folder / "a.json")
+    store = ManifestStore(snapshot_path)
+    assert store.load_folder(str(folder)) == {"b": {"title": "B"}}
+    assert store.stats()["files"] == 2
+    with open(snapshot_path) as f:
+        assert len(json.load(f)["entries"]) == 2
+
+
+def test_config_reload(tmp_path):
+    write_manifests(tmp_path)
+    store = ManifestStore()
+    config = ChatConfigWithManifests(current_dir, str(tmp_path), manifest_store=store)
+    assert config.has_manifest("a")
+    with open(tmp_path / "c.json", "w") as f:
+        json.dump({"title": "C"}, f)
+    config.reload()
+    assert config.manifests["c"] == {"title": "C"}
+    assert store.stats()["parsed"] == 4
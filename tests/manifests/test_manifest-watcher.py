@@ -0,0 +1,160 @@
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_app import ChatApplication  # noqa: E402
+from slashgpt.chat_config_with_manifests import ChatConfigWithManifests  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest_store import ManifestStore  # noqa: E402
+from slashgpt.manifest_watcher import ManifestWatcher  # noqa: E402
+
+
+class MockLlmEngine(LLMEngineBase):
+    def chat_completion(self, messages, manifest, verbose):
+        return ("assistant", "", None, 0)
+
+
+llm_models = {"mock": {"engine_name": "mock_engine", "model_name": "mock_model"}}
+llm_engine_configs = {"mock_engine": MockLlmEngine}
+
+module_v1 = """
+def lookup(city):
+    return ({"city": city, "version": 1}, None)
+"""
+
+module_v2 = """
+def lookup(city):
+    return ({"city": city, "version": 2}, None)
+"""
+
+
+def write(path, content):
+    # write to a temporary file and rename it, as editors do
+    with open(str(path) + ".tmp", "w") as f:
+        f.write(content)
+    os.replace(str(path) + ".tmp", path)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    (tmp_path / "manifests").mkdir()
+    (tmp_path / "modules").mkdir()
+    write(tmp_path / "manifests" / "weather.json", json.dumps({"title": "Weather", "model": "mock_model", "module": "modules/weather.py"}))
+    write(tmp_path / "manifests" / "news.json", json.dumps({"title": "News"}))
+    write(tmp_path / "modules" / "weather.py", module_v1)
+    return tmp_path
+
+
+def wait_for(refreshed, names, count=1):
+    for _ in range(100):
+        if refreshed.count(names) >= count:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.mark.parametrize("polling", [True, False])
+def test_watcher(folder, polling):
+    config = ChatConfigWithManifests(str(folder), str(folder / "manifests"), llm_models, llm_engine_configs, ManifestStore())
+    refreshed = []
+    lock = threading.Lock()
+
+    def callback(names):
+        with lock:
+            refreshed.append(names)
+
+    config.watch(callback, interval=0.05, polling=polling)
+    try:
+        session = ChatSession(config, manifest=config.get_manifest("weather"), agent_name="weather")
+        assert session.manifest.get_module("lookup")("Tokyo")[0]["version"] == 1
+
+        # only the manifest which refers to the module is refreshed
+        time.sleep(0.1)
+        write(folder / "modules" / "weather.py", module_v2)
+        assert wait_for(refreshed, ["weather"])
+        session.refresh_manifest(config.get_manifest("weather"))
+        assert session.manifest.get_module("lookup")("Tokyo")[0]["version"] == 2
+
+        write(folder / "manifests" / "news.json", json.dumps({"title": "Breaking News"}))
+        assert wait_for(refreshed, ["news"])
+        assert config.manifests["news"]["title"] == "Breaking News"
+
+        os.remove(folder / "manifests" / "news.json")
+        assert wait_for(refreshed, ["news"], 2)
+        assert not config.has_manifest("news")
+    finally:
+        config.stop_watching()
+
+
+def test_prepared_manifest(folder):
+    store = ManifestStore()
+    config = ChatConfigWithManifests(str(folder), str(folder / "manifests"), llm_models, llm_engine_configs, store)
+    template = config.get_manifest("weather")
+    assert config.get_manifest("weather") is template
+    parsed = store.stats()["parsed"]
+
+    sessions = [ChatSession(config, manifest=config.get_manifest("weather"), agent_name=f"weather{i}") for i in range(3)]
+    assert store.stats()["parsed"] == parsed
+    assert [session.manifest.username() for session in sessions] == ["You(weather0)", "You(weather1)", "You(weather2)"]
+    assert all(session.manifest is not template and session.manifest.get_module("lookup") is template.get_module("lookup") for session in sessions)
+
+    # a modified manifest gets a new template
+    write(folder / "manifests" / "weather.json", json.dumps({"title": "Weather 2", "model": "mock_model", "module": "modules/weather.py"}))
+    config.refresh_manifest_file(str(folder / "manifests" / "weather.json"))
+    assert config.get_manifest("weather").title() == "Weather 2"
+    assert sessions[0].manifest.title() == "Weather"
+    assert config.get_manifest("unknown") is None
+
+
+def test_broken_manifest(folder):
+    config = ChatConfigWithManifests(str(folder), str(folder / "manifests"), llm_models, llm_engine_configs, ManifestStore())
+    # a half-written file keeps the last good manifest
+    with open(folder / "manifests" / "news.json", "w") as f:
+        f.write('{"title": "Bre')
+    assert config.refresh_manifest_file(str(folder / "manifests" / "news.json")) is None
+    assert config.get_manifest("news").title() == "News"
+
+    write(folder / "manifests" / "news.json", json.dumps({"title": "Breaking News"}))
+    assert config.refresh_manifest_file(str(folder / "manifests" / "news.json")) == "news"
+    assert config.get_manifest("news").title() == "Breaking News"
+
+
+def test_application_refresh(folder):
+    config = ChatConfigWithManifests(str(folder), str(folder / "manifests"), llm_models, llm_engine_configs, ManifestStore())
+    events = []
+    app = ChatApplication(config, lambda callback_type, data: events.append((callback_type, data)), config.get_llm_model_from_key("mock"))
+    app.switch_session("weather", intro=False)
+
+    # the refresh from the watcher thread is applied on the thread of the application, before the next turn
+    write(folder / "manifests" / "weather.json", json.dumps({"title": "Weather 2", "model": "mock_model", "module": "modules/weather.py"}))
+    config.refresh_manifest_file(str(folder / "manifests" / "weather.json"))
+    app.refresh_manifests(["weather"])
+    assert app.session.title() == "Weather"
+    app.apply_refreshed_manifests()
+    assert app.session.title() == "Weather 2"
+    assert events[-1] == ("info", "Reloaded: weather")
+
+
+def test_persistent_error(folder, monkeypatch):
+    calls = []
+
+    def broken(self):
+        calls.append(time.monotonic())
+        raise OSError("broken")
+
+    monkeypatch.setattr(ManifestWatcher, "_ManifestWatcher__wait_for_changes", broken)
+    config = ChatConfigWithManifests(str(folder), str(folder / "manifests"), llm_models, llm_engine_configs, ManifestStore())
+    config.watch(None, interval=0.05)
+    try:
+        time.sleep(0.3)
+    finally:
+        config.stop_watching()
+    # the watcher backs off for the interval after each error (instead of spinning)
+    assert 1 <= len(calls) <= 10
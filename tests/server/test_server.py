@@ -0,0 +1,207 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from typing import List
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.function.function_call import FunctionCall  # noqa: E402
+from slashgpt.history.storage.sqlite import ChatHistorySQLiteStorage  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+from slashgpt.server import ChatServer  # noqa: E402
+
+# the test releases the rest of the stream after it receives the first token
+release = threading.Event()
+
+
+class MockStreamingEngine(LLMEngineBase):
+    async def chat_completion(self, messages: List[dict], manifest: Manifest, verbose: bool):
+        last_message = messages[-1]["content"]
+        if last_message == "wait":
+            yield "first"
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+            yield " last"
+        elif last_message == "code":
+            yield FunctionCall({"name": "run_python_code", "arguments": {"code": ["x = 1"], "query": last_message}}, manifest)
+        elif last_message == "count":
+            yield f"{len(messages)} messages"
+        elif last_message == "slow":
+            await asyncio.sleep(0.3)
+            yield "slow"
+        else:
+            yield "echo: "
+            yield last_message
+
+
+class MockRuntime:
+    """It records the notebook and the code cells of a session"""
+
+    runtimes: List["MockRuntime"] = []
+
+    def __init__(self):
+        self.notebook = None
+        self.cells: List[str] = []
+        self.stopped = False
+        MockRuntime.runtimes.append(self)
+
+    def create_notebook(self, module: str):
+        self.notebook = module
+        return ({"result": "created a notebook", "notebook_name": "notebook"}, None)
+
+    def run_python_code(self, code: list, query: str):
+        self.cells.append("".join(code))
+        return (f"cell {len(self.cells)}", None)
+
+    def stop(self):
+        self.stopped = True
+
+
+llm_models = {"mock": {"engine_name": "mock_engine", "model_name": "mock_model"}}
+llm_engine_configs = {"mock_engine": MockStreamingEngine}
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "manifests" / "main").mkdir(parents=True)
+    with open(tmp_path / "manifests" / "main" / "echo.json", "w") as f:
+        json.dump({"title": "Echo", "model": "mock_model", "prompt": "You echo"}, f)
+    with open(tmp_path / "manifests" / "main" / "window.json", "w") as f:
+        json.dump({"title": "Window", "model": "mock_model", "prompt": "You echo", "history_type": "window", "history_window": 3}, f)
+    with open(tmp_path / "manifests" / "main" / "notebook.json", "w") as f:
+        json.dump({"title": "Notebook", "model": "mock_model", "prompt": "You code", "notebook": True}, f)
+    db_path = str(tmp_path / "history.db")
+
+    def history_engine(agent_name, session_id):
+        return ChatHistorySQLiteStorage("test", agent_name, session_id=session_id, db_path=db_path)
+
+    MockRuntime.runtimes = []
+    return ChatServer(
+        str(tmp_path),
+        {"main": {"manifests_dir": "manifests/main"}},
+        llm_models,
+        llm_engine_configs,
+        history_engine=history_engine,
+        runtime_factory=MockRuntime,
+    )
+
+
+def parse_sse(lines):
+    event = None
+    for line in lines:
+        if line.startswith("event: "):
+            event = line[len("event: ") :]
+        elif line.startswith("data: "):
+            yield (event, json.loads(line[len("data: ") :]))
+
+
+async def call_asgi(app, path: str, body: dict, on_chunk):
+    # calls the ASGI application directly, so that the chunks of the body are observed as they are sent
+    # (TestClient and httpx.ASGITransport return the response after it completes)
+    request = json.dumps(body).encode()
+    messages = [{"type": "http.request", "body": request, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            on_chunk(dict((key.decode(), value.decode()) for key, value in message["headers"]), None)
+        elif message["type"] == "http.response.body" and message.get("body"):
+            on_chunk(None, message["body"].decode())
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [(b"content-type", b"application/json")], "query_string": b""}
+    await asyncio.wait_for(app(scope, receive, send), 5)
+
+
+def test_sse(server):
+    release.clear()
+    chunks = []
+
+    def on_chunk(headers, chunk):
+        if headers:
+            assert headers["content-type"].startswith("text/event-stream")
+        elif chunk:
+            chunks.append(chunk)
+            if "event: token" in chunk:
+                # the first token arrives before the rest of the response is generated
+                release.set()
+
+    asyncio.run(call_asgi(server.app(), "/manifests/main/echo/stream", {"message": "wait"}, on_chunk))
+    received = list(parse_sse("".join(chunks).split("\n")))
+    assert [event for event, _ in received] == ["session", "token", "token", "done"]
+    session_id = received[0][1]["session_id"]
+    assert received[-1][1] == {"session_id": session_id, "message": "first last"}
+
+    # the session is kept hot, and it is rehydrated from the history once it is evicted
+    with TestClient(server.app()) as client:
+        response = client.post(f"/manifests/main/echo/talk/{session_id}", json={"message": "Hi"})
+        assert response.json()["messages"][-1] == {"role": "assistant", "content": "echo: Hi"}
+        assert server.registry.keys() == [session_id]
+        assert server.registry.stats()["hits"] == 1
+        server.registry.clear()
+        response = client.post(f"/manifests/main/echo/talk/{session_id}", json={"message": "again"})
+        assert [m["content"] for m in response.json()["messages"]] == ["You echo", "wait", "first last", "Hi", "echo: Hi", "again", "echo: again"]
+        assert client.post("/manifests/main/unknown/talk", json={"message": "Hi"}).status_code == 404
+
+
+def test_history_type(server):
+    # the context policy selects the messages from the write-back history of the session
+    with TestClient(server.app()) as client:
+        session_id = client.post("/manifests/main/window/talk", json={"message": "a"}).json()["session_id"]
+        for message in ["b", "c"]:
+            client.post(f"/manifests/main/window/talk/{session_id}", json={"message": message})
+        response = client.post(f"/manifests/main/window/talk/{session_id}", json={"message": "count"})
+        # the prompt and the last three messages ("c", "echo: c" and "count")
+        assert response.json()["messages"][-1] == {"role": "assistant", "content": "4 messages"}
+        assert len(response.json()["messages"]) == 9
+
+
+def test_notebook(server):
+    # each session of a notebook agent has its own runtime with a notebook
+    with TestClient(server.app()) as client:
+        session_ids = [client.post("/manifests/main/notebook/talk", json={"message": "code"}).json()["session_id"] for _ in range(2)]
+        response = client.post(f"/manifests/main/notebook/talk/{session_ids[0]}", json={"message": "code"})
+        assert response.json()["messages"][-1] == {"role": "assistant", "content": "echo: cell 2"}
+        client.post("/manifests/main/echo/talk", json={"message": "Hi"})
+    assert [(runtime.notebook, runtime.cells) for runtime in MockRuntime.runtimes] == [("mock_model", ["x = 1", "x = 1"]), ("mock_model", ["x = 1"])]
+    server.registry.clear()
+    assert all(runtime.stopped for runtime in MockRuntime.runtimes)
+
+
+def test_websocket(server):
+    with TestClient(server.app()).websocket_connect("/manifests/main/echo/ws") as websocket:
+        for message in ["Hello", "World"]:
+            websocket.send_json({"message": message})
+            events = []
+            while not events or events[-1]["event"] != "done":
+                events.append(websocket.receive_json())
+            assert "".join(e["data"] for e in events if e["event"] == "token") == f"echo: {message}"
+    assert len(server.registry) == 1
+
+
+def test_concurrent_sessions(server):
+    async def talk(client):
+        response = await client.post("/manifests/main/echo/stream", json={"message": "slow"})
+        return [event for event, _ in parse_sse(response.text.split("\n"))]
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app()), base_url="http://test") as client:
+            return await asyncio.gather(*[talk(client) for _ in range(10)])
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    # ten sessions run concurrently on one event loop
+    assert time.perf_counter() - start < 2.0
+    assert all(events == ["session", "token", "done"] for events in results)
+    assert len(server.registry) == 10
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.chat_session import ChatSession  # noqa: E402
+from slashgpt.history.storage.memory import ChatHistoryMemoryStorage  # noqa: E402
+from slashgpt.history.storage.write_back import ChatHistoryWriteBackStorage  # noqa: E402
+from slashgpt.llms.engine.base import LLMEngineBase  # noqa: E402
+from slashgpt.session_registry import SessionRegistry  # noqa: E402
+
+
+class MockLlmEngine(LLMEngineBase):
+    def chat_completion(self, messages, manifest, verbose):
+        return ("assistant", "", None, 0)
+
+
+config = ChatConfig(os.path.dirname(__file__), {"mock": {"engine_name": "mock_engine", "model_name": "mock_model"}}, {"mock_engine": MockLlmEngine})
+
+
+def new_session(registry: SessionRegistry, backing: ChatHistoryMemoryStorage) -> ChatSession:
+    storage = asyncio.run(registry.open_storage(lambda: backing))
+    return ChatSession(config, history_engine=storage, manifest={"prompt": "You are a bot", "model": "mock_model"})
+
+
+def test_write_back():
+    registry = SessionRegistry()
+    backing = ChatHistoryMemoryStorage("test", "bot")
+    session = new_session(registry, backing)
+    registry.put("a", session)
+    session.append_user_question("Hello")
+
+    # the turn does not touch the backing storage
+    assert isinstance(session.history.repository, ChatHistoryWriteBackStorage)
+    assert backing.len() == 0 and session.history.len_messages() == 2
+    registry.write_back(session).result()
+    assert [m["content"] for m in backing.messages()] == ["You are a bot", "Hello"]
+    assert registry.write_back(session) is None
+    registry.close()
+
+
+def test_eviction():
+    registry = SessionRegistry(maxsize=2, ttl=0.1)
+    backings = [ChatHistoryMemoryStorage("test", "bot") for _ in range(3)]
+    for key, backing in zip(["a", "b", "c"], backings):
+        registry.put(key, new_session(registry, backing))
+        registry.get("a")
+    # the least recently used session is evicted, and its history is written back
+    assert registry.keys() == ["c", "a"]
+    registry.flush()
+    assert backings[1].len() == 1
+
+    time.sleep(0.15)
+    assert registry.get("a") is None
+    assert len(registry) == 0
+    assert registry.stats() == {"size": 0, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 3}
+
+    # rehydrated from the history storage
+    storage = asyncio.run(registry.open_storage(lambda: backings[0]))
+    assert storage.messages() == backings[0].messages()
+    registry.close()
+
+
+def test_single_flight():
+    registry = SessionRegistry(ttl=0.1)
+    backing = ChatHistoryMemoryStorage("test", "bot")
+    created = []
+
+    async def create():
+        storage = await registry.open_storage(lambda: backing)
+        await asyncio.sleep(0.05)
+        created.append(storage)
+        return ChatSession(config, history_engine=storage, manifest={"prompt": "You are a bot", "model": "mock_model"})
+
+    async def main():
+        return await asyncio.gather(*[registry.open("a", create) for _ in range(5)])
+
+    # concurrent requests for an unknown session rehydrate it once, and share it
+    entries = asyncio.run(main())
+    assert len(created) == 1
+    assert all(entry is entries[0] for entry in entries) and entries[0].refs == 5
+
+    # pinned sessions are not expired, even while no turn holds the lock
+    time.sleep(0.15)
+    registry.expire()
+    assert registry.keys() == ["a"]
+    for entry in entries:
+        registry.release(entry)
+    time.sleep(0.15)
+    assert registry.get("a") is None
+    registry.close()
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from typing import List
@@ -78,3 +79,10 @@ def test_vector2(vector_db):
     ]
     articles = vector_db.fetch_related_articles(messages, "")
     assert articles == "banana, pineapple"
+
+
+def test_vector_async(vector_db):
+    # the synchronous fetch_data runs in a worker thread
+    messages = [{"role": "user", "content": "banana content 3"}]
+    articles = asyncio.run(vector_db.afetch_related_articles(messages, ""))
+    assert articles == "banana, pineapple"
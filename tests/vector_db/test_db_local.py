@@ -0,0 +1,57 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.chat_config import ChatConfig  # noqa: E402
+from slashgpt.dbs.db_local import DBLocal, LocalVectorIndex  # noqa: E402
+from slashgpt.manifest import Manifest  # noqa: E402
+
+current_dir = os.path.dirname(__file__)
+
+
+def exact_top_k(vectors, query, top_k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:top_k])
+
+
+def test_local_index(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(1000, 16)).astype(np.float32)
+    index = LocalVectorIndex(str(tmp_path / "index"))
+    index.add(vectors[:600], [f"text {i}" for i in range(600)])
+    index.add(vectors[600:], [f"text {i}" for i in range(600, 1000)])
+    assert len(index) == 1000
+
+    query = rng.normal(size=16)
+    results = index.search(query, 5)
+    assert [row for row, _ in results] == exact_top_k(vectors, query, 5)
+    assert index.texts([row for row, _ in results]) == [f"text {row}" for row, _ in results]
+
+    # IVF searches a part of the index, and it is exact when all the lists are probed
+    index.build_ivf(nlist=10)
+    assert [row for row, _ in index.search(query, 5, nprobe=10)] == exact_top_k(vectors, query, 5)
+    approximate = [row for row, _ in index.search(query, 5, nprobe=3)]
+    assert len(approximate) == 5 and len(set(approximate) & set(exact_top_k(vectors, query, 5))) >= 3
+
+    # another instance reads the same files
+    assert LocalVectorIndex(str(tmp_path / "index")).search(query, 1, nprobe=0)[0][0] == results[0][0]
+
+
+def test_db_local(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "olympics"))
+    index.add([[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]], ["curling", "skating", "skiing"])
+
+    manifest = Manifest({"embeddings": {"db_type": "local", "engine_type": "openai", "db_path": str(tmp_path), "name": "olympics", "top_k": 2}})
+    db = manifest.get_vector_db(ChatConfig(current_dir))
+    assert isinstance(db, DBLocal)
+    assert db.fetch_data([1.0, 0.1]) == ["curling", "skiing"]
+    assert (
+        Manifest({"embeddings": {"db_type": "local", "engine_type": "openai", "db_path": str(tmp_path), "name": "none"}}).get_vector_db(
+            ChatConfig(current_dir)
+        )
+        is None
+    )
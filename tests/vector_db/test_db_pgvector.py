@@ -0,0 +1,135 @@
+import asyncio
+import contextlib
+import os
+import sys
+from typing import List
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.dbs.db_pgvector import DBPgVector  # noqa: E402
+from slashgpt.dbs.vector_engine import VectorEngine  # noqa: E402
+from slashgpt.llms.model import LlmModel  # noqa: E402
+
+pytest.importorskip("psycopg")
+
+
+class VectorEngineMock(VectorEngine):
+    def __init__(self, verbose: bool):
+        pass
+
+    def query_to_vector(self, query: str) -> List[float]:
+        return [1.0, 0.0]
+
+    def results_to_articles(self, results: List[str], query: str, messages: List[dict], llm_model: LlmModel) -> str:
+        return ", ".join(results)
+
+
+class MockPool:
+    """Records the queries instead of talking to PostgreSQL"""
+
+    def __init__(self):
+        self.executed = []
+        self.opened = 0
+        self.connections = 0
+
+    async def open(self):
+        self.opened += 1
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        self.connections += 1
+        yield self
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        yield
+
+    @contextlib.asynccontextmanager
+    async def cursor(self):
+        yield self
+
+    async def execute(self, query, params, prepare=False):
+        self.executed.append((query if isinstance(query, str) else query.as_string(None), params, prepare))
+
+    async def fetchall(self):
+        return [(1, "alice"), (2, "bob")]
+
+
+class MockSyncPool(MockPool):
+    """Synchronous version of MockPool"""
+
+    def open(self):
+        self.opened += 1
+
+    @contextlib.contextmanager
+    def connection(self):
+        self.connections += 1
+        yield self
+
+    @contextlib.contextmanager
+    def transaction(self):
+        yield
+
+    @contextlib.contextmanager
+    def cursor(self):
+        yield self
+
+    def execute(self, query, params, prepare=False):
+        self.executed.append((query if isinstance(query, str) else query.as_string(None), params, prepare))
+
+    def fetchall(self):
+        return [(1, "alice"), (2, "bob")]
+
+
+class MockTransport:
+    def __init__(self):
+        self.pools = {}
+        self.sync_pools = {}
+
+    def pg_pool(self, conninfo: str, min_size: int = 1, max_size: int = 10):
+        return self.pools.setdefault((conninfo, min_size, max_size), MockPool())
+
+    def pg_sync_pool(self, conninfo: str, min_size: int = 1, max_size: int = 10):
+        return self.sync_pools.setdefault((conninfo, min_size, max_size), MockSyncPool())
+
+
+def test_pgvector(monkeypatch):
+    monkeypatch.setenv("POSTGRESQL_CONFIG", "postgresql://localhost/test")
+    transport = MockTransport()
+    embeddings = {"name": "public.articles", "top_k": 3, "distance": "l2", "ef_search": 64, "metadata": {"storage_id": "s1"}, "pool": {"max_size": 4}}
+    db = DBPgVector(embeddings, VectorEngineMock, False, transport)
+    other = DBPgVector({"name": "articles"}, VectorEngineMock, False, transport)
+
+    messages = [{"role": "user", "content": "apple"}]
+    assert asyncio.run(db.afetch_related_articles(messages, None)) == "alice, bob"
+    assert db.fetch_related_articles(messages, None) == "alice, bob"
+
+    # the synchronous path uses a synchronous pool (not an asynchronous one on a throwaway loop)
+    pool = transport.pools[("postgresql://localhost/test", 1, 4)]
+    assert pool.connections == 1
+    sync_pool = transport.sync_pools[("postgresql://localhost/test", 1, 4)]
+    assert sync_pool.connections == 1
+    assert [query for (query, _, _) in sync_pool.executed] == [query for (query, _, _) in pool.executed]
+
+    async def in_loop():
+        return db.fetch_related_articles(messages, None)
+
+    assert asyncio.run(in_loop()) == "alice, bob"
+    assert len(transport.pools) == 1 and sync_pool.connections == 2
+    (setting, (query, params, prepare)) = pool.executed[:2]
+    assert setting == ("SELECT set_config(%s, %s, true)", ("hnsw.ef_search", "64"), False)
+    assert query == 'SELECT id, text FROM "public"."articles" WHERE storage_id = %(storage_id)s ORDER BY embedding <-> %(embedding)s LIMIT %(top_k)s'
+    assert params["top_k"] == 3 and params["storage_id"] == "s1" and list(params["embedding"]) == [1.0, 0.0]
+    assert prepare
+
+    # sessions share the pool of the same database (and pool size)
+    asyncio.run(other.afetch_data([0.0, 1.0]))
+    asyncio.run(DBPgVector({"name": "others"}, VectorEngineMock, False, transport).afetch_data([0.0, 1.0]))
+    assert len(transport.pools) == 2
+    (query, params, _) = transport.pools[("postgresql://localhost/test", 1, 10)].executed[0]
+    assert query == 'SELECT id, text FROM "articles" ORDER BY embedding <=> %(embedding)s LIMIT %(top_k)s'
+
+    with pytest.raises(ValueError):
+        DBPgVector({"name": "articles", "distance": "dot"}, VectorEngineMock, False, transport)
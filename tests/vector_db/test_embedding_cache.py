@@ -0,0 +1,49 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+
+from slashgpt.dbs import vector_engine_openai  # noqa: E402
+from slashgpt.dbs.embedding_cache import EmbeddingCache  # noqa: E402
+from slashgpt.dbs.vector_engine_openai import VectorEngineOpenAI  # noqa: E402
+
+
+def mock_embeddings(monkeypatch):
+    requests = []
+
+    def create(model, input):
+        requests.append(input)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)])
+
+    monkeypatch.setattr(vector_engine_openai, "openai", SimpleNamespace(embeddings=SimpleNamespace(create=create)))
+    return requests
+
+
+def test_texts_to_vectors(monkeypatch):
+    requests = mock_embeddings(monkeypatch)
+    engine = VectorEngineOpenAI(False, EmbeddingCache())
+
+    assert engine.query_to_vector("hello") == [5.0, 1.0]
+    assert engine.query_to_vector("hello") == [5.0, 1.0]
+    assert requests == [["hello"]]
+
+    # only the distinct texts not in the cache are embedded, in batches
+    vectors = engine.texts_to_vectors(["a", "bb", "hello", "a", "ccc"], batch_size=2)
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [5.0, 1.0], [1.0, 1.0], [3.0, 1.0]]
+    assert requests[1:] == [["a", "bb"], ["ccc"]]
+    assert engine.cache.stats()["size"] == 4
+
+
+def test_disk_tier(monkeypatch, tmp_path):
+    requests = mock_embeddings(monkeypatch)
+    db_path = str(tmp_path / "embedding_cache.db")
+    VectorEngineOpenAI(False, EmbeddingCache(db_path=db_path)).texts_to_vectors(["a", "bb"])
+
+    # another process (or a restart) reads the on-disk tier
+    cache = EmbeddingCache(db_path=db_path)
+    assert VectorEngineOpenAI(False, cache).texts_to_vectors(["bb", "a"]) == [[2.0, 1.0], [1.0, 1.0]]
+    assert len(requests) == 1 and cache.disk_hits == 2
+    assert cache.get(EmbeddingCache.key("other-model", "a")) is None
+    cache.clear()
+    assert EmbeddingCache(db_path=db_path).get_many([EmbeddingCache.key("text-embedding-ada-002", "a")]) == {}